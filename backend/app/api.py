@@ -1,7 +1,12 @@
 """API routes for RepoLens."""
 
+import asyncio
 import os
-from fastapi import APIRouter, HTTPException
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from .models import (
     RepoValidateRequest,
     RepoValidateResponse,
@@ -10,18 +15,176 @@ from .models import (
     ReportRequest,
     ReportResponse,
     CacheInfo,
+    RepoInfo,
+    RepoListResponse,
+    JobRequest,
+    JobInfo,
+    JobListResponse,
 )
 from .core.config import get_settings
 from .services.repo_validate import validate_repo
-from .services.evidence_collector import resolve_file_path, collect_evidence
-from .services.metrics import file_metrics
-from .services.timeline import build_timeline
-from .services.intent import infer_intent
-from .services.llm import generate_answer
-from .services.cache import cache_key, cache_get, cache_set
-from .services.report import generate_markdown_and_save
+from .services.repo_registry import RepoHandle, get_repo_registry
+from .services.pipeline import covers, select_fields, stages_for
+from .services.incremental import analyze_cached, analyze_partial, stages_key
+from .services.cache import cache_get
+from .services.report import FORMATS, report_path, save_report, stream_report
+from .services.http_cache import (
+    CONDITIONAL_RESPONSES,
+    IMMUTABLE,
+    NO_STORE,
+    REVALIDATE,
+    choose_encoding,
+    encode_body,
+    etag_matches,
+    make_etag,
+)
+from .services.telemetry import stage
+from .services.tracing import get_trace, list_traces
+from .services.recorder import RecordingRoute, note
+from .services.admission import AdmissionRejected, get_admission_controller
+from .services.cancellation import CancelToken, OperationCancelled, cancel_scope
+from .services.jobs import JobQueueFull, get_job_manager
+from .services.targets import analysis_target, resolve_target
+
+router = APIRouter(route_class=RecordingRoute)
+
+
+def _request_token(http_request: Request, deadline_ms: int | None) -> CancelToken:
+    """
+    Build the cancel token for a request.
+
+    Args:
+        http_request: Incoming request (for the X-RepoLens-Deadline-Ms header)
+        deadline_ms: Deadline from the request body, takes precedence
+
+    Returns:
+        CancelToken with the deadline applied, if any
+    """
+    if deadline_ms is None:
+        header = http_request.headers.get("X-RepoLens-Deadline-Ms")
+        if header:
+            try:
+                deadline_ms = int(header)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid X-RepoLens-Deadline-Ms")
+    if deadline_ms is None:
+        return CancelToken()
+    return CancelToken(deadline_ms / 1000)
+
+
+def _cancelled_error(reason: str | None) -> HTTPException:
+    """HTTP error for a cancelled analysis."""
+    if reason == "deadline":
+        return HTTPException(status_code=504, detail="Deadline exceeded")
+    return HTTPException(status_code=499, detail="Client disconnected")
+
+
+def _in_scope(token: CancelToken, fn, *args):
+    """Run fn with the request's cancel token active in this thread."""
+    with cancel_scope(token):
+        return fn(*args)
+
+
+async def _watch_cancellation(http_request: Request, token: CancelToken, work: asyncio.Task, started) -> None:
+    """Cancel the token on client disconnect or deadline, until work finishes."""
+    while not work.done():
+        if token.expired():
+            reason = "deadline"
+        elif await http_request.is_disconnected():
+            reason = "disconnected"
+        else:
+            await asyncio.sleep(0.05)
+            continue
+        token.cancel(reason)
+        if not started():
+            # Still queued for admission: withdraw instead of waiting for a slot
+            work.cancel()
+        return
+
+
+async def _run_admitted(
+    http_request: Request, handle: RepoHandle, token: CancelToken, fn, *args
+):
+    """
+    Run blocking git-heavy work in the threadpool once admission grants a slot.
 
-router = APIRouter()
+    The work is cancelled (and its git processes killed) if the client
+    disconnects or the request deadline passes.
+
+    Args:
+        http_request: Incoming request, watched for disconnects
+        handle: Repository the work runs against
+        token: Cancel token for this request
+        fn: Blocking callable
+        *args: Arguments for fn
+
+    Returns:
+        Result of fn
+
+    Raises:
+        HTTPException: 429 when the queue is full, 504 past the deadline,
+            499 when the client went away
+    """
+    started = False
+
+    async def admitted():
+        nonlocal started
+        async with get_admission_controller().async_slot(handle.repo_id):
+            token.check()
+            started = True
+            return await run_in_threadpool(_in_scope, token, fn, *args)
+
+    work = asyncio.create_task(admitted())
+    watcher = asyncio.create_task(
+        _watch_cancellation(http_request, token, work, lambda: started)
+    )
+    try:
+        return await work
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except OperationCancelled as e:
+        raise _cancelled_error(e.reason)
+    except asyncio.CancelledError:
+        if token.reason is None:
+            raise
+        raise _cancelled_error(token.reason)
+    finally:
+        watcher.cancel()
+
+
+def _single_flight_analysis(cache_dir: str, key: str, *args) -> tuple[dict, bool]:
+    """analyze_cached after a cache miss seen by the endpoint."""
+    return analyze_cached(cache_dir, key, *args, known_miss=True)
+
+
+def _analyze_response(
+    data: dict, key: str, hit: bool, rev: str | None = None, fields: list[str] | None = None
+) -> AnalyzeResponse:
+    """Build an AnalyzeResponse from a cached or fresh analysis dict."""
+    if fields is not None:
+        # Only the selected parts are set (and serialized with exclude_unset)
+        parts = ("evidence", "timeline", "metrics", "intent", "answer")
+        parts += tuple(flag for flag in ("skipped", "incomplete") if flag in data)
+        return AnalyzeResponse(
+            **{name: data[name] for name in parts if name in data},
+            cache=CacheInfo(hit=hit, key=key),
+            rev=rev,
+        )
+    return AnalyzeResponse(
+        evidence=data.get("evidence", []),
+        timeline=data.get("timeline", []),
+        metrics=data.get("metrics", {}),
+        intent=data.get("intent", {}),
+        answer=data.get("answer", {}),
+        cache=CacheInfo(hit=hit, key=key),
+        rev=rev,
+        skipped=data.get("skipped"),
+        incomplete=data.get("incomplete"),
+    )
 
 
 @router.post("/repo/validate", response_model=RepoValidateResponse)
@@ -39,110 +202,225 @@ async def validate_endpoint(request: RepoValidateRequest):
     return RepoValidateResponse(is_valid=is_valid, head=head)
 
 
-@router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_endpoint(request: AnalyzeRequest):
+@router.post("/repos", response_model=RepoInfo)
+async def register_repo_endpoint(request: RepoValidateRequest):
     """
-    Analyze a file in a repository.
+    Register a repository and keep its state warm between requests.
 
     Args:
-        request: AnalyzeRequest
+        request: RepoValidateRequest with repo_path
 
     Returns:
-        AnalyzeResponse with evidence, timeline, metrics, intent, answer
+        RepoInfo with the repo_id to use in analyze/report requests
+    """
+    try:
+        handle = get_repo_registry().register(request.repo_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RepoInfo(**handle.to_dict())
+
+
+@router.get("/repos", response_model=RepoListResponse)
+async def list_repos_endpoint():
+    """
+    List registered repositories.
+
+    Returns:
+        RepoListResponse, least recently used first
+    """
+    registry = get_repo_registry()
+    registry.evict()
+    return RepoListResponse(repos=[RepoInfo(**h.to_dict()) for h in registry.handles()])
+
+
+@router.delete("/repos/{repo_id}")
+async def unregister_repo_endpoint(repo_id: str):
+    """
+    Unregister a repository.
+
+    Args:
+        repo_id: Registered repository id
+
+    Returns:
+        Dictionary with ok flag
     """
-    # Validate repo
-    is_valid, repo_head = validate_repo(request.repo_path)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail="Invalid repository")
+    if not get_repo_registry().unregister(repo_id):
+        raise HTTPException(status_code=404, detail="Unknown repo_id")
+    return {"ok": True}
 
-    # Resolve file path
+
+def _analysis_target(
+    request: AnalyzeRequest | ReportRequest,
+) -> tuple[RepoHandle, str, str, int, int, str | None, str]:
+    """
+    Resolve an analyze or report request and compute its cache key.
+
+    Args:
+        request: AnalyzeRequest or ReportRequest
+
+    Returns:
+        Tuple of (handle, repo_head, rel_path, line_start, line_end, rev, key)
+        (see targets.analysis_target)
+
+    Raises:
+        HTTPException: 404 for an unknown repo_id, 400 if the repo, revision
+            or file is invalid
+    """
     try:
-        abs_path, rel_path = resolve_file_path(request.repo_path, request.file_path)
+        target = analysis_target(request.model_dump())
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    note(repo_path=target[0].path, rel_path=target[2])
+    return target
 
-    # Default line range
-    line_start = request.line_start
-    line_end = request.line_end
-    if line_start is None or line_end is None:
-        line_start = 1
-        line_end = 200
-
-    # Compute cache key
-    settings = get_settings()
-    cache_dir = os.path.join(request.repo_path, settings.repolens_cache_dir)
-    key = cache_key(
-        repo_head,
+
+async def _cached_analysis(
+    request: AnalyzeRequest | ReportRequest, http_request: Request, target: tuple
+) -> tuple[dict, bool]:
+    """
+    Read a request's analysis from the cache, or compute it under admission.
+
+    Args:
+        request: AnalyzeRequest or ReportRequest
+        http_request: Incoming request
+        target: Result of _analysis_target for request
+
+    Returns:
+        Tuple of (analysis, hit)
+    """
+    handle, repo_head, rel_path, line_start, line_end, rev, key = target
+    fields = getattr(request, "fields", None)
+    with stage("cache_read"):
+        cached = cache_get(handle.cache_dir, key)
+        if not cached and fields is not None:
+            partial = cache_get(handle.cache_dir, stages_key(key))
+            if partial and covers(partial, stages_for(fields)):
+                cached = partial
+    if cached:
+        note(hit=True)
+        return select_fields(cached, fields), True
+
+    # Miss: compute once across workers, others wait and read the result. With
+    # fields, only the stages they need run (on top of any partial result)
+    if fields is None:
+        compute, extra = _single_flight_analysis, ()
+    else:
+        compute, extra = analyze_partial, (fields,)
+    response_dict, hit = await _run_admitted(
+        http_request,
+        handle,
+        _request_token(http_request, request.deadline_ms),
+        compute,
+        handle.cache_dir,
+        key,
+        handle.path,
         rel_path,
         line_start,
         line_end,
         request.question,
         request.max_commits,
         request.use_llm,
+        repo_head,
+        rev,
+        request.history_mode,
+        *extra,
     )
+    note(hit=hit)
+    return response_dict, hit
 
-    # Check cache
-    cached = cache_get(cache_dir, key)
-    if cached:
-        return AnalyzeResponse(
-            evidence=[evidence for evidence in cached.get("evidence", [])],
-            timeline=[item for item in cached.get("timeline", [])],
-            metrics=cached.get("metrics", {}),
-            intent=cached.get("intent", {}),
-            answer=cached.get("answer", {}),
-            cache=CacheInfo(hit=True, key=key),
-        )
 
-    # Collect evidence
-    evidence_list = collect_evidence(
-        request.repo_path, rel_path, line_start, line_end, request.max_commits
-    )
+def _validators(etag: str, rev: str | None) -> dict[str, str]:
+    """Caching headers for a GET analysis response."""
+    return {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if rev else REVALIDATE,
+        "Vary": "Accept-Encoding",
+    }
 
-    # Get metrics
-    metrics_dict = file_metrics(request.repo_path, rel_path)
 
-    # Build timeline
-    timeline_list = build_timeline(evidence_list)
+def _not_modified(http_request: Request, endpoint: str, headers: dict[str, str]) -> Response | None:
+    """A 304 response if the client's If-None-Match matches headers["ETag"]."""
+    if not etag_matches(http_request.headers.get("If-None-Match"), headers["ETag"]):
+        return None
+    CONDITIONAL_RESPONSES.inc(endpoint=endpoint, result="not_modified")
+    return Response(status_code=304, headers=headers)
+
+
+def _encoded_response(
+    http_request: Request, endpoint: str, body: bytes, media_type: str, headers: dict[str, str]
+) -> Response:
+    """A full GET response, compressed as the client accepts."""
+    CONDITIONAL_RESPONSES.inc(endpoint=endpoint, result="full")
+    with stage("compress"):
+        body, encoding = encode_body(
+            body,
+            choose_encoding(http_request.headers.get("Accept-Encoding")),
+            get_settings().compress_min_bytes,
+        )
+    if encoding:
+        headers = {**headers, "Content-Encoding": encoding}
+    return Response(content=body, media_type=media_type, headers=headers)
 
-    # Infer intent
-    intent_dict = infer_intent(evidence_list, timeline_list, metrics_dict)
 
-    # Generate answer
-    answer_obj = generate_answer(
-        request.question,
-        evidence_list,
-        timeline_list,
-        metrics_dict,
-        intent_dict.__dict__,
-        request.use_llm,
-    )
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_endpoint(request: AnalyzeRequest, http_request: Request):
+    """
+    Analyze a file in a repository.
 
-    # Build response
-    response_dict = {
-        "evidence": [e.model_dump() for e in evidence_list],
-        "timeline": [t.model_dump() for t in timeline_list],
-        "metrics": metrics_dict,
-        "intent": intent_dict.model_dump(),
-        "answer": answer_obj.model_dump(),
-        "cache": {"hit": False, "key": key},
-    }
+    Args:
+        request: AnalyzeRequest
 
-    # Cache it
-    cache_set(cache_dir, key, response_dict)
+    Returns:
+        AnalyzeResponse with evidence, timeline, metrics, intent, answer
+        (only the selected ones when request.fields is set)
+    """
+    target = _analysis_target(request)
+    rev, key = target[5], target[6]
+    data, hit = await _cached_analysis(request, http_request, target)
+    with stage("serialize"):
+        response = _analyze_response(data, key, hit=hit, rev=rev, fields=request.fields)
+        if request.fields is not None:
+            return JSONResponse(response.model_dump(mode="json", exclude_unset=True))
+        return response
+
+
+@router.get("/analyze", response_model=AnalyzeResponse)
+async def analyze_get_endpoint(
+    request: Annotated[AnalyzeRequest, Query()], http_request: Request
+):
+    """
+    Analyze a file; cacheable variant of POST /analyze.
 
-    response = AnalyzeResponse(
-        evidence=evidence_list,
-        timeline=timeline_list,
-        metrics=metrics_dict,  # type: ignore
-        intent=intent_dict,
-        answer=answer_obj,
-        cache=CacheInfo(hit=False, key=key),
-    )
-    return response
+    The ETag is derived from the cache key, so a matching If-None-Match is
+    answered with 304 before the cache is even read.
+
+    Args:
+        request: AnalyzeRequest fields as query parameters
+
+    Returns:
+        AnalyzeResponse (gzip or brotli encoded if accepted), or 304
+    """
+    target = _analysis_target(request)
+    rev, key = target[5], target[6]
+    fields = request.fields
+    headers = _validators(make_etag(key, *sorted(set(fields or ()))), rev)
+    not_modified = _not_modified(http_request, "analyze", headers)
+    if not_modified is not None:
+        return not_modified
+
+    data, hit = await _cached_analysis(request, http_request, target)
+    if data.get("incomplete"):
+        headers["Cache-Control"] = NO_STORE
+    with stage("serialize"):
+        response = _analyze_response(data, key, hit=hit, rev=rev, fields=fields)
+        body = response.model_dump_json(exclude_unset=fields is not None).encode()
+    return _encoded_response(http_request, "analyze", body, "application/json", headers)
 
 
 @router.post("/report", response_model=ReportResponse)
-async def report_endpoint(request: ReportRequest):
+async def report_endpoint(request: ReportRequest, http_request: Request):
     """
     Generate a report for a file.
 
@@ -152,62 +430,248 @@ async def report_endpoint(request: ReportRequest):
     Returns:
         ReportResponse with markdown and file path
     """
-    # Use analyze logic to get all the data
-    is_valid, repo_head = validate_repo(request.repo_path)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail="Invalid repository")
+    target = _analysis_target(request)
+    handle, _, rel_path, line_start, line_end, _, _ = target
+    analysis, _ = await _cached_analysis(request, http_request, target)
 
-    # Resolve file path
-    try:
-        abs_path, rel_path = resolve_file_path(request.repo_path, request.file_path)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # Build response dict for markdown generation
+    response_dict = {
+        "file_path": rel_path,
+        "line_start": line_start,
+        "line_end": line_end,
+        "question": request.question,
+        **analysis,
+    }
+
+    fmt = request.format
+    if request.stream:
+        # Sections are sent as they are rendered (and written to the stored copy)
+        path, chunks = await run_in_threadpool(
+            stream_report, handle.cache_dir, response_dict, fmt
+        )
+        name = os.path.basename(path)
+        return StreamingResponse(
+            chunks,
+            media_type=FORMATS[fmt][1],
+            headers={"Content-Location": f"/repos/{handle.repo_id}/reports/{name}"},
+        )
 
-    # Default line range
-    line_start = request.line_start
-    line_end = request.line_end
-    if line_start is None or line_end is None:
-        line_start = 1
-        line_end = 200
+    # Render and save
+    with stage("report"):
+        content, file_path = await run_in_threadpool(
+            save_report, handle.cache_dir, response_dict, fmt
+        )
 
-    # Collect evidence
-    evidence_list = collect_evidence(
-        request.repo_path, rel_path, line_start, line_end, request.max_commits
+    return ReportResponse(
+        markdown=content,
+        saved_to=file_path,
+        format=fmt,
+        report_id=os.path.basename(file_path),
     )
 
-    # Get metrics
-    metrics_dict = file_metrics(request.repo_path, rel_path)
 
-    # Build timeline
-    timeline_list = build_timeline(evidence_list)
+@router.get("/report")
+async def report_get_endpoint(request: Annotated[ReportRequest, Query()], http_request: Request):
+    """
+    Render a report; cacheable variant of POST /report.
 
-    # Infer intent
-    intent_dict = infer_intent(evidence_list, timeline_list, metrics_dict)
+    The ETag covers the cache key and the format; a matching If-None-Match
+    is answered with 304.
 
-    # Generate answer
-    answer_obj = generate_answer(
-        request.question,
-        evidence_list,
-        timeline_list,
-        metrics_dict,
-        intent_dict.__dict__,
-        request.use_llm,
-    )
+    Args:
+        request: ReportRequest fields as query parameters (stream is ignored)
 
-    # Build response dict for markdown generation
+    Returns:
+        The rendered report with the media type of its format (gzip or
+        brotli encoded if accepted), or 304
+    """
+    target = _analysis_target(request)
+    handle, _, rel_path, line_start, line_end, rev, key = target
+    fmt = request.format
+    headers = _validators(make_etag(key, fmt), rev)
+    not_modified = _not_modified(http_request, "report", headers)
+    if not_modified is not None:
+        return not_modified
+
+    analysis, _ = await _cached_analysis(request, http_request, target)
+    if analysis.get("incomplete"):
+        headers["Cache-Control"] = NO_STORE
     response_dict = {
         "file_path": rel_path,
         "line_start": line_start,
         "line_end": line_end,
         "question": request.question,
-        "evidence": [e.model_dump() for e in evidence_list],
-        "timeline": [t.model_dump() for t in timeline_list],
-        "metrics": metrics_dict,
-        "intent": intent_dict.model_dump(),
-        "answer": answer_obj.model_dump(),
+        **analysis,
     }
+    with stage("report"):
+        content, file_path = await run_in_threadpool(
+            save_report, handle.cache_dir, response_dict, fmt
+        )
+    name = os.path.basename(file_path)
+    headers["Content-Location"] = f"/repos/{handle.repo_id}/reports/{name}"
+    return _encoded_response(http_request, "report", content.encode(), FORMATS[fmt][1], headers)
+
+
+@router.get("/repos/{repo_id}/reports/{report_id}")
+async def get_report_endpoint(repo_id: str, report_id: str):
+    """
+    Serve a stored report.
+
+    Args:
+        repo_id: Registered repository id
+        report_id: Report file name from POST /report
+
+    Returns:
+        The report file, with the media type of its format
+    """
+    handle = get_repo_registry().get(repo_id)
+    if handle is None:
+        raise HTTPException(status_code=404, detail="Unknown repo_id")
+    try:
+        path = report_path(handle.cache_dir, report_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Unknown report")
+    media_type = next(
+        (media for ext, media in FORMATS.values() if report_id.endswith(f".{ext}")),
+        "application/octet-stream",
+    )
+    return FileResponse(path, media_type=media_type)
+
+
+@router.post("/jobs", response_model=JobInfo, status_code=202)
+async def submit_job_endpoint(request: JobRequest):
+    """
+    Queue analyze, report or hotspot work and return at once.
+
+    Args:
+        request: JobRequest
+
+    Returns:
+        JobInfo with the job_id to poll
+    """
+    params = request.model_dump(exclude={"kind"}, exclude_none=True)
+    # Reject bad repos, revisions and files now rather than in the job
+    try:
+        await run_in_threadpool(resolve_target, params)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown repo_id")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        job = get_job_manager().submit(request.kind, params)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return JobInfo(**job.to_dict())
 
-    # Generate markdown and save
-    markdown, file_path = generate_markdown_and_save(request.repo_path, response_dict)
 
-    return ReportResponse(markdown=markdown, saved_to=file_path)
+@router.get("/jobs", response_model=JobListResponse)
+async def list_jobs_endpoint():
+    """
+    List known jobs.
+
+    Returns:
+        JobListResponse, newest first
+    """
+    return JobListResponse(jobs=[JobInfo(**j.to_dict()) for j in get_job_manager().jobs()])
+
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job_endpoint(job_id: str):
+    """
+    Get a job's status and progress.
+
+    Args:
+        job_id: Job id from POST /jobs
+
+    Returns:
+        JobInfo
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobInfo(**job.to_dict())
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result_endpoint(job_id: str):
+    """
+    Get a finished job's result.
+
+    Args:
+        job_id: Job id from POST /jobs
+
+    Returns:
+        The result (AnalyzeResponse, ReportResponse or hotspot list) when
+        done; 202 with the JobInfo while it is still queued or running
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in ("queued", "running"):
+        return JSONResponse(status_code=202, content=job.to_dict())
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=job.error or job.status)
+    result = await run_in_threadpool(job.load_result)
+    if result is None:
+        raise HTTPException(status_code=410, detail="Result is no longer cached")
+    return result
+
+
+@router.delete("/jobs/{job_id}", response_model=JobInfo)
+async def cancel_job_endpoint(job_id: str):
+    """
+    Cancel a queued or running job.
+
+    Args:
+        job_id: Job id from POST /jobs
+
+    Returns:
+        JobInfo
+    """
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobInfo(**job.to_dict())
+
+
+@router.get("/debug/admission")
+async def admission_stats_endpoint():
+    """
+    Current admission queues and recent latency per priority class.
+
+    Returns:
+        Dictionary with active and queued work overall, per repository and
+        per class, and whether interactive latency is over its target
+    """
+    return get_admission_controller().stats()
+
+
+@router.get("/debug/traces")
+async def list_traces_endpoint():
+    """
+    List recently traced requests.
+
+    Returns:
+        Dictionary with trace summaries, newest first
+    """
+    return {"traces": list_traces()}
+
+
+@router.get("/debug/traces/{request_id}")
+async def get_trace_endpoint(request_id: str):
+    """
+    Get the full trace for a request.
+
+    Args:
+        request_id: Request id from the X-Request-Id response header
+
+    Returns:
+        Trace with git calls, stages and optional profile
+    """
+    trace = get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
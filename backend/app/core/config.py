@@ -4,15 +4,79 @@ import os
 from functools import lru_cache
 
 
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 class Settings:
     """Application settings from environment variables."""
 
     openai_api_key: str | None = None
     repolens_cache_dir: str = ".repolens_cache"
+    cache_backend: str = "json"
+    trace_all: bool = False
+    trace_buffer_size: int = 200
+    record_file: str | None = None
+    record_salt: str = ""
+    max_repos: int = 64
+    repo_memory_budget_mb: int = 256
+    repo_idle_seconds: float = 3600.0
+    global_concurrency: int = 8
+    repo_concurrency: int = 4
+    max_queue_depth: int = 256
+    max_repo_queue_depth: int = 64
+    background_concurrency: int = 0
+    interactive_target_ms: float = 0.0
+    repo_weights: str = ""
+    commit_cache_size: int = 4096
+    commit_cache_file: str | None = None
+    negative_cache_ttl: float = 30.0
+    watch: str = "off"
+    watch_poll_seconds: float = 1.0
+    job_workers: int = 2
+    job_max_pending: int = 100
+    job_git_timeout: float = 300.0
+    job_journal: str | None = None
+    bulk_workers: int = 4
+    compress_min_bytes: int = 1024
+    max_file_bytes: int = 1048576
+    max_file_lines: int = 20000
 
     def __init__(self):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.repolens_cache_dir = os.getenv("REPOLENS_CACHE_DIR", ".repolens_cache")
+        self.cache_backend = os.getenv("REPOLENS_CACHE_BACKEND", "json").strip().lower()
+        self.trace_all = _env_bool("REPOLENS_TRACE")
+        self.trace_buffer_size = int(os.getenv("REPOLENS_TRACE_BUFFER", "200"))
+        self.record_file = os.getenv("REPOLENS_RECORD_FILE") or None
+        self.record_salt = os.getenv("REPOLENS_RECORD_SALT", "")
+        self.max_repos = int(os.getenv("REPOLENS_MAX_REPOS", "64"))
+        self.repo_memory_budget_mb = int(os.getenv("REPOLENS_REPO_MEMORY_MB", "256"))
+        self.repo_idle_seconds = float(os.getenv("REPOLENS_REPO_IDLE_SECONDS", "3600"))
+        self.global_concurrency = int(os.getenv("REPOLENS_GLOBAL_CONCURRENCY", "8"))
+        self.repo_concurrency = int(os.getenv("REPOLENS_REPO_CONCURRENCY", "4"))
+        self.max_queue_depth = int(os.getenv("REPOLENS_MAX_QUEUE_DEPTH", "256"))
+        self.max_repo_queue_depth = int(os.getenv("REPOLENS_MAX_REPO_QUEUE_DEPTH", "64"))
+        self.background_concurrency = int(os.getenv("REPOLENS_BACKGROUND_CONCURRENCY", "0"))
+        self.interactive_target_ms = float(os.getenv("REPOLENS_INTERACTIVE_TARGET_MS", "0"))
+        self.repo_weights = os.getenv("REPOLENS_REPO_WEIGHTS", "")
+        self.commit_cache_size = int(os.getenv("REPOLENS_COMMIT_CACHE_SIZE", "4096"))
+        self.commit_cache_file = os.getenv("REPOLENS_COMMIT_CACHE_FILE") or None
+        self.negative_cache_ttl = float(os.getenv("REPOLENS_NEGATIVE_CACHE_TTL", "30"))
+        self.watch = os.getenv("REPOLENS_WATCH", "off").strip().lower()
+        self.watch_poll_seconds = float(os.getenv("REPOLENS_WATCH_POLL_SECONDS", "1.0"))
+        self.job_workers = int(os.getenv("REPOLENS_JOB_WORKERS", "2"))
+        self.job_max_pending = int(os.getenv("REPOLENS_JOB_MAX_PENDING", "100"))
+        self.job_git_timeout = float(os.getenv("REPOLENS_JOB_GIT_TIMEOUT", "300"))
+        self.job_journal = os.getenv("REPOLENS_JOB_JOURNAL") or None
+        self.bulk_workers = int(os.getenv("REPOLENS_BULK_WORKERS", "4"))
+        self.compress_min_bytes = int(os.getenv("REPOLENS_COMPRESS_MIN_BYTES", "1024"))
+        self.max_file_bytes = int(os.getenv("REPOLENS_MAX_FILE_BYTES", "1048576"))
+        self.max_file_lines = int(os.getenv("REPOLENS_MAX_FILE_LINES", "20000"))
 
 
 @lru_cache(maxsize=1)
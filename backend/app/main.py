@@ -1,19 +1,82 @@
 """FastAPI application setup."""
 
-from fastapi import FastAPI
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 import os
 
 from .api import router
+from .services.telemetry import (
+    REGISTRY,
+    HTTP_SECONDS,
+    begin_request_timings,
+    format_server_timing,
+)
+from .services.tracing import trace_mode, start_trace, finish_trace
+from .services.jobs import get_job_manager
+from .core.config import get_settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Resume journaled jobs on startup; leave unfinished ones journaled on shutdown."""
+    if get_settings().job_journal:
+        get_job_manager()
+    yield
+    if get_job_manager.cache_info().currsize:
+        get_job_manager().shutdown(wait=False)
+
 
 # Create app
-app = FastAPI(title="RepoLens", description="Repository analysis backend")
+app = FastAPI(title="RepoLens", description="Repository analysis backend", lifespan=lifespan)
 
 # Include router
 app.include_router(router)
 
 
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """Collect per-stage timings and expose them as a Server-Timing header."""
+    timings = begin_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    timings.append(("total", elapsed))
+    response.headers["Server-Timing"] = format_server_timing(timings)
+
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    HTTP_SECONDS.observe(
+        elapsed, method=request.method, path=path, status=str(response.status_code)
+    )
+    return response
+
+
+@app.middleware("http")
+async def trace_middleware(request: Request, call_next):
+    """Record an opt-in trace of git calls and stages for this request."""
+    mode = trace_mode(request.headers.get("X-RepoLens-Trace"))
+    if mode is None:
+        return await call_next(request)
+
+    request_id = request.headers.get("X-Request-Id") or uuid.uuid4().hex
+    trace = start_trace(
+        request_id, request.method, request.url.path, profile=(mode == "profile")
+    )
+    start = time.perf_counter()
+    response = await call_next(request)
+    finish_trace(trace, response.status_code, time.perf_counter() - start)
+
+    response.headers["X-Request-Id"] = request_id
+    response.headers["X-RepoLens-Trace-Url"] = f"/debug/traces/{request_id}"
+    return response
+
+
 # Serve static files
 static_dir = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_dir):
@@ -33,3 +96,11 @@ async def root():
 async def health():
     """Health check endpoint."""
     return {"ok": True}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,7 +1,7 @@
 """Pydantic models for RepoLens."""
 
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Literal, Optional
 
 
 class RepoValidateRequest(BaseModel):
@@ -17,6 +17,24 @@ class RepoValidateResponse(BaseModel):
     head: str | None = None
 
 
+class RepoInfo(BaseModel):
+    """A registered repository."""
+
+    repo_id: str
+    repo_path: str
+    git_dir: str
+    head: str | None = None
+    registered_at: float
+    idle_seconds: float
+    approx_bytes: int
+
+
+class RepoListResponse(BaseModel):
+    """Registered repositories."""
+
+    repos: list[RepoInfo]
+
+
 class CommitEvidence(BaseModel):
     """Evidence from a single commit."""
 
@@ -24,7 +42,7 @@ class CommitEvidence(BaseModel):
     author: str
     date: str
     subject: str
-    diff_snippet: str
+    diff_snippet: Optional[str] = None
 
 
 class TimelineItem(BaseModel):
@@ -88,40 +106,133 @@ class CacheInfo(BaseModel):
 class AnalyzeRequest(BaseModel):
     """Request to analyze a file."""
 
-    repo_path: str
+    repo_path: Optional[str] = None
+    repo_id: Optional[str] = None
     file_path: str
     line_start: Optional[int] = None
     line_end: Optional[int] = None
     question: Optional[str] = None
     max_commits: int = 10
     use_llm: bool = False
+    deadline_ms: Optional[int] = None
+    rev: Optional[str] = None
+    # Both modes read the file as committed at rev (default HEAD), never the
+    # working tree; range mode without line_end runs to the file's last line
+    history_mode: Literal["blame", "range"] = "blame"
+    fields: Optional[
+        list[Literal["evidence", "diff_snippet", "timeline", "metrics", "intent", "answer"]]
+    ] = None
+
+    @field_validator("fields", mode="before")
+    @classmethod
+    def _split_fields(cls, value):
+        # Query strings may pass fields=metrics,intent
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list):
+            value = [f.strip() for v in value for f in str(v).split(",") if f.strip()]
+            if not value:
+                raise ValueError("fields must name at least one field")
+        return value
+
+    @model_validator(mode="after")
+    def _require_repo(self):
+        if not self.repo_path and not self.repo_id:
+            raise ValueError("Either repo_path or repo_id is required")
+        return self
 
 
 class AnalyzeResponse(BaseModel):
-    """Response from analysis."""
+    """Response from analysis; parts not selected by ``fields`` are omitted."""
 
-    evidence: list[CommitEvidence]
-    timeline: list[TimelineItem]
-    metrics: Metrics
-    intent: Intent
-    answer: Answer
+    evidence: Optional[list[CommitEvidence]] = None
+    timeline: Optional[list[TimelineItem]] = None
+    metrics: Optional[Metrics] = None
+    intent: Optional[Intent] = None
+    answer: Optional[Answer] = None
     cache: CacheInfo
+    rev: Optional[str] = None
+    skipped: Optional[str] = None
+    incomplete: Optional[bool] = None
 
 
 class ReportRequest(BaseModel):
     """Request to generate a report."""
 
-    repo_path: str
+    repo_path: Optional[str] = None
+    repo_id: Optional[str] = None
     file_path: str
     line_start: Optional[int] = None
     line_end: Optional[int] = None
     question: Optional[str] = None
     max_commits: int = 10
     use_llm: bool = False
+    deadline_ms: Optional[int] = None
+    rev: Optional[str] = None
+    history_mode: Literal["blame", "range"] = "blame"  # as in AnalyzeRequest
+    format: Literal["md", "html", "json"] = "md"
+    stream: bool = False
+
+    @model_validator(mode="after")
+    def _require_repo(self):
+        if not self.repo_path and not self.repo_id:
+            raise ValueError("Either repo_path or repo_id is required")
+        return self
 
 
 class ReportResponse(BaseModel):
     """Response from report generation."""
 
-    markdown: str
+    markdown: str  # the rendered report, in the requested format
     saved_to: str
+    format: str = "md"
+    report_id: Optional[str] = None
+
+
+class JobRequest(BaseModel):
+    """Request to run analyze, report, hotspot or bulk report work asynchronously."""
+
+    kind: Literal["analyze", "report", "hotspots", "bulk_report"]
+    repo_path: Optional[str] = None
+    repo_id: Optional[str] = None
+    file_path: Optional[str] = None
+    line_start: Optional[int] = None
+    line_end: Optional[int] = None
+    question: Optional[str] = None
+    max_commits: int = 10
+    use_llm: bool = False
+    rev: Optional[str] = None
+    history_mode: Literal["blame", "range"] = "blame"
+    format: Literal["md", "html", "json"] = "md"  # report: output format
+    limit: int = 20  # hotspots: files to return
+    history: int = 1000  # hotspots: commits to scan
+    pattern: Optional[str] = None  # bulk_report: path prefix or glob
+    workers: Optional[int] = None  # bulk_report: files analyzed in parallel
+    priority: Literal["batch", "prefetch"] = "batch"
+
+    @model_validator(mode="after")
+    def _require_target(self):
+        if not self.repo_path and not self.repo_id:
+            raise ValueError("Either repo_path or repo_id is required")
+        if self.kind in ("analyze", "report") and not self.file_path:
+            raise ValueError(f"file_path is required for {self.kind} jobs")
+        return self
+
+
+class JobInfo(BaseModel):
+    """State of an asynchronous job."""
+
+    job_id: str
+    kind: str
+    status: str  # "queued", "running", "done", "failed" or "cancelled"
+    progress: dict = {}
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+
+
+class JobListResponse(BaseModel):
+    """Known jobs, newest first."""
+
+    jobs: list[JobInfo]
@@ -0,0 +1,563 @@
+"""Admission control for git-heavy work: bounded concurrency and priority scheduling.
+
+Work is admitted in three priority classes:
+
+    interactive: API requests a client is waiting on
+    batch:       background jobs
+    prefetch:    speculative work nobody is waiting on yet
+
+A class is only dispatched when no higher class is waiting for the freed
+slot. Background classes (batch, prefetch) share at most
+``background_limit`` slots, and are held back entirely while interactive
+latency is above target. Within a class, repositories share slots by
+weighted fair queuing, so a burst for one repository cannot starve the
+others. Long-running background work calls ``yield_to_interactive()``
+between steps to hand its slot to a waiting interactive request.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from ..core.config import get_settings
+from .cancellation import OperationCancelled, current_token
+from .telemetry import REGISTRY
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PREFETCH = "prefetch"
+PRIORITIES = (INTERACTIVE, BATCH, PREFETCH)
+
+ADMISSION_WAIT = REGISTRY.histogram(
+    "repolens_admission_wait_seconds",
+    "Time spent queued before git-heavy work starts.",
+    ["priority"],
+)
+ADMISSION_SERVICE = REGISTRY.histogram(
+    "repolens_admission_service_seconds", "Time spent holding a slot.", ["priority"]
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "repolens_admission_rejected_total", "Work rejected because a queue was full.", ["scope"]
+)
+ADMISSION_QUEUED = REGISTRY.gauge(
+    "repolens_admission_queued", "Work items waiting for a slot.", ["priority"]
+)
+ADMISSION_ACTIVE = REGISTRY.gauge(
+    "repolens_admission_active", "Work items holding a slot.", ["priority"]
+)
+ADMISSION_YIELDS = REGISTRY.counter(
+    "repolens_admission_yields_total",
+    "Background work that gave up its slot to interactive requests.",
+    ["priority"],
+)
+
+# Interactive latency older than this no longer holds background work back
+_LATENCY_WINDOW_SEC = 5.0
+# How often waiting background work re-checks whether it may start
+_BACKGROUND_POLL_SEC = 0.25
+
+
+class AdmissionRejected(Exception):
+    """Raised when a queue is full; carries a Retry-After hint in seconds."""
+
+    def __init__(self, scope: str, retry_after: int):
+        self.scope = scope
+        self.retry_after = retry_after
+        super().__init__(f"{scope} queue is full, retry after {retry_after}s")
+
+
+class _Ticket:
+    """A queued request for a slot, grantable from any thread."""
+
+    def __init__(
+        self,
+        repo: str,
+        priority: str = INTERACTIVE,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        self.repo = repo
+        self.priority = priority
+        self.enqueued_at = time.perf_counter()
+        self.wait_seconds = 0.0
+        self.granted = False
+        self._event = threading.Event()
+        self._loop = loop
+        self._future = loop.create_future() if loop is not None else None
+
+    def grant(self) -> None:
+        self.granted = True
+        self._event.set()
+        if self._future is not None:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def requeue(self) -> None:
+        """Reset a released ticket so it can wait for a slot again (sync only)."""
+        self.granted = False
+        self.enqueued_at = time.perf_counter()
+        self._event.clear()
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(True)
+
+    def wait(self, timeout: float | None) -> bool:
+        return self._event.wait(timeout)
+
+    async def wait_async(self) -> None:
+        await self._future
+
+
+class _ClassStats:
+    """Running queue and latency figures for one priority class."""
+
+    def __init__(self):
+        self.admitted = 0
+        self.yields = 0
+        self.avg_wait = 0.0
+        self.avg_service = 0.0
+        # Wait plus service, the latency a client of this class sees
+        self.avg_latency = 0.0
+        self.last_completed = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "yields": self.yields,
+            "avg_wait_seconds": round(self.avg_wait, 4),
+            "avg_service_seconds": round(self.avg_service, 4),
+            "avg_latency_seconds": round(self.avg_latency, 4),
+        }
+
+
+def _ewma(average: float, sample: float, first: bool) -> float:
+    return sample if first else 0.8 * average + 0.2 * sample
+
+
+class AdmissionController:
+    """
+    Grants slots for git-heavy work by priority class.
+
+    At most ``global_limit`` items run at once, and at most ``repo_limit`` per
+    repository. Waiting items beyond ``max_queue_per_repo`` (per repository)
+    or ``max_queue`` (overall) are rejected immediately. Background classes
+    hold at most ``background_limit`` slots, none while the interactive
+    average latency exceeds ``interactive_target`` seconds (0 disables the
+    target).
+    """
+
+    def __init__(
+        self,
+        global_limit: int,
+        repo_limit: int,
+        max_queue: int,
+        max_queue_per_repo: int,
+        background_limit: int | None = None,
+        interactive_target: float = 0.0,
+        repo_weights: dict[str, float] | None = None,
+    ):
+        self.global_limit = max(1, global_limit)
+        self.repo_limit = max(1, repo_limit)
+        self.max_queue = max_queue
+        self.max_queue_per_repo = max_queue_per_repo
+        if background_limit is None or background_limit <= 0:
+            # Keep a slot free for interactive requests where there is room to
+            background_limit = max(1, self.global_limit - 1)
+        self.background_limit = min(background_limit, self.global_limit)
+        self.interactive_target = interactive_target
+        self._weights = dict(repo_weights or {})
+        self._lock = threading.Lock()
+        self._queues: dict[str, deque[_Ticket]] = {p: deque() for p in PRIORITIES}
+        self._active = 0
+        self._active_by_class: dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._active_by_repo: dict[str, int] = {}
+        self._queued_by_repo: dict[str, int] = {}
+        # Weighted fair queuing: per-class virtual finish time of each repo,
+        # and the class's virtual clock (the last start tag dispatched)
+        self._vtime: dict[str, dict[str, float]] = {p: {} for p in PRIORITIES}
+        self._vclock: dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._class_stats = {p: _ClassStats() for p in PRIORITIES}
+        # Exponentially weighted service time, for Retry-After estimates
+        self._avg_service = 0.5
+
+    def set_weight(self, repo: str, weight: float) -> None:
+        """
+        Set a repository's share of slots relative to others in the same class.
+
+        Args:
+            repo: Repository key (repo_id)
+            weight: Relative weight (default 1.0)
+        """
+        with self._lock:
+            self._weights[repo] = max(weight, 0.01)
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _interactive_over_target(self) -> bool:
+        """True while interactive requests are slower than the target."""
+        if self.interactive_target <= 0:
+            return False
+        now = time.perf_counter()
+        waiting = self._queues[INTERACTIVE]
+        if waiting and now - waiting[0].enqueued_at > self.interactive_target:
+            return True
+        stats = self._class_stats[INTERACTIVE]
+        return (
+            now - stats.last_completed < _LATENCY_WINDOW_SEC
+            and stats.avg_latency > self.interactive_target
+        )
+
+    def _has_capacity(self, ticket: _Ticket) -> bool:
+        if self._active >= self.global_limit:
+            return False
+        if self._active_by_repo.get(ticket.repo, 0) >= self.repo_limit:
+            return False
+        if ticket.priority == INTERACTIVE:
+            return True
+        background = self._active - self._active_by_class[INTERACTIVE]
+        return background < self.background_limit and not self._interactive_over_target()
+
+    def _start(self, ticket: _Ticket) -> None:
+        self._active += 1
+        self._active_by_class[ticket.priority] += 1
+        self._active_by_repo[ticket.repo] = self._active_by_repo.get(ticket.repo, 0) + 1
+        # Advance the repo's virtual time by its weighted cost of one slot
+        vtime = self._vtime[ticket.priority]
+        start_tag = max(vtime.get(ticket.repo, 0.0), self._vclock[ticket.priority])
+        vtime[ticket.repo] = start_tag + 1.0 / self._weights.get(ticket.repo, 1.0)
+        self._vclock[ticket.priority] = start_tag
+        ticket.wait_seconds = time.perf_counter() - ticket.enqueued_at
+        stats = self._class_stats[ticket.priority]
+        stats.avg_wait = _ewma(stats.avg_wait, ticket.wait_seconds, not stats.admitted)
+        stats.admitted += 1
+        ADMISSION_WAIT.observe(ticket.wait_seconds, priority=ticket.priority)
+        ticket.grant()
+
+    def _dequeue(self, ticket: _Ticket) -> None:
+        self._queues[ticket.priority].remove(ticket)
+        self._queued_by_repo[ticket.repo] -= 1
+        if not self._queued_by_repo[ticket.repo]:
+            del self._queued_by_repo[ticket.repo]
+
+    def _pick(self, priority: str) -> _Ticket | None:
+        """Oldest eligible ticket of the repo with the smallest virtual time."""
+        vtime = self._vtime[priority]
+        best = None
+        seen: set[str] = set()
+        for ticket in self._queues[priority]:
+            if ticket.repo in seen:
+                continue
+            seen.add(ticket.repo)
+            if not self._has_capacity(ticket):
+                continue
+            tag = max(vtime.get(ticket.repo, 0.0), self._vclock[priority])
+            if best is None or tag < best[0]:
+                best = (tag, ticket)
+        return best[1] if best else None
+
+    def _dispatch(self) -> None:
+        """Grant slots to queued tickets that fit, highest class first."""
+        for priority in PRIORITIES:
+            while self._active < self.global_limit:
+                ticket = self._pick(priority)
+                if ticket is None:
+                    break
+                self._dequeue(ticket)
+                self._start(ticket)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        for priority in PRIORITIES:
+            ADMISSION_QUEUED.set(len(self._queues[priority]), priority=priority)
+            ADMISSION_ACTIVE.set(self._active_by_class[priority], priority=priority)
+
+    def _retry_after(self, depth: int) -> int:
+        return max(1, math.ceil(depth * self._avg_service / self.global_limit))
+
+    def _must_queue(self, ticket: _Ticket) -> bool:
+        """True if the ticket cannot start now (no slot, or same or higher class waiting)."""
+        ahead = PRIORITIES[: PRIORITIES.index(ticket.priority) + 1]
+        return any(self._queues[p] for p in ahead) or not self._has_capacity(ticket)
+
+    def _push(self, ticket: _Ticket, front: bool = False) -> None:
+        if front:
+            self._queues[ticket.priority].appendleft(ticket)
+        else:
+            self._queues[ticket.priority].append(ticket)
+        self._queued_by_repo[ticket.repo] = self._queued_by_repo.get(ticket.repo, 0) + 1
+        self._dispatch()
+
+    def _enqueue(
+        self, repo: str, priority: str, loop: asyncio.AbstractEventLoop | None
+    ) -> _Ticket:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        ticket = _Ticket(repo, priority, loop)
+        with self._lock:
+            if not self._must_queue(ticket):
+                self._start(ticket)
+                self._update_gauges()
+                return ticket
+            repo_depth = self._queued_by_repo.get(repo, 0)
+            if repo_depth >= self.max_queue_per_repo:
+                ADMISSION_REJECTED.inc(scope="repo")
+                raise AdmissionRejected("repo", self._retry_after(repo_depth))
+            if self._queued() >= self.max_queue:
+                ADMISSION_REJECTED.inc(scope="global")
+                raise AdmissionRejected("global", self._retry_after(self._queued()))
+            self._push(ticket)
+        return ticket
+
+    def _withdraw(self, ticket: _Ticket) -> bool:
+        """Remove a waiting ticket; False if it was granted meanwhile."""
+        with self._lock:
+            if ticket.granted:
+                return False
+            self._dequeue(ticket)
+            self._update_gauges()
+            return True
+
+    def _release_locked(self, ticket: _Ticket, service_seconds: float) -> None:
+        ticket.granted = False
+        self._active -= 1
+        self._active_by_class[ticket.priority] -= 1
+        remaining = self._active_by_repo.get(ticket.repo, 1) - 1
+        if remaining:
+            self._active_by_repo[ticket.repo] = remaining
+        else:
+            self._active_by_repo.pop(ticket.repo, None)
+        vtime = self._vtime[ticket.priority]
+        if (
+            ticket.repo not in self._active_by_repo
+            and ticket.repo not in self._queued_by_repo
+            and vtime.get(ticket.repo, 0.0) <= self._vclock[ticket.priority]
+        ):
+            # An idle repo at or behind the clock restarts from it anyway
+            vtime.pop(ticket.repo, None)
+        if service_seconds > 0:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * service_seconds
+            stats = self._class_stats[ticket.priority]
+            first = stats.last_completed == 0.0
+            stats.avg_service = _ewma(stats.avg_service, service_seconds, first)
+            stats.avg_latency = _ewma(
+                stats.avg_latency, ticket.wait_seconds + service_seconds, first
+            )
+            stats.last_completed = time.perf_counter()
+            ADMISSION_SERVICE.observe(service_seconds, priority=ticket.priority)
+
+    def release(self, ticket: _Ticket, service_seconds: float) -> None:
+        """Return a slot and wake the next eligible waiter."""
+        with self._lock:
+            if not ticket.granted:
+                return
+            self._release_locked(ticket, service_seconds)
+            self._dispatch()
+
+    def _should_yield(self, ticket: _Ticket) -> bool:
+        if ticket.priority == INTERACTIVE or not ticket.granted:
+            return False
+        if self._interactive_over_target():
+            return True
+        # Does giving up this slot let a waiting interactive request start?
+        for waiting in self._queues[INTERACTIVE]:
+            repo_active = self._active_by_repo.get(waiting.repo, 0)
+            if waiting.repo == ticket.repo:
+                repo_active -= 1
+            if repo_active < self.repo_limit:
+                return True
+        return False
+
+    def _wait(self, ticket: _Ticket, timeout: float | None) -> bool:
+        """
+        Block until the ticket is granted.
+
+        Background tickets wake periodically to re-check the interactive
+        latency target (which can clear without any slot being released) and
+        the current cancel token.
+
+        Returns:
+            False if the timeout elapsed first
+        """
+        if ticket.priority == INTERACTIVE:
+            return ticket.wait(timeout)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        token = current_token()
+        while True:
+            step = _BACKGROUND_POLL_SEC
+            if deadline is not None:
+                step = min(step, max(0.0, deadline - time.perf_counter()))
+            if ticket.wait(step):
+                return True
+            if token is not None and token.cancelled:
+                if self._withdraw(ticket):
+                    raise OperationCancelled(token.reason)
+                return True
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            with self._lock:
+                self._dispatch()
+
+    def yield_slot(self, ticket: _Ticket, service_seconds: float = 0.0) -> bool:
+        """
+        Give a background ticket's slot to interactive work if it needs it.
+
+        Blocks until the ticket is granted a slot again.
+
+        Args:
+            ticket: Granted background ticket
+            service_seconds: Time the slot was held so far
+
+        Returns:
+            True if the slot was given up (and regained)
+        """
+        with self._lock:
+            if not self._should_yield(ticket):
+                return False
+            self._release_locked(ticket, service_seconds)
+            self._class_stats[ticket.priority].yields += 1
+            ticket.requeue()
+            # Resume ahead of background work that has not started yet
+            self._push(ticket, front=True)
+        ADMISSION_YIELDS.inc(priority=ticket.priority)
+        self._wait(ticket, None)
+        return True
+
+    @contextmanager
+    def slot(self, repo: str, timeout: float | None = None, priority: str = INTERACTIVE):
+        """
+        Hold a slot for the enclosed block (blocking, for worker threads).
+
+        Args:
+            repo: Repository key (repo_id)
+            timeout: Maximum seconds to wait for a slot
+            priority: Priority class (interactive, batch or prefetch)
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        ticket = self._enqueue(repo, priority, None)
+        if not self._wait(ticket, timeout) and self._withdraw(ticket):
+            raise AdmissionRejected("timeout", self._retry_after(self._queued()))
+        held = _HeldSlot(self, ticket)
+        reset = _current_slot.set(held)
+        try:
+            yield
+        finally:
+            _current_slot.reset(reset)
+            self.release(ticket, time.perf_counter() - held.started)
+
+    @asynccontextmanager
+    async def async_slot(self, repo: str, priority: str = INTERACTIVE):
+        """
+        Hold a slot for the enclosed block without blocking the event loop.
+
+        Args:
+            repo: Repository key (repo_id)
+            priority: Priority class (interactive, batch or prefetch)
+
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        ticket = self._enqueue(repo, priority, asyncio.get_running_loop())
+        if not ticket.granted:
+            try:
+                await ticket.wait_async()
+            except asyncio.CancelledError:
+                if not self._withdraw(ticket):
+                    self.release(ticket, 0.0)
+                raise
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(ticket, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        """Current queue and slot usage, overall and per priority class."""
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": self._queued(),
+                "active_by_repo": dict(self._active_by_repo),
+                "queued_by_repo": dict(self._queued_by_repo),
+                "interactive_over_target": self._interactive_over_target(),
+                "classes": {
+                    p: {
+                        "active": self._active_by_class[p],
+                        "queued": len(self._queues[p]),
+                        **self._class_stats[p].as_dict(),
+                    }
+                    for p in PRIORITIES
+                },
+            }
+
+
+class _HeldSlot:
+    """A granted sync slot, as seen by the code running inside it."""
+
+    def __init__(self, controller: AdmissionController, ticket: _Ticket):
+        self.controller = controller
+        self.ticket = ticket
+        self.started = time.perf_counter()
+
+
+_current_slot: ContextVar[_HeldSlot | None] = ContextVar("repolens_admission_slot", default=None)
+
+
+def yield_to_interactive() -> bool:
+    """
+    Let interactive requests go first if the current slot is background work.
+
+    Safe to call from anywhere; does nothing outside a background slot.
+
+    Returns:
+        True if the slot was given up and regained
+    """
+    held = _current_slot.get()
+    if held is None:
+        return False
+    service = time.perf_counter() - held.started
+    if not held.controller.yield_slot(held.ticket, service):
+        return False
+    held.started = time.perf_counter()
+    return True
+
+
+def parse_repo_weights(spec: str) -> dict[str, float]:
+    """
+    Parse REPOLENS_REPO_WEIGHTS ("path=weight,path=weight") into repo_id weights.
+
+    Args:
+        spec: Comma-separated path=weight pairs
+
+    Returns:
+        Mapping of repo_id to weight
+    """
+    from .repo_registry import repo_id_for
+
+    weights = {}
+    for item in spec.split(","):
+        path, sep, weight = item.strip().rpartition("=")
+        if sep and path:
+            weights[repo_id_for(path)] = max(float(weight), 0.01)
+    return weights
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller() -> AdmissionController:
+    """Get the process-wide admission controller."""
+    settings = get_settings()
+    return AdmissionController(
+        global_limit=settings.global_concurrency,
+        repo_limit=settings.repo_concurrency,
+        max_queue=settings.max_queue_depth,
+        max_queue_per_repo=settings.max_repo_queue_depth,
+        background_limit=settings.background_concurrency,
+        interactive_target=settings.interactive_target_ms / 1000.0,
+        repo_weights=parse_repo_weights(settings.repo_weights),
+    )
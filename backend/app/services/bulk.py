@@ -0,0 +1,217 @@
+"""Bulk reports for every tracked file under a directory or glob.
+
+The file list comes from one ``git ls-files`` (or ``ls-tree`` at a revision)
+call. Files are analyzed on a bounded thread pool, so they share the
+process-wide commit cache and rename map as well as the on-disk analysis
+cache (a bulk run warms the cache for later /analyze requests, and vice
+versa). Each file goes through admission control on its own, in the job's
+priority class, so interactive requests are served between files.
+
+Completed files are recorded in a manifest in the analysis cache. Running
+the same bulk report again (or resuming the job after a restart) skips them
+and only retries the rest.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+
+from ..core.config import get_settings
+from .admission import BATCH, get_admission_controller
+from .cache import cache_get, cache_set
+from .cancellation import OperationCancelled
+from .git_runner import run_git
+from .incremental import analyze_cached
+from .progress import progress_scope, report_progress
+from .report import save_index, save_report
+from .targets import DEFAULT_LINE_RANGE, analysis_key
+from .telemetry import REGISTRY
+
+BULK_FILES = REGISTRY.counter(
+    "repolens_bulk_files_total",
+    "Files processed by bulk reports (resumed = done by an earlier run).",
+    ["result"],
+)
+
+# Characters that make a pattern a glob rather than a path prefix
+_GLOB_CHARS = "*?["
+# Save the manifest at most this often while files complete
+_SAVE_INTERVAL_SEC = 2.0
+
+
+def list_tracked_files(
+    repo_path: str, pattern: str | None, rev: str | None = None
+) -> list[str]:
+    """
+    Tracked files under a path prefix or matching a glob.
+
+    Args:
+        repo_path: Root of the git repository
+        pattern: Directory/path prefix (e.g. "src/") or glob (e.g.
+            "src/**/*.py"); None or "" for every file
+        rev: Commit to list (default: the index, i.e. the working tree)
+
+    Returns:
+        Sorted relative paths
+    """
+    pathspec = []
+    if pattern:
+        glob = any(c in pattern for c in _GLOB_CHARS)
+        pathspec = [f":(glob){pattern}" if glob else pattern]
+    if rev:
+        args = ["ls-tree", "-r", "-z", "--name-only", rev, "--", *pathspec]
+    else:
+        args = ["ls-files", "-z", "--", *pathspec]
+    return sorted(p for p in run_git(repo_path, args).split("\0") if p)
+
+
+def manifest_key(commit: str, pattern: str | None, params: dict) -> str:
+    """Cache key of the manifest for one bulk report."""
+    spec = (
+        commit,
+        pattern or "",
+        params.get("format", "md"),
+        params.get("question"),
+        params.get("max_commits", 10),
+        params.get("use_llm", False),
+        params.get("history_mode", "blame"),
+    )
+    return "bulk-" + hashlib.sha256(repr(spec).encode()).hexdigest()[:32]
+
+
+def _report_file(handle, commit: str, rev: str | None, rel_path: str, params: dict) -> dict:
+    """Analyze and report one file; returns its index entry."""
+    question = params.get("question")
+    max_commits = params.get("max_commits", 10)
+    use_llm = params.get("use_llm", False)
+    history_mode = params.get("history_mode", "blame")
+    line_start, line_end = DEFAULT_LINE_RANGE
+    # Same key as an /analyze request for the default range, so results are shared
+    key = analysis_key(commit, rel_path, line_start, line_end, rev, params)
+    controller = get_admission_controller()
+    # Per-file stages would overwrite the bulk progress
+    with progress_scope(None):
+        with controller.slot(handle.repo_id, priority=params.get("priority", BATCH)):
+            analysis, _ = analyze_cached(
+                handle.cache_dir,
+                key,
+                handle.path,
+                rel_path,
+                line_start,
+                line_end,
+                question,
+                max_commits,
+                use_llm,
+                commit,
+                rev,
+                history_mode,
+            )
+        response_dict = {
+            "file_path": rel_path,
+            "line_start": line_start,
+            "line_end": line_end,
+            "question": question,
+            **analysis,
+        }
+        _, saved_to = save_report(handle.cache_dir, response_dict, params.get("format", "md"))
+    return {
+        "file_path": rel_path,
+        "report_id": os.path.basename(saved_to),
+        "risk_level": analysis.get("answer", {}).get("risk_assessment", {}).get("risk_level"),
+        "stability": analysis.get("metrics", {}).get("stability"),
+        # Git timed out on part of the evidence; a resumed run redoes the file
+        **({"incomplete": True} if analysis.get("incomplete") else {}),
+    }
+
+
+def run_bulk_report(handle, commit: str, rev: str | None, params: dict) -> dict:
+    """
+    Report every tracked file matching params["pattern"] and write an index.
+
+    Args:
+        handle: RepoHandle of the repository
+        commit: Current HEAD, or the commit rev resolved to
+        rev: Resolved commit when reporting at a revision
+        params: Bulk parameters: pattern, workers, format, question,
+            max_commits, use_llm, history_mode, priority
+
+    Returns:
+        Dictionary with the index report_id and path, and file counts
+
+    Raises:
+        OperationCancelled: If the job is cancelled (progress so far is kept)
+        ValueError: If no tracked file matches
+    """
+    pattern = params.get("pattern")
+    files = list_tracked_files(handle.path, pattern, rev)
+    if not files:
+        raise ValueError(f"No tracked files match {pattern or '(all)'}")
+
+    key = manifest_key(commit, pattern, params)
+    manifest = cache_get(handle.cache_dir, key) or {}
+    entries: dict[str, dict] = manifest.get("files", {})
+    todo = [
+        f for f in files
+        if f not in entries or entries[f].get("error") or entries[f].get("incomplete")
+    ]
+    resumed = len(files) - len(todo)
+    BULK_FILES.inc(resumed, result="resumed")
+
+    lock = threading.Lock()
+    last_saved = [time.monotonic()]
+
+    def save(force: bool = False) -> None:
+        with lock:
+            if not force and time.monotonic() - last_saved[0] < _SAVE_INTERVAL_SEC:
+                return
+            snapshot = {"files": dict(entries)}
+            last_saved[0] = time.monotonic()
+        cache_set(handle.cache_dir, key, snapshot)
+
+    processed = failed = 0
+    report_progress(stage="bulk_report", done=resumed, total=len(files), failed=0)
+    workers = max(1, min(params.get("workers") or get_settings().bulk_workers, 32))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="repolens-bulk")
+    try:
+        # Each task runs in a copy of this context: the job's cancel token and
+        # git timeout apply to every file
+        futures = {
+            pool.submit(copy_context().run, _report_file, handle, commit, rev, path, params): path
+            for path in todo
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                entry = future.result()
+                BULK_FILES.inc(result="reported")
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                entry = {"file_path": path, "error": str(e) or type(e).__name__}
+                failed += 1
+                BULK_FILES.inc(result="failed")
+            with lock:
+                entries[path] = entry
+            processed += 1
+            report_progress(
+                stage="bulk_report", done=resumed + processed, total=len(files), failed=failed
+            )
+            save()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        save(force=True)
+
+    index_entries = [entries[f] for f in files]
+    fmt = params.get("format", "md")
+    index_path = save_index(handle.cache_dir, pattern or "(all files)", index_entries, fmt)
+    return {
+        "index": os.path.basename(index_path),
+        "saved_to": index_path,
+        "files": len(files),
+        "reported": len(files) - failed,
+        "failed": failed,
+        "resumed": resumed,
+    }
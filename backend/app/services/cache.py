@@ -3,7 +3,26 @@
 import hashlib
 import json
 import os
-from pathlib import Path
+import tempfile
+import time
+from typing import Callable
+
+from ..core.config import get_settings
+from .telemetry import CACHE_LOOKUPS, REGISTRY, stage
+from .cancellation import check_cancelled
+from .pack_store import PackStore, get_pack_store
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+CACHE_LOCK_WAIT = REGISTRY.histogram(
+    "repolens_cache_lock_wait_seconds", "Time spent waiting for another worker to compute a key.", []
+)
+
+# How long to wait for another worker before computing anyway
+DEFAULT_LOCK_TIMEOUT = 60.0
 
 
 def cache_key(
@@ -14,6 +33,7 @@ def cache_key(
     question: str | None,
     max_commits: int,
     use_llm: bool,
+    history_mode: str = "blame",
 ) -> str:
     """
     Generate a cache key from parameters.
@@ -26,14 +46,41 @@ def cache_key(
         question: Optional question
         max_commits: Max commits
         use_llm: Whether to use LLM
+        history_mode: Evidence mode (omitted from the key for "blame")
 
     Returns:
         SHA256 hash as hex string
     """
     key_str = f"{repo_head}:{rel_file_path}:{line_start}:{line_end}:{question}:{max_commits}:{use_llm}"
+    if history_mode != "blame":
+        key_str += f":{history_mode}"
     return hashlib.sha256(key_str.encode()).hexdigest()
 
 
+def _read(cache_file: str) -> dict | None:
+    """Read a cache file, or None if it is missing or unreadable."""
+    try:
+        with open(cache_file, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _pack_store(repo_cache_dir: str) -> PackStore | None:
+    """The pack store for this directory, or None with the JSON backend."""
+    if get_settings().cache_backend != "pack":
+        return None
+    return get_pack_store(repo_cache_dir)
+
+
+def _load(repo_cache_dir: str, key: str) -> dict | None:
+    """Read an entry from the configured backend (exceptions propagate)."""
+    store = _pack_store(repo_cache_dir)
+    if store is not None:
+        return store.get(key)
+    return _read(os.path.join(repo_cache_dir, f"{key}.json"))
+
+
 def cache_get(repo_cache_dir: str, key: str) -> dict | None:
     """
     Get cached analysis result.
@@ -45,30 +92,177 @@ def cache_get(repo_cache_dir: str, key: str) -> dict | None:
     Returns:
         Cached data or None if not found
     """
-    cache_file = os.path.join(repo_cache_dir, f"{key}.json")
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, "r") as f:
-                return json.load(f)
-        except Exception:
-            return None
-    return None
+    try:
+        data = _load(repo_cache_dir, key)
+    except Exception:
+        CACHE_LOOKUPS.inc(result="error")
+        return None
+    CACHE_LOOKUPS.inc(result="hit" if data is not None else "miss")
+    return data
 
 
 def cache_set(repo_cache_dir: str, key: str, payload_dict: dict) -> None:
     """
     Store analysis result in cache.
 
+    With the JSON backend the payload is written to a temporary file and
+    renamed into place, so concurrent readers (in any process) see either the
+    old file or the new one, never a partial write. The pack backend relies on
+    SQLite transactions for the same guarantee.
+
     Args:
         repo_cache_dir: Cache directory path
         key: Cache key
         payload_dict: Data to cache
     """
-    os.makedirs(repo_cache_dir, exist_ok=True)
+    try:
+        store = _pack_store(repo_cache_dir)
+        if store is not None:
+            store.put(key, payload_dict)
+            return
+    except Exception:
+        # Silently fail on cache write errors
+        return
+
     cache_file = os.path.join(repo_cache_dir, f"{key}.json")
+    tmp_path = None
     try:
-        with open(cache_file, "w") as f:
+        os.makedirs(repo_cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=repo_cache_dir, prefix=f".{key}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
             json.dump(payload_dict, f, indent=2)
+        os.replace(tmp_path, cache_file)
+        tmp_path = None
     except Exception:
         # Silently fail on cache write errors
         pass
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+class KeyLock:
+    """
+    Advisory cross-process lock for one cache key.
+
+    Uses flock on ``<key>.lock``. The holder unlinks the lock file before
+    releasing it, so a waiter that wakes up holding a stale (unlinked) file
+    retries on the current one.
+    """
+
+    def __init__(self, repo_cache_dir: str, key: str):
+        self.path = os.path.join(repo_cache_dir, f"{key}.lock")
+        self._fd: int | None = None
+
+    def acquire(self, timeout: float) -> bool:
+        """
+        Acquire the lock, polling until timeout.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if acquired, False on timeout or when locking is unavailable
+            (including a cache directory that cannot be written)
+
+        Raises:
+            OperationCancelled: If the current request is cancelled while waiting
+        """
+        if fcntl is None:
+            return False
+        deadline = time.monotonic() + timeout
+        delay = 0.005
+        while True:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError:
+                # Unwritable cache: compute without the lock, like a failed cache write
+                return False
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                if time.monotonic() >= deadline:
+                    return False
+                check_cancelled()
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+                continue
+            # Make sure the file we locked is still the one at self.path
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    self._fd = fd
+                    return True
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def release(self) -> None:
+        """Unlink the lock file and release the lock."""
+        if self._fd is None:
+            return
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+def cache_get_or_compute(
+    repo_cache_dir: str,
+    key: str,
+    compute: Callable[[], dict],
+    lock_timeout: float = DEFAULT_LOCK_TIMEOUT,
+    known_miss: bool = False,
+    cacheable: Callable[[dict], bool] | None = None,
+) -> tuple[dict, bool]:
+    """
+    Return the cached value for key, computing it at most once across processes.
+
+    Workers that miss at the same time coalesce: one takes the key's lock
+    and computes, the others wait on the lock and then read its result. If
+    the lock cannot be taken within lock_timeout, the value is computed
+    without it.
+
+    Args:
+        repo_cache_dir: Cache directory path
+        key: Cache key
+        compute: Produces the payload on a miss
+        lock_timeout: Seconds to wait for another worker
+        known_miss: Skip the initial lookup (the caller just missed)
+        cacheable: Whether a computed payload may be stored (default: always)
+
+    Returns:
+        Tuple of (payload, hit) where hit is True if the value came from cache
+    """
+    if not known_miss:
+        cached = cache_get(repo_cache_dir, key)
+        if cached is not None:
+            return cached, True
+
+    lock = KeyLock(repo_cache_dir, key)
+    start = time.perf_counter()
+    locked = lock.acquire(lock_timeout)
+    CACHE_LOCK_WAIT.observe(time.perf_counter() - start)
+    try:
+        if locked:
+            try:
+                cached = _load(repo_cache_dir, key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                CACHE_LOOKUPS.inc(result="coalesced")
+                return cached, True
+        payload = compute()
+        if cacheable is None or cacheable(payload):
+            with stage("cache_write"):
+                cache_set(repo_cache_dir, key, payload)
+        return payload, False
+    finally:
+        lock.release()
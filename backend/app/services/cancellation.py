@@ -0,0 +1,130 @@
+"""Request-scoped cancellation of git work (client disconnects and deadlines)."""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .telemetry import REGISTRY
+
+CANCELLED = REGISTRY.counter(
+    "repolens_cancelled_total", "Analyses cancelled before completion.", ["reason"]
+)
+GIT_KILLED = REGISTRY.counter(
+    "repolens_git_killed_total", "Git subprocesses killed by cancellation.", []
+)
+
+
+class OperationCancelled(BaseException):
+    """
+    Raised inside the pipeline once its request was cancelled.
+
+    Derives from BaseException (like asyncio.CancelledError) so the pipeline's
+    broad ``except Exception`` fallbacks do not swallow it.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(f"Operation cancelled: {reason}")
+
+
+def kill_process(proc: subprocess.Popen) -> None:
+    """Kill a git process and anything it spawned (aliases, hooks, textconv)."""
+    if proc.poll() is not None:
+        return
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        return
+    GIT_KILLED.inc()
+
+
+class CancelToken:
+    """Cancellation state shared between the request handler and worker thread."""
+
+    def __init__(self, deadline_seconds: float | None = None):
+        self.deadline = (
+            time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+        )
+        self.reason: str | None = None
+        self._processes: set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancelled or past the deadline."""
+        if self.reason is None and self.expired():
+            self.cancel("deadline")
+        return self.reason is not None
+
+    def expired(self) -> bool:
+        """True if the deadline has passed."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> float | None:
+        """Seconds until the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason: str) -> None:
+        """Cancel and kill every registered git subprocess."""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            processes = list(self._processes)
+        CANCELLED.inc(reason=reason)
+        for proc in processes:
+            kill_process(proc)
+
+    def check(self) -> None:
+        """Raise OperationCancelled if cancelled."""
+        if self.cancelled:
+            raise OperationCancelled(self.reason)
+
+    def register(self, proc: subprocess.Popen) -> None:
+        """Track a running subprocess; kills it at once if already cancelled."""
+        with self._lock:
+            self._processes.add(proc)
+            cancelled = self.reason is not None
+        if cancelled:
+            kill_process(proc)
+
+    def unregister(self, proc: subprocess.Popen) -> None:
+        """Stop tracking a finished subprocess."""
+        with self._lock:
+            self._processes.discard(proc)
+
+
+_current_token: ContextVar[CancelToken | None] = ContextVar(
+    "repolens_cancel_token", default=None
+)
+
+
+def current_token() -> CancelToken | None:
+    """Cancel token for the current request, if any."""
+    return _current_token.get()
+
+
+def check_cancelled() -> None:
+    """Raise OperationCancelled if the current request was cancelled."""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def cancel_scope(token: CancelToken | None):
+    """Make a token current for the enclosed block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
@@ -0,0 +1,166 @@
+"""Process-wide cache of commit details, keyed by commit hash.
+
+Commits are immutable, so author, date, subject and diff snippet fetched for
+a hash never go stale and entries need no invalidation. The cache is a
+bounded in-memory LRU, optionally backed by a SQLite file
+(REPOLENS_COMMIT_CACHE_FILE) that survives restarts and is shared between
+workers.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+from ..core.config import get_settings
+from ..models import CommitEvidence
+from .telemetry import REGISTRY
+
+COMMIT_CACHE_LOOKUPS = REGISTRY.counter(
+    "repolens_commit_cache_lookups_total",
+    "Commit detail lookups by result (memory, disk, miss).",
+    ["result"],
+)
+
+
+def _is_full_hash(commit_hash: str) -> bool:
+    """Only full object names are safe keys; abbreviations can become ambiguous."""
+    return len(commit_hash) == 40 and all(c in "0123456789abcdef" for c in commit_hash)
+
+
+class _CommitStore:
+    """SQLite persistence for commit details."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS commits (hash TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, commit_hash: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM commits WHERE hash = ?", (commit_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, commit_hash: str, data: dict) -> None:
+        blob = zlib.compress(json.dumps(data, separators=(",", ":")).encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO commits (hash, data) VALUES (?, ?)",
+                (commit_hash, blob),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CommitCache:
+    """
+    Bounded LRU of CommitEvidence by commit hash, with optional disk backing.
+
+    Thread-safe. Only full 40-character hashes are cached.
+    """
+
+    def __init__(self, max_entries: int = 4096, path: str | None = None):
+        self.max_entries = max(0, max_entries)
+        self._entries: OrderedDict[str, CommitEvidence] = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = _CommitStore(path) if path else None
+
+    def _remember(self, commit_hash: str, details: CommitEvidence) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[commit_hash] = details
+            self._entries.move_to_end(commit_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, commit_hash: str) -> CommitEvidence | None:
+        """
+        Look up a commit in memory, then on disk.
+
+        Args:
+            commit_hash: Full commit hash
+
+        Returns:
+            A copy of the cached CommitEvidence, or None
+        """
+        if not _is_full_hash(commit_hash):
+            return None
+        with self._lock:
+            details = self._entries.get(commit_hash)
+            if details is not None:
+                self._entries.move_to_end(commit_hash)
+        if details is not None:
+            COMMIT_CACHE_LOOKUPS.inc(result="memory")
+            return details.model_copy()
+
+        if self._store is not None:
+            try:
+                data = self._store.get(commit_hash)
+            except (sqlite3.Error, zlib.error, ValueError):
+                data = None
+            if data is not None:
+                details = CommitEvidence(**data)
+                self._remember(commit_hash, details)
+                COMMIT_CACHE_LOOKUPS.inc(result="disk")
+                return details.model_copy()
+
+        COMMIT_CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    def put(self, commit_hash: str, details: CommitEvidence) -> None:
+        """
+        Cache the details fetched for a commit.
+
+        Args:
+            commit_hash: Full commit hash the details were fetched for
+            details: CommitEvidence from git
+        """
+        if not _is_full_hash(commit_hash):
+            return
+        self._remember(commit_hash, details.model_copy())
+        if self._store is not None:
+            try:
+                self._store.put(commit_hash, details.model_dump())
+            except sqlite3.Error:
+                # The disk copy is an optimization; never fail the analysis
+                pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (the disk copy is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """Close the disk store, if any."""
+        if self._store is not None:
+            self._store.close()
+
+
+@lru_cache(maxsize=1)
+def get_commit_cache() -> CommitCache:
+    """Get the process-wide commit detail cache."""
+    settings = get_settings()
+    return CommitCache(
+        max_entries=settings.commit_cache_size,
+        path=settings.commit_cache_file,
+    )
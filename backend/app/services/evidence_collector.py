@@ -2,9 +2,25 @@
 
 import os
 from pathlib import Path
-from .git_runner import run_git
+from .git_runner import iter_git_lines, run_git, GitCommandError, GitTimeoutError
+from .telemetry import stage
+from .admission import yield_to_interactive
+from .cancellation import check_cancelled
+from .commit_cache import get_commit_cache
+from .file_filter import count_lines_at
+from .negative_cache import FAILED_COMMIT, get_negative_cache
+from .progress import report_progress
 from ..models import CommitEvidence
 
+# Both modes read the committed file (rev, or HEAD without one), never the
+# working tree: results are keyed by commit, and git log -L cannot read it
+BLAME = "blame"
+RANGE = "range"
+HISTORY_MODES = (BLAME, RANGE)
+
+# Starts each commit in range-history output (--format=%x00...)
+_COMMIT_MARK = "\x00"
+
 
 def resolve_file_path(repo_path: str, file_path: str) -> tuple[str, str]:
     """
@@ -45,27 +61,108 @@ def resolve_file_path(repo_path: str, file_path: str) -> tuple[str, str]:
     return abs_path, rel_path
 
 
+def resolve_revision(repo_path: str, rev: str) -> str:
+    """
+    Resolve a commit, tag or branch name to a commit id.
+
+    Args:
+        repo_path: Root of the git repository
+        rev: Revision to resolve
+
+    Returns:
+        Full commit hash
+
+    Raises:
+        ValueError: If rev does not name a commit
+    """
+    if not rev or rev.startswith("-"):
+        raise ValueError(f"Invalid revision: {rev}")
+    try:
+        output = run_git(
+            repo_path, ["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"]
+        )
+    except GitCommandError:
+        raise ValueError(f"Unknown revision: {rev}")
+    return output.strip()
+
+
+def resolve_file_at_revision(repo_path: str, commit: str, file_path: str) -> str:
+    """
+    Resolve a file path as it exists in a given commit.
+
+    Args:
+        repo_path: Root of the git repository
+        commit: Commit id
+        file_path: File path (relative or absolute)
+
+    Returns:
+        Relative path to the file
+
+    Raises:
+        ValueError: If the file is outside the repository or not in the commit
+    """
+    repo_path = os.path.abspath(repo_path)
+    abs_path = os.path.abspath(os.path.join(repo_path, file_path))
+    if not abs_path.startswith(repo_path + os.sep):
+        raise ValueError(f"File is not inside repository: {abs_path}")
+    rel_path = Path(os.path.relpath(abs_path, repo_path)).as_posix()
+    try:
+        run_git(repo_path, ["cat-file", "-e", f"{commit}:{rel_path}"])
+    except GitCommandError:
+        raise ValueError(f"File not found at {commit[:12]}: {rel_path}")
+    return rel_path
+
+
+def _rev_args(rev: str | None) -> list[str]:
+    """Revision argument for log/blame, followed by the pathspec separator."""
+    return ([rev] if rev else []) + ["--"]
+
+
 def get_blame_commits(
-    repo_path: str, rel_file_path: str, line_start: int | None, line_end: int | None
+    repo_path: str,
+    rel_file_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    rev: str | None = None,
+    lineage: list[str] | None = None,
 ) -> list[str]:
     """
     Get commit hashes from git blame.
 
+    Blame follows renames by itself; the whole-file history uses lineage.
+
     Args:
         repo_path: Root of the git repository
         rel_file_path: Relative path to file
         line_start: Start line (1-indexed, optional)
         line_end: End line (1-indexed, optional)
+        rev: Commit to blame at (default: HEAD; uncommitted changes are
+            not blamed, as in range mode)
+        lineage: Every name the file had, newest first
 
     Returns:
-        List of unique commit hashes in order of frequency
+        List of unique commit hashes in order of frequency (empty if git
+        fails)
+
+    Raises:
+        GitTimeoutError: If git times out
     """
     if line_start is None or line_end is None:
         # Get the entire file, but limit to first 200 lines
         try:
-            output = run_git(repo_path, ["log", "--pretty=format:%H", rel_file_path])
+            output = run_git(
+                repo_path,
+                [
+                    "log",
+                    "--pretty=format:%H",
+                    *_rev_args(rev or "HEAD"),
+                    *(lineage or [rel_file_path]),
+                ],
+            )
             hashes = [h.strip() for h in output.strip().split("\n") if h.strip()]
             return hashes[:200]
+        except GitTimeoutError:
+            raise
         except Exception:
             return []
 
@@ -73,8 +170,17 @@ def get_blame_commits(
     blame_range = f"{line_start},{line_end}"
     try:
         output = run_git(
-            repo_path, ["blame", "--porcelain", f"-L{blame_range}", rel_file_path]
+            repo_path,
+            [
+                "blame",
+                "--porcelain",
+                f"-L{blame_range}",
+                *_rev_args(rev or "HEAD"),
+                rel_file_path,
+            ],
         )
+    except GitTimeoutError:
+        raise
     except Exception:
         return []
 
@@ -105,7 +211,8 @@ def get_commit_details(
     Args:
         repo_path: Root of the git repository
         commit_hash: Commit hash
-        max_diff_chars: Maximum characters in diff
+        max_diff_chars: Maximum characters in diff; 0 skips fetching the
+            diff (diff_snippet is None)
 
     Returns:
         CommitEvidence object
@@ -116,7 +223,7 @@ def get_commit_details(
         [
             "show",
             "--no-color",
-            "-U3",
+            "--no-patch",
             "--pretty=format:%H%n%an%n%ad%n%s",
             "--date=iso-strict",
             commit_hash,
@@ -131,6 +238,8 @@ def get_commit_details(
     author = lines[1]
     date = lines[2]
     subject = lines[3]
+    if max_diff_chars <= 0:
+        return CommitEvidence(hash=commit_hash_retrieved, author=author, date=date, subject=subject)
 
     # Get diff snippet
     diff_output = run_git(
@@ -155,12 +264,131 @@ def get_commit_details(
     )
 
 
+def get_range_history(
+    repo_path: str,
+    rel_file_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    max_commits: int = 10,
+    rev: str | None = None,
+    max_diff_chars: int = 2000,
+) -> list[CommitEvidence]:
+    """
+    Follow how a line range evolved, newest commit first (git log -L).
+
+    Unlike blame, this also finds commits whose lines were later rewritten,
+    and each commit's diff is scoped to the range. Output is streamed from a
+    single git process, which is stopped once max_commits are collected.
+
+    Args:
+        repo_path: Root of the git repository
+        rel_file_path: Relative path to file
+        line_start: Start line (1-indexed, optional)
+        line_end: End line (1-indexed, optional; default: the file's last
+            line at rev)
+        max_commits: Maximum number of commits to return
+        rev: Commit to start from (default: HEAD, as in blame mode)
+        max_diff_chars: Maximum characters in each diff
+
+    Returns:
+        List of CommitEvidence objects
+
+    Raises:
+        GitTimeoutError: If git times out
+    """
+    if max_commits <= 0:
+        return []
+    rev = rev or "HEAD"
+    if line_end is None:
+        try:
+            line_end = count_lines_at(repo_path, rel_file_path, rev)
+        except GitTimeoutError:
+            raise
+        except (GitCommandError, ValueError):
+            return []
+        if not line_end:
+            # Empty or binary file: no lines to follow
+            return []
+    line_range = f"{line_start or 1},{line_end}"
+    lines = iter_git_lines(
+        repo_path,
+        [
+            "log",
+            "--no-color",
+            f"-L{line_range}:{rel_file_path}",
+            "--format=%x00%H%n%an%n%ad%n%s",
+            "--date=iso-strict",
+            *_rev_args(rev),
+        ],
+    )
+
+    evidence: list[CommitEvidence] = []
+    header: list[str] = []
+    diff: list[str] = []
+    diff_chars = 0
+
+    def finish() -> None:
+        if len(header) < 4:
+            return
+        evidence.append(
+            CommitEvidence(
+                hash=header[0],
+                author=header[1],
+                date=header[2],
+                subject=header[3],
+                diff_snippet="\n".join(diff).strip("\n")[:max_diff_chars],
+            )
+        )
+        report_progress(stage="range_history", done=len(evidence), total=max_commits)
+
+    try:
+        for line in lines:
+            if line.startswith(_COMMIT_MARK):
+                finish()
+                if len(evidence) >= max_commits:
+                    break
+                check_cancelled()
+                header, diff, diff_chars = [line[1:]], [], 0
+            elif len(header) < 4:
+                header.append(line)
+            elif diff_chars < max_diff_chars:
+                diff.append(line)
+                diff_chars += len(line) + 1
+        else:
+            finish()
+    except GitTimeoutError:
+        raise
+    except GitCommandError:
+        # Range outside the file, or the file is not in the revision
+        return []
+    finally:
+        lines.close()
+    return evidence
+
+
+def _is_deterministic(error: Exception) -> bool:
+    """Whether a commit lookup failure recurs on retry (not a timeout or a missing git)."""
+    if isinstance(error, ValueError):
+        return True
+    return (
+        isinstance(error, GitCommandError)
+        and not isinstance(error, GitTimeoutError)
+        and error.__cause__ is None
+    )
+
+
 def collect_evidence(
     repo_path: str,
     rel_file_path: str,
     line_start: int | None,
     line_end: int | None,
     max_commits: int = 10,
+    repo_head: str | None = None,
+    rev: str | None = None,
+    history_mode: str = BLAME,
+    lineage: list[str] | None = None,
+    diffs: bool = True,
+    transient: list[str] | None = None,
 ) -> list[CommitEvidence]:
     """
     Collect evidence (commits) affecting a file.
@@ -171,24 +399,89 @@ def collect_evidence(
         line_start: Start line (optional)
         line_end: End line (optional)
         max_commits: Maximum number of commits to return
+        repo_head: Current HEAD; commits that recently failed are not retried
+            until it changes
+        rev: Commit to analyze at (default: HEAD; both modes read the
+            committed file, not the working tree)
+        history_mode: "blame" for the commits that own the lines now, or
+            "range" for every commit that changed the range (git log -L)
+        lineage: Every name the file had, for whole-file history
+        diffs: Fetch diff snippets; without them evidence has diff_snippet
+            None and blame mode runs one cheap ``git show --no-patch`` per
+            uncached commit
+        transient: Receives what was left out after a failure that may not
+            recur (a git timeout): the commit, or the history stage. Such
+            failures are not negative-cached and the evidence is incomplete
 
     Returns:
         List of CommitEvidence objects
     """
+    transient = [] if transient is None else transient
+    if history_mode == RANGE:
+        try:
+            with stage("range_history"):
+                evidence = get_range_history(
+                    repo_path,
+                    rel_file_path,
+                    line_start,
+                    line_end,
+                    max_commits,
+                    rev,
+                    max_diff_chars=2000 if diffs else 0,
+                )
+        except GitTimeoutError:
+            transient.append("range_history")
+            return []
+        if not diffs:
+            for details in evidence:
+                details.diff_snippet = None
+        return evidence
+
     # Get blame hashes
-    hashes = get_blame_commits(repo_path, rel_file_path, line_start, line_end)
+    try:
+        with stage("blame"):
+            hashes = get_blame_commits(
+                repo_path, rel_file_path, line_start, line_end, rev, lineage
+            )
+    except GitTimeoutError:
+        transient.append("blame")
+        return []
 
     # Take first max_commits
     hashes = hashes[:max_commits]
 
-    # Fetch details for each
+    # Fetch details for each, reusing commits seen by earlier requests
+    commit_cache = get_commit_cache()
+    failed_commits = get_negative_cache(FAILED_COMMIT)
     evidence = []
-    for commit_hash in hashes:
-        try:
-            details = get_commit_details(repo_path, commit_hash)
-            evidence.append(details)
-        except Exception:
-            # Skip commits we can't get details for
-            continue
+    for done, commit_hash in enumerate(hashes):
+        check_cancelled()
+        yield_to_interactive()
+        report_progress(stage="commit_details", done=done, total=len(hashes))
+        details = commit_cache.get(commit_hash)
+        if details is None:
+            failure_key = (os.path.abspath(repo_path), commit_hash)
+            if failed_commits.check(failure_key, repo_head) is not None:
+                continue
+            try:
+                with stage("commit_details"):
+                    if diffs:
+                        details = get_commit_details(repo_path, commit_hash)
+                    else:
+                        details = get_commit_details(repo_path, commit_hash, max_diff_chars=0)
+            except Exception as e:
+                # Skip commits we can't get details for; only a bad or missing
+                # object is sure to fail again (cancellation is not caught)
+                if _is_deterministic(e):
+                    failed_commits.add(failure_key, repo_head, str(e))
+                else:
+                    transient.append(commit_hash)
+                continue
+            # Only complete details are shared; diff-less ones would be served as complete
+            if diffs:
+                commit_cache.put(commit_hash, details)
+        elif not diffs:
+            details.diff_snippet = None
+        evidence.append(details)
 
     return evidence
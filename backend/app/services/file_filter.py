@@ -0,0 +1,128 @@
+"""Up-front detection of files not worth blaming.
+
+Lockfiles, minified bundles, vendored output and binaries are among the most
+expensive files to blame and ``git show``, and their history explains little.
+Before any blame, a file is checked for:
+
+    generated:       the ``linguist-generated`` gitattribute
+    binary:          the ``-diff`` (or ``binary``) gitattribute, or a NUL
+                     byte in the first 8000 bytes (git's own heuristic)
+    too_large:       more than REPOLENS_MAX_FILE_BYTES
+    too_many_lines:  more than REPOLENS_MAX_FILE_LINES
+
+Such files get a metrics-only analysis (see pipeline.run_stages). Content is
+checked in the blob at the analyzed commit (HEAD by default), the same one
+blame reads, so uncommitted edits neither skip nor un-skip a file. Attributes
+are read from the checkout's .gitattributes.
+"""
+
+from ..core.config import get_settings
+from .git_runner import run_git, GitCommandError
+from .telemetry import REGISTRY, stage
+
+SKIPPED_FILES = REGISTRY.counter(
+    "repolens_skipped_files_total",
+    "Analyses short-circuited to metrics only, by reason.",
+    ["reason"],
+)
+
+GENERATED = "generated"
+BINARY = "binary"
+TOO_LARGE = "too_large"
+TOO_MANY_LINES = "too_many_lines"
+DESCRIPTIONS = {
+    GENERATED: "the file is marked linguist-generated",
+    BINARY: "the file is binary or marked -diff",
+    TOO_LARGE: "the file is larger than REPOLENS_MAX_FILE_BYTES",
+    TOO_MANY_LINES: "the file has more lines than REPOLENS_MAX_FILE_LINES",
+}
+
+# Tree with no entries; diffing a revision against it numstats whole files
+_EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+def _attributes(repo_path: str, rel_path: str) -> dict[str, str]:
+    """linguist-generated and diff attributes of a path ("set", "unset", a value...)."""
+    try:
+        output = run_git(
+            repo_path, ["check-attr", "linguist-generated", "diff", "--", rel_path]
+        )
+    except GitCommandError:
+        return {}
+    attrs = {}
+    for line in output.splitlines():
+        parts = line.rsplit(": ", 2)
+        if len(parts) == 3:
+            attrs[parts[1]] = parts[2].strip()
+    return attrs
+
+
+def _revision_content(
+    repo_path: str, rel_path: str, rev: str, max_bytes: int
+) -> tuple[str | None, int]:
+    """Reason to skip (or None) and the line count, from the blob at rev."""
+    size = int(run_git(repo_path, ["cat-file", "-s", f"{rev}:{rel_path}"]).strip())
+    if max_bytes and size > max_bytes:
+        return TOO_LARGE, 0
+    lines = count_lines_at(repo_path, rel_path, rev)
+    if lines is None:
+        return BINARY, 0
+    return None, lines
+
+
+def count_lines_at(repo_path: str, rel_path: str, rev: str) -> int | None:
+    """
+    Count the lines of a file at a revision.
+
+    git counts the lines (or flags the blob binary) without sending it to us.
+
+    Args:
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        rev: Commit to count at
+
+    Returns:
+        Number of lines, or None for a binary blob
+
+    Raises:
+        GitCommandError: If git fails
+        ValueError: If git's output cannot be parsed
+    """
+    output = run_git(repo_path, ["diff", "--numstat", _EMPTY_TREE, rev, "--", rel_path])
+    added = output.split("\t", 1)[0] if output else "0"
+    return None if added == "-" else int(added)
+
+
+def skip_reason(repo_path: str, rel_path: str, rev: str | None = None) -> str | None:
+    """
+    Why a file should only get metrics, if it should.
+
+    Args:
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        rev: Commit to check the file at (default: HEAD)
+
+    Returns:
+        GENERATED, BINARY, TOO_LARGE or TOO_MANY_LINES, or None to analyze
+        the file normally (also when it cannot be inspected)
+    """
+    settings = get_settings()
+    with stage("file_filter"):
+        attrs = _attributes(repo_path, rel_path)
+        generated = attrs.get("linguist-generated", "unspecified")
+        if generated not in ("unspecified", "unset", "false"):
+            reason = GENERATED
+        elif attrs.get("diff") == "unset":
+            reason = BINARY
+        else:
+            try:
+                reason, lines = _revision_content(
+                    repo_path, rel_path, rev or "HEAD", settings.max_file_bytes
+                )
+            except (ValueError, GitCommandError):
+                return None
+            if reason is None and settings.max_file_lines and lines > settings.max_file_lines:
+                reason = TOO_MANY_LINES
+    if reason is not None:
+        SKIPPED_FILES.inc(reason=reason)
+    return reason
@@ -1,6 +1,15 @@
 """Git command runner."""
 
 import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from .telemetry import GIT_COMMANDS, GIT_SECONDS
+from .tracing import record_git_call
+from .cancellation import OperationCancelled, current_token, kill_process
 
 
 class GitCommandError(Exception):
@@ -12,35 +21,204 @@ class GitCommandError(Exception):
         super().__init__(f"{message}\n{stderr}")
 
 
-def run_git(repo_path: str, args: list[str], timeout_sec: int = 10) -> str:
+class GitTimeoutError(GitCommandError):
+    """Raised when a git command runs out of time; retrying may succeed."""
+
+
+DEFAULT_TIMEOUT_SEC = 10
+
+_default_timeout: ContextVar[float | None] = ContextVar(
+    "repolens_git_timeout", default=None
+)
+
+
+@contextmanager
+def git_timeout(seconds: float | None):
+    """Raise (or lower) the default run_git timeout for the enclosed block."""
+    reset = _default_timeout.set(seconds)
+    try:
+        yield
+    finally:
+        _default_timeout.reset(reset)
+
+
+def run_git(repo_path: str, args: list[str], timeout_sec: float | None = None) -> str:
     """
     Run a git command in the specified repository.
 
+    If the current request has a cancel token, the process is killed when the
+    request is cancelled and the timeout is capped by the request deadline.
+
     Args:
         repo_path: Path to the git repository
         args: Git command arguments (e.g., ["log", "--oneline"])
-        timeout_sec: Timeout in seconds
+        timeout_sec: Timeout in seconds (default: 10, or the enclosing
+            git_timeout)
 
     Returns:
         stdout output as string
 
     Raises:
         GitCommandError: If the command fails
+        OperationCancelled: If the request was cancelled or its deadline passed
     """
+    if timeout_sec is None:
+        timeout_sec = _default_timeout.get() or DEFAULT_TIMEOUT_SEC
+
+    token = current_token()
+    if token is not None:
+        token.check()
+        remaining = token.remaining()
+        if remaining is not None:
+            timeout_sec = min(timeout_sec, remaining)
+
+    subcommand = args[0] if args else ""
+    status = "error"
+    exit_code = None
+    output_chars = 0
+    start = time.perf_counter()
     try:
-        result = subprocess.run(
-            ["git"] + args,
-            cwd=repo_path,
-            capture_output=True,
-            text=True,
-            timeout=timeout_sec,
-        )
-        if result.returncode != 0:
-            raise GitCommandError(
-                f"Git command failed: {' '.join(args)}", result.stderr
+        try:
+            proc = subprocess.Popen(
+                ["git"] + args,
+                cwd=repo_path,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                # Own process group, so cancellation can kill git's children too
+                start_new_session=True,
             )
-        return result.stdout
-    except subprocess.TimeoutExpired as e:
-        raise GitCommandError(f"Git command timed out: {' '.join(args)}") from e
-    except FileNotFoundError as e:
-        raise GitCommandError("Git command not found") from e
+        except FileNotFoundError as e:
+            raise GitCommandError("Git command not found") from e
+
+        if token is not None:
+            token.register(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout_sec)
+        except subprocess.TimeoutExpired as e:
+            kill_process(proc)
+            proc.communicate()
+            if token is not None and token.cancelled:
+                status = "cancelled"
+                raise OperationCancelled(token.reason) from e
+            status = "timeout"
+            raise GitTimeoutError(f"Git command timed out: {' '.join(args)}") from e
+        finally:
+            if token is not None:
+                token.unregister(proc)
+
+        exit_code = proc.returncode
+        output_chars = len(stdout)
+        if token is not None and token.cancelled:
+            status = "cancelled"
+            raise OperationCancelled(token.reason)
+        if proc.returncode != 0:
+            raise GitCommandError(f"Git command failed: {' '.join(args)}", stderr)
+        status = "ok"
+        return stdout
+    finally:
+        elapsed = time.perf_counter() - start
+        GIT_SECONDS.observe(elapsed, subcommand=subcommand)
+        GIT_COMMANDS.inc(subcommand=subcommand, status=status)
+        record_git_call(args, elapsed, output_chars, exit_code, status)
+
+
+def iter_git_lines(
+    repo_path: str, args: list[str], timeout_sec: float | None = None
+) -> Iterator[str]:
+    """
+    Run a git command and yield its output line by line as it is produced.
+
+    Closing the iterator early (break, or garbage collection) kills git, so a
+    caller that has read enough never pays for the rest of the output.
+    Cancellation and timeouts behave as in run_git.
+
+    Args:
+        repo_path: Path to the git repository
+        args: Git command arguments
+        timeout_sec: Timeout in seconds for the whole command (default: 10,
+            or the enclosing git_timeout)
+
+    Yields:
+        Output lines without their trailing newline
+
+    Raises:
+        GitCommandError: If the command fails or times out
+        OperationCancelled: If the request was cancelled or its deadline passed
+    """
+    if timeout_sec is None:
+        timeout_sec = _default_timeout.get() or DEFAULT_TIMEOUT_SEC
+
+    token = current_token()
+    if token is not None:
+        token.check()
+        remaining = token.remaining()
+        if remaining is not None:
+            timeout_sec = min(timeout_sec, remaining)
+
+    subcommand = args[0] if args else ""
+    status = "error"
+    exit_code = None
+    output_chars = 0
+    start = time.perf_counter()
+    try:
+        try:
+            proc = subprocess.Popen(
+                ["git"] + args,
+                cwd=repo_path,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True,
+            )
+        except FileNotFoundError as e:
+            raise GitCommandError("Git command not found") from e
+
+        if token is not None:
+            token.register(proc)
+        timed_out = threading.Event()
+
+        def expire() -> None:
+            timed_out.set()
+            kill_process(proc)
+
+        timer = threading.Timer(timeout_sec, expire)
+        timer.daemon = True
+        timer.start()
+        finished = False
+        try:
+            for line in proc.stdout:
+                output_chars += len(line)
+                yield line.rstrip("\n")
+            stderr = proc.stderr.read()
+            proc.wait()
+            finished = True
+        finally:
+            timer.cancel()
+            if not finished:
+                # Stopped early by the caller (or an error): git is not needed any more
+                kill_process(proc)
+                proc.wait()
+                status = "stopped"
+            proc.stdout.close()
+            proc.stderr.close()
+            if token is not None:
+                token.unregister(proc)
+
+        exit_code = proc.returncode
+        if token is not None and token.cancelled:
+            status = "cancelled"
+            raise OperationCancelled(token.reason)
+        if timed_out.is_set():
+            status = "timeout"
+            raise GitTimeoutError(f"Git command timed out: {' '.join(args)}")
+        if proc.returncode != 0:
+            raise GitCommandError(f"Git command failed: {' '.join(args)}", stderr)
+        status = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        GIT_SECONDS.observe(elapsed, subcommand=subcommand)
+        GIT_COMMANDS.inc(subcommand=subcommand, status=status)
+        record_git_call(args, elapsed, output_chars, exit_code, status)
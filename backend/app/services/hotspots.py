@@ -0,0 +1,94 @@
+"""Repository hotspots: the files changed most often in recent history."""
+
+from collections import Counter
+
+from .git_runner import run_git
+from .telemetry import stage
+from .cancellation import check_cancelled
+from .admission import yield_to_interactive
+from .progress import report_progress
+from .renames import current_rename_map
+
+# Separates commits in the log output (--format=%x00); cannot appear in a path
+_COMMIT_MARK = "\x00"
+
+
+def find_hotspots(
+    repo_path: str,
+    limit: int = 20,
+    max_commits: int = 1000,
+    rev: str | None = None,
+    follow_renames: bool = False,
+) -> list[dict]:
+    """
+    Rank files by how many recent commits touched them.
+
+    Only files that still exist at the revision are ranked.
+
+    Args:
+        repo_path: Root of the git repository
+        limit: Number of files to return
+        max_commits: How many commits of history to scan
+        rev: Revision to scan from (default: HEAD)
+        follow_renames: Count commits to a file's earlier names towards its
+            current one (when rev is in HEAD's history, which the rename map
+            covers)
+
+    Returns:
+        List of dictionaries with path, commits and last_commit, most
+        frequently changed first
+    """
+    rev = rev or "HEAD"
+    with stage("hotspots_log"):
+        output = run_git(
+            repo_path,
+            [
+                "log",
+                f"--max-count={max_commits}",
+                "--no-renames",
+                "--name-only",
+                "--format=%x00%H",
+                rev,
+                "--",
+            ],
+        )
+
+    check_cancelled()
+    rename_map = current_rename_map(repo_path) if follow_renames else None
+    if rename_map is not None:
+        commit = run_git(repo_path, ["rev-parse", "--verify", rev]).strip()
+        if not rename_map.contains(commit):
+            # The map covers HEAD's history only
+            rename_map = None
+    # Old name -> current name, for commits older than the rename
+    aliases: dict[str, str] = {}
+    counts: Counter[str] = Counter()
+    last_commit: dict[str, str] = {}
+    chunks = output.split(_COMMIT_MARK)
+    for done, chunk in enumerate(chunks):
+        lines = chunk.strip().split("\n")
+        if not lines or not lines[0]:
+            continue
+        commit = lines[0]
+        for path in lines[1:]:
+            path = path.strip()
+            if path:
+                path = aliases.get(path, path)
+                counts[path] += 1
+                # Log is newest first, so the first sighting is the latest
+                last_commit.setdefault(path, commit)
+        if rename_map is not None:
+            for old, new in rename_map.renames_at(commit):
+                aliases[old] = aliases.get(new, new)
+        if done % 200 == 0:
+            report_progress(stage="hotspots_log", done=done, total=len(chunks))
+
+    yield_to_interactive()
+    with stage("hotspots_tree"):
+        tracked = set(run_git(repo_path, ["ls-tree", "-r", "--name-only", rev]).splitlines())
+
+    ranked = [(path, n) for path, n in counts.most_common() if path in tracked]
+    return [
+        {"path": path, "commits": n, "last_commit": last_commit[path]}
+        for path, n in ranked[:limit]
+    ]
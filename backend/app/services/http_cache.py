@@ -0,0 +1,131 @@
+"""HTTP validators and response compression for cacheable GET endpoints.
+
+An analysis result is fully determined by its cache key (which includes the
+HEAD or resolved revision), so the key doubles as an entity tag. A client that
+re-polls with ``If-None-Match`` gets a 304 as soon as the key is computed,
+without the cache read, the analysis or the payload.
+
+Full responses are compressed with brotli (when the optional ``brotli``
+package is installed) or gzip, according to ``Accept-Encoding``.
+"""
+
+import gzip
+
+from .telemetry import REGISTRY
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+CONDITIONAL_RESPONSES = REGISTRY.counter(
+    "repolens_conditional_responses_total",
+    "GET analysis responses by endpoint and outcome (not_modified or full).",
+    ["endpoint", "result"],
+)
+ENCODED_RESPONSES = REGISTRY.counter(
+    "repolens_encoded_responses_total",
+    "Full GET analysis responses by content encoding.",
+    ["encoding"],
+)
+
+# Cache-Control for results at HEAD (may change) and at a resolved revision (never do)
+REVALIDATE = "private, no-cache"
+IMMUTABLE = "private, max-age=31536000, immutable"
+# For results that were not cached (incomplete evidence)
+NO_STORE = "no-store"
+
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+
+def make_etag(*parts: str) -> str:
+    """
+    Weak entity tag for a result.
+
+    Weak, because the bytes differ between content encodings of the same
+    result.
+
+    Args:
+        parts: Values identifying the result (cache key, format, ...)
+
+    Returns:
+        ETag header value
+    """
+    return 'W/"' + "-".join(parts) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an entity tag (weak comparison).
+
+    Args:
+        if_none_match: Header value, possibly a list or "*"
+        etag: Current entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == current for tag in if_none_match.split(",")
+    )
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Pick the response encoding a client accepts.
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+
+    Returns:
+        "br", "gzip", or None for identity
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def encode_body(body: bytes, encoding: str | None, min_bytes: int = 0) -> tuple[bytes, str | None]:
+    """
+    Compress a response body.
+
+    Args:
+        body: Uncompressed body
+        encoding: "br", "gzip" or None
+        min_bytes: Smaller bodies are sent uncompressed
+
+    Returns:
+        Tuple of (body, encoding actually applied or None)
+    """
+    if encoding is None or len(body) < min_bytes:
+        encoding = None
+    elif encoding == "br":
+        body = brotli.compress(body, quality=_BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+    ENCODED_RESPONSES.inc(encoding=encoding or "identity")
+    return body, encoding
@@ -0,0 +1,464 @@
+"""Incremental re-analysis when HEAD advances.
+
+Every analysis result records the HEAD it was computed at, and a "latest"
+pointer per request (file, range, question, ...) remembers the most recent
+result regardless of HEAD. When HEAD moves and the exact key misses, the
+previous result is brought forward according to what happened to the file
+between the two HEADs:
+
+    reused:  no commit touched the path; blame, evidence and metrics are
+             unchanged, so the old result is still exact
+    reblame: commits touched the path; it is re-blamed (even if the content
+             ended up identical, e.g. after a revert, blame moves to the new
+             commits), and evidence for commits that are still blamed comes
+             from the commit cache instead of git show
+    full:    no usable previous result (first run, history rewritten)
+
+Each registered repository also keeps the recently used request parameters
+(LatestIndex, in RepoHandle.state). When the watcher or a request sees HEAD
+move, results for files no commit touched are carried forward to the new HEAD
+in the background, so the first request after a commit is already a hit.
+
+Requests that select fields (see pipeline.stages_for) bypass this: their
+stages are kept in a separate partial entry next to the full one, merged with
+whatever other requests computed for the same key, and promoted to the full
+entry once every stage is present.
+"""
+
+import threading
+from collections import OrderedDict
+
+from ..models import CommitEvidence
+from .cache import cache_get, cache_get_or_compute, cache_key, cache_set
+from .commit_cache import get_commit_cache
+from .git_runner import run_git, GitCommandError
+from .repo_registry import RepoHandle, get_repo_registry, repo_id_for
+from .pipeline import (
+    STAGES,
+    covers,
+    full_result,
+    run_analysis,
+    run_stages,
+    select_fields,
+    stages_for,
+)
+from .telemetry import REGISTRY, stage
+from .tracing import trace_profile
+
+INCREMENTAL = REGISTRY.counter(
+    "repolens_incremental_total",
+    "Analyses after a HEAD change, by how much was recomputed.",
+    ["mode"],
+)
+
+PARTIAL_RESULTS = REGISTRY.counter(
+    "repolens_partial_results_total",
+    "Field-selected analyses by how they were served.",
+    ["result"],
+)
+
+# Stand-in for the HEAD component of the "latest result" pointer key
+LATEST = "latest"
+# Name of the LatestIndex in RepoHandle.state
+LATEST_STATE = "latest"
+# Request parameters carried forward per repository when HEAD moves
+MAX_TRACKED = 256
+
+
+def latest_key(
+    rel_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    question: str | None,
+    max_commits: int,
+    use_llm: bool,
+    history_mode: str = "blame",
+) -> str:
+    """Cache key of the pointer to the most recent result for these parameters."""
+    return cache_key(
+        LATEST, rel_path, line_start, line_end, question, max_commits, use_llm, history_mode
+    )
+
+
+def remember_latest(cache_dir: str, pointer_key: str, repo_head: str, key: str) -> None:
+    """
+    Point the parameters' "latest" entry at a freshly stored result.
+
+    Args:
+        cache_dir: Cache directory path
+        pointer_key: Key from latest_key
+        repo_head: HEAD the result was computed at
+        key: Cache key of the result
+    """
+    cache_set(cache_dir, pointer_key, {"head": repo_head, "key": key})
+
+
+class LatestIndex:
+    """
+    Recently analyzed request parameters of one repository.
+
+    Kept in RepoHandle.state. When HEAD moves forward, the results of requests
+    whose file no new commit touched are stored under the new HEAD's key and
+    their "latest" pointers advanced, as analyze_incremental would on the next
+    request ("reused").
+    """
+
+    def __init__(self, repo_path: str, cache_dir: str, max_tracked: int = MAX_TRACKED):
+        self.repo_path = repo_path
+        self.cache_dir = cache_dir
+        self.max_tracked = max_tracked
+        # pointer key -> (rel_path, line_start, line_end, question, max_commits,
+        # use_llm, history_mode), least recently used first
+        self._params: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def track(self, pointer_key: str, params: tuple) -> None:
+        """Record the parameters behind a "latest" pointer."""
+        with self._lock:
+            self._params[pointer_key] = params
+            self._params.move_to_end(pointer_key)
+            while len(self._params) > self.max_tracked:
+                self._params.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._params)
+
+    def approx_bytes(self) -> int:
+        """Rough memory footprint, for the registry's budget."""
+        return 1024 + 512 * len(self)
+
+    def on_head_change(
+        self, handle: RepoHandle, old_head: str | None, new_head: str | None
+    ) -> None:
+        """Carry results forward off the watcher or request thread."""
+        if old_head and new_head and len(self):
+            threading.Thread(
+                target=self.advance, args=(old_head, new_head), daemon=True
+            ).start()
+
+    def advance(self, old_head: str, new_head: str) -> int:
+        """
+        Store results still exact at new_head under its keys.
+
+        Args:
+            old_head: HEAD the tracked results were computed at
+            new_head: HEAD to carry them forward to
+
+        Returns:
+            Number of results carried forward
+        """
+        with self._lock:
+            tracked = list(self._params.items())
+        try:
+            run_git(self.repo_path, ["merge-base", "--is-ancestor", old_head, new_head])
+            # --no-renames lists both names of a moved file
+            changed = set(
+                run_git(
+                    self.repo_path,
+                    ["log", "--format=", "--name-only", "--no-renames", f"{old_head}..{new_head}"],
+                ).split("\n")
+            )
+        except GitCommandError:
+            # History was rewritten: the next request recomputes
+            return 0
+
+        advanced = 0
+        for pointer_key, params in tracked:
+            if params[0] in changed:
+                continue
+            previous = previous_result(self.cache_dir, pointer_key)
+            if previous is None or previous["head"] != old_head:
+                continue
+            key = cache_key(new_head, *params)
+            if cache_get(self.cache_dir, key) is None:
+                cache_set(self.cache_dir, key, {**previous, "head": new_head})
+            remember_latest(self.cache_dir, pointer_key, new_head, key)
+            INCREMENTAL.inc(mode="carried")
+            advanced += 1
+        return advanced
+
+
+def latest_index_for(handle: RepoHandle) -> LatestIndex:
+    """The LatestIndex of a registered repository, created on first use."""
+    index = handle.state.get(LATEST_STATE)
+    if index is None:
+        index = handle.state.setdefault(LATEST_STATE, LatestIndex(handle.path, handle.cache_dir))
+    return index
+
+
+def _remember(
+    cache_dir: str, repo_path: str, params: tuple, history_mode: str, repo_head: str, key: str
+) -> None:
+    """remember_latest, and track the parameters in the repository's LatestIndex."""
+    pointer_key = latest_key(*params, history_mode)
+    remember_latest(cache_dir, pointer_key, repo_head, key)
+    handle = get_repo_registry().get(repo_id_for(repo_path))
+    if handle is not None:
+        latest_index_for(handle).track(pointer_key, (*params, history_mode))
+
+
+def previous_result(cache_dir: str, pointer_key: str) -> dict | None:
+    """
+    Most recent cached result for a request, if it is still stored.
+
+    Args:
+        cache_dir: Cache directory path
+        pointer_key: Key from latest_key
+
+    Returns:
+        Result payload (with its "head") or None
+    """
+    pointer = cache_get(cache_dir, pointer_key)
+    if not pointer or not pointer.get("key"):
+        return None
+    previous = cache_get(cache_dir, pointer["key"])
+    if not previous or previous.get("head") != pointer.get("head"):
+        return None
+    return previous
+
+
+def touching_commits(
+    repo_path: str, old_head: str, new_head: str, rel_path: str
+) -> list[str] | None:
+    """
+    Commits between two HEADs that touched a path.
+
+    Args:
+        repo_path: Root of the git repository
+        old_head: HEAD of the previous result
+        new_head: Current HEAD
+        rel_path: Relative path to file
+
+    Returns:
+        Commit hashes, newest first, or None if new_head does not descend
+        from old_head (history was rewritten)
+    """
+    try:
+        run_git(repo_path, ["merge-base", "--is-ancestor", old_head, new_head])
+    except GitCommandError:
+        return None
+    output = run_git(
+        repo_path, ["log", "--format=%H", f"{old_head}..{new_head}", "--", rel_path]
+    )
+    return [h for h in output.split() if h]
+
+
+def analyze_incremental(
+    cache_dir: str,
+    repo_path: str,
+    rel_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    question: str | None,
+    max_commits: int,
+    use_llm: bool,
+    repo_head: str,
+    history_mode: str = "blame",
+) -> dict:
+    """
+    Run an analysis, reusing the previous result for these parameters if possible.
+
+    Args:
+        cache_dir: Cache directory path
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        line_start: Start line
+        line_end: End line
+        question: Optional question
+        max_commits: Maximum number of commits to collect
+        use_llm: Whether to use LLM
+        repo_head: Current HEAD
+        history_mode: Evidence mode ("blame" or "range")
+
+    Returns:
+        Analysis result dictionary, as from run_analysis
+    """
+    params = (rel_path, line_start, line_end, question, max_commits, use_llm)
+    args = (repo_path, *params, repo_head, None, history_mode)
+    pointer_key = latest_key(*params, history_mode)
+
+    with stage("incremental"):
+        previous = previous_result(cache_dir, pointer_key)
+        touching = None
+        if previous is not None and previous["head"] != repo_head:
+            try:
+                touching = touching_commits(repo_path, previous["head"], repo_head, rel_path)
+            except GitCommandError:
+                touching = None
+
+    if touching is None:
+        INCREMENTAL.inc(mode="full")
+        return run_analysis(*args)
+
+    if not touching:
+        INCREMENTAL.inc(mode="reused")
+        return {**previous, "head": repo_head}
+
+    if history_mode == "blame":
+        # Commits still blamed after the change need no git show (range
+        # evidence carries range-scoped diffs, which the commit cache must not)
+        commit_cache = get_commit_cache()
+        for item in previous.get("evidence", []):
+            details = CommitEvidence(**item)
+            commit_cache.put(details.hash, details)
+    INCREMENTAL.inc(mode="reblame")
+    return run_analysis(*args)
+
+
+def _complete(result: dict) -> bool:
+    """Whether a result may be cached (no evidence was lost to a git timeout)."""
+    return not result.get("incomplete")
+
+
+def analyze_cached(
+    cache_dir: str,
+    key: str,
+    repo_path: str,
+    rel_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    question: str | None,
+    max_commits: int,
+    use_llm: bool,
+    repo_head: str,
+    rev: str | None = None,
+    history_mode: str = "blame",
+    known_miss: bool = False,
+) -> tuple[dict, bool]:
+    """
+    Return the cached analysis for key, computing it at most once across workers.
+
+    At HEAD, a freshly computed result starts from the previous HEAD's result
+    and becomes the new "latest" one. Results at an explicit revision are
+    immutable and computed directly. Incomplete results (git timed out on
+    part of the evidence) are returned but neither cached nor remembered.
+
+    Args:
+        cache_dir: Cache directory path
+        key: Cache key for the request
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        line_start: Start line
+        line_end: End line
+        question: Optional question
+        max_commits: Maximum number of commits to collect
+        use_llm: Whether to use LLM
+        repo_head: Current HEAD, or the commit rev resolved to
+        rev: Resolved commit when analyzing at a revision
+        history_mode: Evidence mode ("blame" or "range")
+        known_miss: Skip the initial lookup (the caller just missed)
+
+    Returns:
+        Tuple of (result, hit)
+    """
+    args = (rel_path, line_start, line_end, question, max_commits, use_llm)
+
+    def compute() -> dict:
+        with trace_profile():
+            if rev:
+                return run_analysis(repo_path, *args, repo_head, rev, history_mode)
+            return analyze_incremental(cache_dir, repo_path, *args, repo_head, history_mode)
+
+    data, hit = cache_get_or_compute(
+        cache_dir, key, compute, known_miss=known_miss, cacheable=_complete
+    )
+    if not hit and not rev and _complete(data):
+        _remember(cache_dir, repo_path, args, history_mode, repo_head, key)
+    return data, hit
+
+
+def stages_key(key: str) -> str:
+    """Cache key of the partial (per-stage) entry for a result key."""
+    return f"{key}-stages"
+
+
+def _merge_stages(ours: dict, theirs: dict) -> dict:
+    """Combine two partial results for one key, preferring evidence with diffs."""
+    merged = {**theirs, **ours}
+    if theirs.get("diffs") and not ours.get("diffs"):
+        merged["evidence"], merged["diffs"] = theirs["evidence"], True
+    return merged
+
+
+def analyze_partial(
+    cache_dir: str,
+    key: str,
+    repo_path: str,
+    rel_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    question: str | None,
+    max_commits: int,
+    use_llm: bool,
+    repo_head: str,
+    rev: str | None = None,
+    history_mode: str = "blame",
+    fields: list[str] | None = None,
+) -> tuple[dict, bool]:
+    """
+    Return the selected fields of an analysis, running only the stages they need.
+
+    Served from the full entry for key or from its partial entry when either
+    covers the fields; otherwise the missing stages are computed on top of the
+    partial entry and stored back into it.
+
+    Args:
+        cache_dir: Cache directory path
+        key: Cache key for the request (as for a full analysis)
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        line_start: Start line
+        line_end: End line
+        question: Optional question
+        max_commits: Maximum number of commits to collect
+        use_llm: Whether to use LLM
+        repo_head: Current HEAD, or the commit rev resolved to
+        rev: Resolved commit when analyzing at a revision
+        history_mode: Evidence mode ("blame" or "range")
+        fields: Selected result fields (see pipeline.FIELDS)
+
+    Returns:
+        Tuple of (result with the selected fields, hit)
+    """
+    full = cache_get(cache_dir, key)
+    if full:
+        PARTIAL_RESULTS.inc(result="full_hit")
+        return select_fields(full, fields), True
+    partial_key = stages_key(key)
+    stages = stages_for(fields)
+    partial = cache_get(cache_dir, partial_key) or {}
+    if covers(partial, stages):
+        PARTIAL_RESULTS.inc(result="partial_hit")
+        return select_fields(partial, fields), True
+
+    with trace_profile():
+        result = run_stages(
+            repo_path,
+            rel_path,
+            line_start,
+            line_end,
+            question,
+            max_commits,
+            use_llm,
+            repo_head,
+            rev,
+            history_mode,
+            stages,
+            partial,
+        )
+    if not _complete(result):
+        PARTIAL_RESULTS.inc(result="incomplete")
+        return select_fields(result, fields), False
+    # Other requests may have stored different stages in the meantime
+    merged = _merge_stages(result, cache_get(cache_dir, partial_key) or {})
+    if covers(merged, set(STAGES)):
+        cache_set(cache_dir, key, full_result(merged))
+        if not rev:
+            params = (rel_path, line_start, line_end, question, max_commits, use_llm)
+            _remember(cache_dir, repo_path, params, history_mode, repo_head, key)
+        PARTIAL_RESULTS.inc(result="combined")
+    else:
+        cache_set(cache_dir, partial_key, merged)
+        PARTIAL_RESULTS.inc(result="computed")
+    return select_fields(result, fields), False
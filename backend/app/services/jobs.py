@@ -0,0 +1,536 @@
+"""Asynchronous jobs for long-running analyze, report and hotspot work.
+
+Jobs are accepted immediately and run on a bounded worker pool with a
+longer git timeout than interactive requests. Each job reports progress
+(current stage, commits done) while it runs. Analyze results land in the
+normal analysis cache, so a later ``/analyze`` for the same file is a hit.
+
+With REPOLENS_JOB_JOURNAL set, every submission and status change is
+appended to a JSONL journal. On startup the journal is replayed: jobs that
+were queued or running when the server stopped are queued again, and
+finished jobs keep their results. The journal is compacted to the jobs still
+kept in memory at startup and every COMPACT_EVERY appends.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable
+
+from ..core.config import get_settings
+from .admission import BATCH, get_admission_controller
+from .bulk import run_bulk_report
+from .cache import cache_get, cache_get_or_compute
+from .cancellation import CancelToken, OperationCancelled, cancel_scope
+from .git_runner import git_timeout
+from .hotspots import find_hotspots
+from .incremental import analyze_cached
+from .progress import progress_scope
+from .repo_registry import RepoHandle
+from .report import save_report
+from .targets import analysis_target, resolve_target
+from .telemetry import REGISTRY
+
+JOBS = REGISTRY.counter(
+    "repolens_jobs_total", "Finished jobs by kind and final status.", ["kind", "status"]
+)
+JOBS_PENDING = REGISTRY.gauge("repolens_jobs_pending", "Jobs queued or running.", [])
+
+JOB_KINDS = ("analyze", "report", "hotspots", "bulk_report")
+PENDING = ("queued", "running")
+
+# Finished jobs kept in memory and in the compacted journal
+KEEP_FINISHED = 1000
+# Journal appends between compactions
+COMPACT_EVERY = 1000
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are pending."""
+
+
+def _analyze(target: tuple, params: dict) -> tuple[dict, bool]:
+    """Cached analysis of a job's target (a targets.analysis_target tuple)."""
+    handle, commit, rel_path, line_start, line_end, rev, key = target
+    return analyze_cached(
+        handle.cache_dir,
+        key,
+        handle.path,
+        rel_path,
+        line_start,
+        line_end,
+        params.get("question"),
+        params.get("max_commits", 10),
+        params.get("use_llm", False),
+        commit,
+        rev,
+        params.get("history_mode", "blame"),
+    )
+
+
+def _background_slot(handle: RepoHandle, params: dict):
+    """Admission slot for a job, in its priority class (batch by default)."""
+    return get_admission_controller().slot(
+        handle.repo_id, priority=params.get("priority", BATCH)
+    )
+
+
+def _run_analyze(params: dict) -> tuple[dict, dict | None]:
+    target = analysis_target(params)
+    handle, rev, key = target[0], target[5], target[6]
+    with _background_slot(handle, params):
+        data, hit = _analyze(target, params)
+    result = {**data, "cache": {"hit": hit, "key": key}, "rev": rev}
+    return result, {"cache_dir": handle.cache_dir, "key": key, "rev": rev}
+
+
+def _run_report(params: dict) -> tuple[dict, dict | None]:
+    target = analysis_target(params)
+    handle, _, rel_path, line_start, line_end = target[:5]
+    # Same key as an analyze job or /analyze, so the analysis is shared
+    with _background_slot(handle, params):
+        analysis, _ = _analyze(target, params)
+    response_dict = {
+        "file_path": rel_path,
+        "line_start": line_start,
+        "line_end": line_end,
+        "question": params.get("question"),
+        **analysis,
+    }
+    fmt = params.get("format", "md")
+    content, saved_to = save_report(handle.cache_dir, response_dict, fmt)
+    result = {
+        "markdown": content,
+        "saved_to": saved_to,
+        "format": fmt,
+        "report_id": os.path.basename(saved_to),
+    }
+    return result, None
+
+
+def _run_hotspots(params: dict) -> tuple[dict, dict | None]:
+    handle, commit, _ = resolve_target(params)
+    limit = params.get("limit", 20)
+    history = params.get("history", 1000)
+    # Hotspots at a commit never change, so they are cached like analyses
+    spec = (commit, limit, history, True)
+    key = "hotspots-" + hashlib.sha256(repr(spec).encode()).hexdigest()[:32]
+
+    def compute() -> dict:
+        with _background_slot(handle, params):
+            hotspots = find_hotspots(
+                handle.path,
+                limit=limit,
+                max_commits=history,
+                rev=commit,
+                follow_renames=True,
+            )
+        return {"rev": commit, "hotspots": hotspots}
+
+    result, _ = cache_get_or_compute(handle.cache_dir, key, compute)
+    return result, None
+
+
+def _run_bulk_report(params: dict) -> tuple[dict, dict | None]:
+    handle, commit, _ = resolve_target(params)
+    rev = commit if params.get("rev") else None
+    return run_bulk_report(handle, commit, rev, params), None
+
+
+RUNNERS = {
+    "analyze": _run_analyze,
+    "report": _run_report,
+    "hotspots": _run_hotspots,
+    "bulk_report": _run_bulk_report,
+}
+
+
+class Job:
+    """One submitted unit of work and its state."""
+
+    def __init__(self, job_id: str, kind: str, params: dict, created_at: float):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.progress: dict = {}
+        self.created_at = created_at
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.error: str | None = None
+        self.result: dict | None = None
+        # Where a result kept in the analysis cache lives (analyze jobs)
+        self.result_ref: dict | None = None
+        self.token = CancelToken()
+
+    def load_result(self) -> dict | None:
+        """The job's result, reading it back from the analysis cache if needed."""
+        if self.result is None and self.result_ref is not None:
+            data = cache_get(self.result_ref["cache_dir"], self.result_ref["key"])
+            if data is not None:
+                self.result = {
+                    **data,
+                    "cache": {"hit": True, "key": self.result_ref["key"]},
+                    "rev": self.result_ref.get("rev"),
+                }
+        return self.result
+
+    def to_dict(self) -> dict:
+        """Summary for the API (without the result)."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class JobJournal:
+    """Append-only JSONL log of job submissions and status changes."""
+
+    def __init__(self, path: str, compact_every: int = COMPACT_EVERY):
+        self.path = path
+        self.compact_every = compact_every
+        self._appended = 0
+        self._lock = threading.Lock()
+
+    def append(self, record: dict) -> bool:
+        """
+        Append a record.
+
+        Returns:
+            True once compact_every records were appended since the journal
+            was last rewritten
+        """
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+                f.flush()
+            self._appended += 1
+            return self._appended >= self.compact_every
+
+    def replay(self) -> list[dict]:
+        """
+        Fold the journal into the latest state of each job, oldest first.
+
+        Returns:
+            List of job state dictionaries
+        """
+        jobs: OrderedDict[str, dict] = OrderedDict()
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-write
+                continue
+            op = record.pop("op", None)
+            if op == "submit":
+                jobs[record["id"]] = {**record, "status": "queued"}
+            elif op == "status" and record.get("id") in jobs:
+                jobs[record["id"]].update(record)
+        return list(jobs.values())
+
+    def compact(self, snapshot: Callable[[], list[dict]]) -> None:
+        """
+        Atomically replace the journal with one submit+status pair per job.
+
+        The snapshot is taken while appends are held off, so no status change
+        recorded before it can be lost.
+
+        Args:
+            snapshot: Returns the job state dictionaries to keep, oldest first
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            states = snapshot()
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".jobs.", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                for state in states:
+                    submit = {
+                        "op": "submit",
+                        "id": state["id"],
+                        "kind": state["kind"],
+                        "params": state["params"],
+                        "created_at": state["created_at"],
+                    }
+                    status = {
+                        k: v
+                        for k, v in state.items()
+                        if k not in ("kind", "params", "created_at")
+                    }
+                    f.write(json.dumps(submit, separators=(",", ":")) + "\n")
+                    f.write(json.dumps({"op": "status", **status}, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, self.path)
+            self._appended = 0
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and tracks their state.
+
+    Args:
+        workers: Jobs running at once
+        max_pending: Queued plus running jobs before submissions are rejected
+        git_timeout_sec: Default timeout for each git command inside a job
+        journal_path: JSONL journal making the queue survive restarts
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        git_timeout_sec: float,
+        journal_path: str | None = None,
+    ):
+        self.max_pending = max_pending
+        self.git_timeout_sec = git_timeout_sec
+        self.journal = JobJournal(journal_path) if journal_path else None
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._closing = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="repolens-job"
+        )
+        if self.journal is not None:
+            self._recover()
+
+    def _pending(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status in PENDING)
+
+    def _append(self, record: dict) -> None:
+        if self.journal is None:
+            return
+        try:
+            if self.journal.append(record):
+                # Drops status history and the jobs pruned from memory
+                self.journal.compact(self._states)
+        except OSError:
+            # The journal is best effort; the job itself carries on
+            pass
+
+    def _record(self, job: Job, **fields) -> None:
+        self._append({"op": "status", "id": job.id, "status": job.status, **fields})
+
+    def _states(self) -> list[dict]:
+        """Journal states of the jobs kept in memory, oldest first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [
+            {
+                "id": j.id,
+                "kind": j.kind,
+                "params": j.params,
+                "created_at": j.created_at,
+                "status": "queued" if j.status in PENDING else j.status,
+                **self._finished_fields(j),
+            }
+            for j in jobs
+        ]
+
+    def _recover(self) -> None:
+        """Rebuild jobs from the journal and requeue the unfinished ones."""
+        states = self.journal.replay()
+        finished = [s for s in states if s.get("status") not in PENDING]
+        kept = {s["id"] for s in finished[-KEEP_FINISHED:]}
+        requeue = []
+        for state in states:
+            if state.get("status") not in PENDING and state["id"] not in kept:
+                continue
+            job = Job(state["id"], state["kind"], state["params"], state["created_at"])
+            if state.get("status") in PENDING:
+                requeue.append(job)
+            else:
+                job.status = state["status"]
+                job.started_at = state.get("started_at")
+                job.finished_at = state.get("finished_at")
+                job.error = state.get("error")
+                job.result = state.get("result")
+                job.result_ref = state.get("result_ref")
+            self._jobs[job.id] = job
+
+        self.journal.compact(self._states)
+        for job in requeue:
+            self._executor.submit(self._run, job)
+        JOBS_PENDING.set(len(requeue))
+
+    @staticmethod
+    def _finished_fields(job: Job) -> dict:
+        if job.status in PENDING:
+            return {}
+        fields = {
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "error": job.error,
+        }
+        if job.result_ref is not None:
+            fields["result_ref"] = job.result_ref
+        elif job.result is not None:
+            fields["result"] = job.result
+        return fields
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status not in PENDING]
+        for job in finished[: max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[job.id]
+
+    def submit(self, kind: str, params: dict) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: "analyze", "report", "hotspots" or "bulk_report"
+            params: Request parameters for the job kind
+
+        Returns:
+            The queued Job
+
+        Raises:
+            ValueError: For an unknown kind
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        if kind not in RUNNERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(uuid.uuid4().hex, kind, params, time.time())
+        with self._lock:
+            if self._closing:
+                raise JobQueueFull("Job manager is shutting down")
+            if self._pending() >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} jobs already pending")
+            self._jobs[job.id] = job
+            self._prune()
+            JOBS_PENDING.set(self._pending())
+        self._append(
+            {
+                "op": "submit",
+                "id": job.id,
+                "kind": kind,
+                "params": params,
+                "created_at": job.created_at,
+            }
+        )
+        self._executor.submit(self._run, job)
+        return job
+
+    def _on_progress(self, job: Job, fields: dict) -> None:
+        progress = dict(fields)
+        if "done" not in progress and progress.get("stage") == job.progress.get("stage"):
+            # Entering the stage again (e.g. the next commit) keeps its counts
+            return
+        job.progress = progress
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            if job.status != "queued":
+                # Cancelled while queued
+                return
+            job.status = "running"
+        if job.token.cancelled:
+            self._finish(job, "cancelled", error=f"Cancelled: {job.token.reason}")
+            return
+        job.started_at = time.time()
+        self._record(job, started_at=job.started_at)
+        try:
+            with cancel_scope(job.token), git_timeout(self.git_timeout_sec), progress_scope(
+                lambda fields: self._on_progress(job, fields)
+            ):
+                result, result_ref = RUNNERS[job.kind](job.params)
+        except OperationCancelled as e:
+            if self._closing and e.reason == "shutdown":
+                # Left as running in the journal, so it is requeued on restart
+                return
+            self._finish(job, "cancelled", error=f"Cancelled: {e.reason}")
+        except KeyError as e:
+            self._finish(job, "failed", error=str(e.args[0]) if e.args else "Not found")
+        except Exception as e:
+            self._finish(job, "failed", error=str(e) or type(e).__name__)
+        else:
+            if job.token.cancelled and job.token.reason != "shutdown":
+                # Cancelled after its last cancellation point (e.g. while
+                # rendering); the work finished, but nobody wants it now
+                self._finish(job, "cancelled", error=f"Cancelled: {job.token.reason}")
+                return
+            job.result = result
+            job.result_ref = result_ref
+            self._finish(job, "done")
+
+    def _finish(self, job: Job, status: str, error: str | None = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        JOBS.inc(kind=job.kind, status=status)
+        with self._lock:
+            JOBS_PENDING.set(self._pending())
+        self._record(job, **self._finished_fields(job))
+
+    def get(self, job_id: str) -> Job | None:
+        """Look up a job by id."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        """All known jobs, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Job | None:
+        """
+        Cancel a queued or running job (killing its git processes).
+
+        Returns:
+            The job, or None if unknown
+        """
+        job = self.get(job_id)
+        if job is None or job.status not in PENDING:
+            return job
+        job.token.cancel("cancelled")
+        with self._lock:
+            queued = job.status == "queued"
+            if queued:
+                # Claimed here, so no worker starts it; reported and journaled now
+                job.status = "cancelled"
+        if queued:
+            self._finish(job, "cancelled", error="Cancelled: cancelled")
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the pool. Unfinished jobs stay pending in the journal and are
+        resumed by the next JobManager.
+        """
+        with self._lock:
+            self._closing = True
+            running = [j for j in self._jobs.values() if j.status in PENDING]
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in running:
+            job.token.cancel("shutdown")
+        if wait:
+            self._executor.shutdown(wait=True)
+
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    """Get the process-wide job manager (recovering journaled jobs)."""
+    settings = get_settings()
+    return JobManager(
+        workers=settings.job_workers,
+        max_pending=settings.job_max_pending,
+        git_timeout_sec=settings.job_git_timeout,
+        journal_path=settings.job_journal,
+    )
@@ -1,37 +1,58 @@
 """Metrics calculation."""
 
-from .git_runner import run_git
+from .git_runner import run_git, GitCommandError, GitTimeoutError
 
 
-def file_metrics(repo_path: str, rel_file_path: str) -> dict:
+def file_metrics(
+    repo_path: str,
+    rel_file_path: str,
+    rev: str | None = None,
+    lineage: list[str] | None = None,
+    transient: list[str] | None = None,
+) -> dict:
     """
     Calculate metrics for a file.
 
     Args:
         repo_path: Root of the git repository
         rel_file_path: Relative path to file
+        rev: Commit to measure at (default: HEAD)
+        lineage: Every name the file had (see renames.follow_renames), so
+            history from before a move counts too
+        transient: Receives the metrics lost to a git timeout; their
+            fallback values are not exact and the result must not be cached
 
     Returns:
         Dictionary with churn_count, last_touch, and stability
     """
+    transient = [] if transient is None else transient
+    rev_args = [rev] if rev else []
+    paths = lineage or [rel_file_path]
+
     # Get commits in last 50
     try:
         output = run_git(
             repo_path,
-            ["log", "--pretty=format:%H", "--max-count=50", "--", rel_file_path],
+            ["log", "--pretty=format:%H", "--max-count=50", *rev_args, "--", *paths],
         )
         commits = [h.strip() for h in output.strip().split("\n") if h.strip()]
         churn_count = len(commits)
-    except Exception:
+    except GitTimeoutError:
+        transient.append("churn_count")
+        churn_count = 0
+    except GitCommandError:
         churn_count = 0
 
     # Get last touch date
     try:
         last_touch = run_git(
             repo_path,
-            ["log", "-1", "--pretty=format:%ad", "--date=iso-strict", "--", rel_file_path],
+            ["log", "-1", "--pretty=format:%ad", "--date=iso-strict", *rev_args, "--", *paths],
         ).strip()
-    except Exception:
+    except GitTimeoutError:
+        transient.append("last_touch")
+        last_touch = None
+    except GitCommandError:
         last_touch = None
 
     # Determine stability
@@ -0,0 +1,132 @@
+"""Short-lived caches of recent failures (invalid repos, missing files, bad commits).
+
+Misconfigured clients tend to repeat the same failing request. Each failure
+is remembered for a short TTL together with a fingerprint of the state it
+depended on (path mtimes, HEAD); a lookup whose fingerprint differs is
+treated as a miss, so creating the file, running ``git init`` or moving HEAD
+takes effect immediately rather than after the TTL.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Hashable
+
+from ..core.config import get_settings
+from .telemetry import REGISTRY
+
+NEGATIVE_CACHE = REGISTRY.counter(
+    "repolens_negative_cache_total",
+    "Negative cache activity by failure kind (hit = failing work skipped).",
+    ["kind", "result"],
+)
+
+INVALID_REPO = "invalid_repo"
+MISSING_FILE = "missing_file"
+FAILED_COMMIT = "failed_commit"
+
+
+class NegativeCache:
+    """
+    Bounded TTL cache mapping a key to a recent error message.
+
+    Thread-safe. Oldest entries are dropped beyond ``max_entries``.
+    """
+
+    def __init__(self, kind: str, ttl_seconds: float, max_entries: int = 10000):
+        self.kind = kind
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Hashable, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: Hashable, fingerprint: Hashable = None) -> str | None:
+        """
+        Look up a remembered failure.
+
+        Args:
+            key: What failed (path, commit, ...)
+            fingerprint: Current state the failure depended on
+
+        Returns:
+            The remembered error message, or None if the work should be retried
+        """
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, stored_fingerprint, error = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                NEGATIVE_CACHE.inc(kind=self.kind, result="expired")
+                return None
+            if stored_fingerprint != fingerprint:
+                del self._entries[key]
+                NEGATIVE_CACHE.inc(kind=self.kind, result="invalidated")
+                return None
+        NEGATIVE_CACHE.inc(kind=self.kind, result="hit")
+        return error
+
+    def add(self, key: Hashable, fingerprint: Hashable, error: str) -> None:
+        """
+        Remember a failure.
+
+        Args:
+            key: What failed
+            fingerprint: State the failure depended on
+            error: Message to report on later hits
+        """
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, fingerprint, error)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        NEGATIVE_CACHE.inc(kind=self.kind, result="stored")
+
+    def discard(self, key: Hashable) -> None:
+        """Forget a failure (e.g. the work just succeeded)."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def path_fingerprint(*paths: str) -> tuple:
+    """
+    Fingerprint paths by existence and mtime.
+
+    A file or directory appearing, disappearing or changing (including a
+    directory gaining entries) changes the fingerprint.
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            fingerprint.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+
+def nearest_existing_dir(path: str) -> str:
+    """Closest ancestor of path that exists (where a missing file would appear)."""
+    current = os.path.dirname(os.path.abspath(path))
+    while current and not os.path.isdir(current):
+        parent = os.path.dirname(current)
+        if parent == current:
+            break
+        current = parent
+    return current
+
+
+@lru_cache(maxsize=None)
+def get_negative_cache(kind: str) -> NegativeCache:
+    """Get the process-wide negative cache for a failure kind."""
+    return NegativeCache(kind, get_settings().negative_cache_ttl)
@@ -0,0 +1,311 @@
+"""Single-file compressed pack store for analysis results.
+
+An alternative to one JSON file per key. Everything lives in one SQLite file
+per cache directory:
+
+- ``blobs``: zlib-compressed, content-addressed (sha256) blobs. Diff snippets
+  and commit records are stored once, however many results include them.
+- ``results``: small compressed result records whose evidence entries are
+  ``{"$blob": <hash>}`` references.
+- ``refs``: which blobs each result references, so compaction can drop blobs
+  that no result uses any more.
+
+SQLite runs in WAL mode, so readers in other workers are never blocked by a
+writer and never see a partial record.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterator
+
+PACK_FILENAME = "cache.pack"
+
+BLOB_REF = "$blob"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (key, hash)
+);
+CREATE INDEX IF NOT EXISTS refs_hash ON refs (hash);
+"""
+
+
+def _encode(value) -> bytes:
+    """Canonical JSON bytes (stable key order, so equal content hashes equal)."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _blob_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def pack_payload(payload: dict) -> tuple[dict, dict[str, bytes]]:
+    """
+    Split a result payload into a small record and content-addressed blobs.
+
+    Each evidence entry becomes a reference to a commit record blob, and each
+    commit record's diff_snippet a reference to its own blob.
+
+    Args:
+        payload: Analysis result dictionary
+
+    Returns:
+        Tuple of (record, blobs) where blobs maps hash to raw (uncompressed) bytes
+    """
+    blobs: dict[str, bytes] = {}
+
+    def put(value) -> dict:
+        raw = _encode(value)
+        digest = _blob_hash(raw)
+        blobs[digest] = raw
+        return {BLOB_REF: digest}
+
+    record = dict(payload)
+    evidence = []
+    for item in payload.get("evidence", []):
+        commit = dict(item)
+        if isinstance(commit.get("diff_snippet"), str):
+            commit["diff_snippet"] = put(commit["diff_snippet"])
+        evidence.append(put(commit))
+    if "evidence" in payload:
+        record["evidence"] = evidence
+    return record, blobs
+
+
+def _is_ref(value) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_REF in value
+
+
+class PackStore:
+    """
+    One SQLite pack file holding results and deduplicated blobs.
+
+    Thread-safe: a single connection is shared and serialized with a lock.
+    Multiple processes may open the same file.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _fetch_blobs(self, hashes: set[str]) -> dict[str, object]:
+        """Load and decode blobs by hash."""
+        if not hashes:
+            return {}
+        ordered = list(hashes)
+        placeholders = ",".join("?" * len(ordered))
+        rows = self._conn.execute(
+            f"SELECT hash, data FROM blobs WHERE hash IN ({placeholders})", ordered
+        ).fetchall()
+        return {h: json.loads(zlib.decompress(data)) for h, data in rows}
+
+    def get(self, key: str) -> dict | None:
+        """
+        Load a result, resolving its blob references.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Result payload or None if not stored
+
+        Raises:
+            sqlite3.Error, zlib.error, ValueError: If the pack is unreadable
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = json.loads(zlib.decompress(row[0]))
+            evidence = record.get("evidence", [])
+            commits = self._fetch_blobs({e[BLOB_REF] for e in evidence if _is_ref(e)})
+            diffs = self._fetch_blobs(
+                {
+                    c["diff_snippet"][BLOB_REF]
+                    for c in commits.values()
+                    if _is_ref(c.get("diff_snippet"))
+                }
+            )
+
+        resolved = []
+        for entry in evidence:
+            commit = dict(commits[entry[BLOB_REF]]) if _is_ref(entry) else entry
+            if _is_ref(commit.get("diff_snippet")):
+                commit["diff_snippet"] = diffs[commit["diff_snippet"][BLOB_REF]]
+            resolved.append(commit)
+        if "evidence" in record:
+            record["evidence"] = resolved
+        return record
+
+    def put(self, key: str, payload: dict, created_at: float | None = None) -> None:
+        """
+        Store a result, writing only blobs not already in the pack.
+
+        Args:
+            key: Cache key
+            payload: Result payload
+            created_at: Record timestamp (defaults to now)
+        """
+        record, blobs = pack_payload(payload)
+        data = zlib.compress(_encode(record))
+        compressed = [(h, zlib.compress(raw)) for h, raw in blobs.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", compressed
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, data, created_at) VALUES (?, ?, ?)",
+                    (key, data, created_at if created_at is not None else time.time()),
+                )
+                self._conn.execute("DELETE FROM refs WHERE key = ?", (key,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO refs (key, hash) VALUES (?, ?)",
+                    [(key, h) for h in blobs],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str) -> bool:
+        """Remove a result; its blobs are reclaimed by the next compaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            cur = self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM refs WHERE key = ?", (key,))
+            self._conn.execute("COMMIT")
+            return cur.rowcount > 0
+
+    def keys(self) -> Iterator[str]:
+        """Stored result keys."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM results").fetchall()
+        return iter([r[0] for r in rows])
+
+    def compact(self, max_age_seconds: float | None = None) -> dict:
+        """
+        Drop expired results and unreferenced blobs, then reclaim file space.
+
+        Args:
+            max_age_seconds: Also drop results older than this
+
+        Returns:
+            Dictionary with results_removed, blobs_removed, bytes_before, bytes_after
+        """
+        bytes_before = self.size_bytes()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                results_removed = 0
+                if max_age_seconds is not None:
+                    cutoff = time.time() - max_age_seconds
+                    self._conn.execute(
+                        "DELETE FROM refs WHERE key IN "
+                        "(SELECT key FROM results WHERE created_at < ?)",
+                        (cutoff,),
+                    )
+                    results_removed = self._conn.execute(
+                        "DELETE FROM results WHERE created_at < ?", (cutoff,)
+                    ).rowcount
+                blobs_removed = self._conn.execute(
+                    "DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM refs)"
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {
+            "results_removed": results_removed,
+            "blobs_removed": blobs_removed,
+            "bytes_before": bytes_before,
+            "bytes_after": self.size_bytes(),
+        }
+
+    def size_bytes(self) -> int:
+        """Size of the pack file including its write-ahead log."""
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    def stats(self) -> dict:
+        """Record and blob counts and on-disk size."""
+        with self._lock:
+            results = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            blobs, blob_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "results": results,
+            "blobs": blobs,
+            "blob_bytes": blob_bytes,
+            "file_bytes": self.size_bytes(),
+        }
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_stores: dict[str, PackStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_pack_store(repo_cache_dir: str) -> PackStore:
+    """
+    Get the shared pack store for a cache directory.
+
+    Args:
+        repo_cache_dir: Cache directory path
+
+    Returns:
+        PackStore for ``<repo_cache_dir>/cache.pack``
+    """
+    path = os.path.join(os.path.abspath(repo_cache_dir), PACK_FILENAME)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = PackStore(path)
+            _stores[path] = store
+        return store
+
+
+def close_pack_stores() -> None:
+    """Close every open pack store (tests, shutdown)."""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1,316 @@
+"""Analysis pipeline shared by the analyze and report endpoints.
+
+Requests may select the result fields they need (``fields``). Only the
+stages those fields depend on run, and a stage already present in a partial
+result is reused instead of recomputed:
+
+    evidence      blame (or range history) and commit details, no diffs
+    diff_snippet  evidence plus each commit's diff
+    timeline      evidence
+    metrics       file metrics (no blame at all)
+    intent        evidence, timeline and metrics
+    answer        everything above except diffs
+
+Binary, generated and oversized files (see file_filter) skip blame entirely:
+whatever was requested, they get a complete result with empty evidence and
+timeline, file metrics, and a "skipped" reason.
+
+Evidence that misses commits, or metrics that fell back to defaults, because
+git timed out are marked "incomplete"; such results are returned but never
+cached.
+"""
+
+from ..models import CommitEvidence, Intent, TimelineItem
+from .evidence_collector import collect_evidence
+from .metrics import file_metrics
+from .timeline import build_timeline
+from .intent import infer_intent
+from .llm import generate_answer
+from .telemetry import stage
+from .cancellation import check_cancelled
+from .renames import follow_renames
+from .file_filter import DESCRIPTIONS, skip_reason
+
+# Result fields a request can select
+FIELDS = ("evidence", "diff_snippet", "timeline", "metrics", "intent", "answer")
+# Stored stages; "diffs" marks evidence that carries diff snippets
+STAGES = ("evidence", "diffs", "timeline", "metrics", "intent", "answer")
+_DEPENDS = {
+    "evidence": ("evidence",),
+    "diff_snippet": ("evidence", "diffs"),
+    "timeline": ("evidence", "timeline"),
+    "metrics": ("metrics",),
+    "intent": ("evidence", "timeline", "metrics", "intent"),
+    "answer": ("evidence", "timeline", "metrics", "intent", "answer"),
+}
+
+
+def stages_for(fields: list[str] | None) -> set[str]:
+    """
+    Stages needed to produce the selected fields.
+
+    Args:
+        fields: Selected result fields, None for all of them
+
+    Returns:
+        Set of stage names
+    """
+    if fields is None:
+        return set(STAGES)
+    return {s for field in fields for s in _DEPENDS[field]}
+
+
+def covers(result: dict, stages: set[str]) -> bool:
+    """Whether a (partial) result holds every stage in stages."""
+    return all(result.get(s) if s == "diffs" else s in result for s in stages)
+
+
+def select_fields(result: dict, fields: list[str] | None) -> dict:
+    """
+    Project a result onto the selected fields.
+
+    Args:
+        result: Full or partial analysis result
+        fields: Selected result fields, None for all of them
+
+    Returns:
+        Result with only the selected fields (and head); evidence keeps its
+        diff snippets only if diff_snippet was selected
+    """
+    if fields is None:
+        return result
+    selected = {"head": result.get("head")}
+    for flag in ("skipped", "incomplete"):
+        if flag in result:
+            selected[flag] = result[flag]
+    for name in ("evidence", "timeline", "metrics", "intent", "answer"):
+        if name in fields and name in result:
+            selected[name] = result[name]
+    if "diff_snippet" in fields and "evidence" in result:
+        selected["evidence"] = result["evidence"]
+    elif "evidence" in selected:
+        selected["evidence"] = [
+            {k: v for k, v in item.items() if k != "diff_snippet"} for item in selected["evidence"]
+        ]
+    return selected
+
+
+def run_stages(
+    repo_path: str,
+    rel_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    question: str | None,
+    max_commits: int,
+    use_llm: bool,
+    repo_head: str | None = None,
+    rev: str | None = None,
+    history_mode: str = "blame",
+    stages: set[str] | None = None,
+    partial: dict | None = None,
+) -> dict:
+    """
+    Run the analysis stages a request needs, reusing a partial result.
+
+    Args:
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        line_start: Start line
+        line_end: End line
+        question: Optional question
+        max_commits: Maximum number of commits to collect
+        use_llm: Whether to use LLM
+        repo_head: Current HEAD, recorded in the result and used to key
+            negative caching of failed commits
+        rev: Commit to analyze at; blame, history and metrics are taken as
+            of this commit instead of the working tree
+        history_mode: How evidence is found ("blame" or "range")
+        stages: Stages to produce (see stages_for), default all
+        partial: Stages computed earlier for the same cache key
+
+    Returns:
+        Dictionary with head, the "diffs" flag and every stage in stages
+        (plus any carried over from partial); "incomplete" is set when git
+        timed out on part of the evidence or metrics
+
+    Raises:
+        OperationCancelled: If the request is cancelled between stages
+    """
+    stages = set(STAGES) if stages is None else stages
+    result = {k: v for k, v in (partial or {}).items() if k in STAGES}
+    lineage = None
+
+    def names() -> list[str]:
+        # Names the file had before any moves, in the history of rev or HEAD
+        nonlocal lineage
+        if lineage is None:
+            lineage = follow_renames(repo_path, rel_path, rev or repo_head)
+        return lineage
+
+    if stages - {"metrics"}:
+        # At the commit blame reads: rev, or the HEAD the result is keyed on
+        skipped = skip_reason(repo_path, rel_path, rev or repo_head)
+        if skipped is not None:
+            if "metrics" not in result:
+                _run_metrics(result, repo_path, rel_path, rev, names())
+            return _metrics_only(result, skipped, question, repo_head)
+
+    diffs = "diffs" in stages
+    if "evidence" in stages and ("evidence" not in result or (diffs and not result.get("diffs"))):
+        # Collect evidence (timed per blame/commit inside the collector)
+        transient: list[str] = []
+        evidence_list = collect_evidence(
+            repo_path,
+            rel_path,
+            line_start,
+            line_end,
+            max_commits,
+            repo_head,
+            rev,
+            history_mode,
+            names(),
+            diffs,
+            transient,
+        )
+        result["evidence"] = [e.model_dump() for e in evidence_list]
+        result["diffs"] = diffs
+        if transient:
+            result["incomplete"] = True
+    elif "evidence" in result:
+        evidence_list = [CommitEvidence(**e) for e in result["evidence"]]
+
+    if "metrics" in stages and "metrics" not in result:
+        check_cancelled()
+        _run_metrics(result, repo_path, rel_path, rev, names())
+
+    if "timeline" in stages:
+        if "timeline" in result:
+            timeline_list = [TimelineItem(**t) for t in result["timeline"]]
+        else:
+            check_cancelled()
+            with stage("timeline"):
+                timeline_list = build_timeline(evidence_list)
+            result["timeline"] = [t.model_dump() for t in timeline_list]
+
+    if "intent" in stages:
+        if "intent" in result:
+            intent_obj = Intent(**result["intent"])
+        else:
+            with stage("intent"):
+                intent_obj = infer_intent(evidence_list, timeline_list, result["metrics"])
+            result["intent"] = intent_obj.model_dump()
+
+    if "answer" in stages and "answer" not in result:
+        with stage("answer"):
+            answer_obj = generate_answer(
+                question,
+                evidence_list,
+                timeline_list,
+                result["metrics"],
+                intent_obj.__dict__,
+                use_llm,
+            )
+        result["answer"] = answer_obj.model_dump()
+
+    result["head"] = repo_head
+    return result
+
+
+def _run_metrics(
+    result: dict, repo_path: str, rel_path: str, rev: str | None, lineage: list[str]
+) -> None:
+    """Add the metrics stage to result, marking it incomplete if git timed out."""
+    transient: list[str] = []
+    with stage("metrics"):
+        result["metrics"] = file_metrics(repo_path, rel_path, rev, lineage, transient)
+    if transient:
+        result["incomplete"] = True
+
+
+def _metrics_only(
+    result: dict, skipped: str, question: str | None, repo_head: str | None
+) -> dict:
+    """Complete a result for a skipped file from its metrics alone."""
+    intent_obj = Intent(
+        label="unclear", reason=f"Line history was not analyzed: {DESCRIPTIONS[skipped]}."
+    )
+    with stage("answer"):
+        # Never worth an LLM call: there is no evidence to reason about
+        answer_obj = generate_answer(
+            question, [], [], result["metrics"], intent_obj.model_dump(), False
+        )
+    answer_obj.confidence = "low"
+    answer_obj.missing_info = [*answer_obj.missing_info, f"Line history (skipped: {skipped})"]
+    return {
+        **result,
+        "evidence": [],
+        "diffs": True,
+        "timeline": [],
+        "intent": intent_obj.model_dump(),
+        "answer": answer_obj.model_dump(),
+        "skipped": skipped,
+        "head": repo_head,
+    }
+
+
+def run_analysis(
+    repo_path: str,
+    rel_path: str,
+    line_start: int | None,
+    line_end: int | None,
+    question: str | None,
+    max_commits: int,
+    use_llm: bool,
+    repo_head: str | None = None,
+    rev: str | None = None,
+    history_mode: str = "blame",
+) -> dict:
+    """
+    Run every analysis stage for a file range.
+
+    Args:
+        repo_path: Root of the git repository
+        rel_path: Relative path to file
+        line_start: Start line
+        line_end: End line
+        question: Optional question
+        max_commits: Maximum number of commits to collect
+        use_llm: Whether to use LLM
+        repo_head: Current HEAD, recorded in the result and used to key
+            negative caching of failed commits
+        rev: Commit to analyze at; blame, history and metrics are taken as
+            of this commit instead of the working tree
+        history_mode: How evidence is found ("blame" or "range")
+
+    Returns:
+        Dictionary with head, evidence, timeline, metrics, intent and answer
+
+    Raises:
+        OperationCancelled: If the request is cancelled between stages
+    """
+    result = run_stages(
+        repo_path,
+        rel_path,
+        line_start,
+        line_end,
+        question,
+        max_commits,
+        use_llm,
+        repo_head,
+        rev,
+        history_mode,
+    )
+    with stage("serialize"):
+        return full_result(result)
+
+
+def full_result(result: dict) -> dict:
+    """A complete result in the stored layout (head first, no "diffs" flag)."""
+    full = {
+        "head": result.get("head"),
+        **{name: result[name] for name in ("evidence", "timeline", "metrics", "intent", "answer")},
+    }
+    for flag in ("skipped", "incomplete"):
+        if flag in result:
+            full[flag] = result[flag]
+    return full
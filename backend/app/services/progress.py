@@ -0,0 +1,31 @@
+"""Progress reporting from deep inside long-running work (used by jobs)."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+_current_listener: ContextVar[Callable[[dict], None] | None] = ContextVar(
+    "repolens_progress_listener", default=None
+)
+
+
+def report_progress(**fields) -> None:
+    """
+    Report progress to the current listener, if any.
+
+    Args:
+        **fields: Progress fields, e.g. stage="blame" or done=3, total=10
+    """
+    listener = _current_listener.get()
+    if listener is not None:
+        listener(fields)
+
+
+@contextmanager
+def progress_scope(listener: Callable[[dict], None] | None):
+    """Send progress reported in the enclosed block to listener."""
+    reset = _current_listener.set(listener)
+    try:
+        yield listener
+    finally:
+        _current_listener.reset(reset)
@@ -0,0 +1,224 @@
+"""Opt-in recorder of the anonymized analyze/report request stream.
+
+Each recorded request becomes one compact JSON line:
+
+    {"ts": 1700000000.123, "ep": "analyze", "r": "<repo hash>", "f": "<file hash>",
+     "s": 1, "e": 40, "q": 0, "mc": 10, "d": 12.5, "st": 200, "h": 1}
+
+Repository and file paths are replaced by salted SHA-256 prefixes so logs
+can leave the machine; the replay tool maps them back onto a local checkout.
+Both the POST and the cacheable GET variants are recorded; GET entries carry
+``"m": "GET"``. Entries are appended by a background writer thread, so a slow
+disk never holds up a request.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from ..core.config import get_settings
+from .repo_registry import get_repo_registry
+
+RECORDED_ENDPOINTS = {"/analyze": "analyze", "/report": "report"}
+# Entries waiting for the writer; beyond this, new entries are dropped
+MAX_PENDING_ENTRIES = 10000
+# Numeric request fields, parsed from GET query strings
+_INT_FIELDS = ("line_start", "line_end", "max_commits")
+
+_current_record: ContextVar[dict | None] = ContextVar(
+    "repolens_current_record", default=None
+)
+
+
+def anonymize(value: str, salt: str = "") -> str:
+    """
+    Replace a path with a stable salted hash.
+
+    Args:
+        value: Path to anonymize
+        salt: Secret salt shared with the replay tool
+
+    Returns:
+        First 16 hex chars of sha256(salt + value)
+    """
+    return hashlib.sha256(f"{salt}{value}".encode()).hexdigest()[:16]
+
+
+def note(**fields) -> None:
+    """Attach extra fields (e.g. cache hit) to the request being recorded."""
+    record = _current_record.get()
+    if record is not None:
+        record.update(fields)
+
+
+def _repo_identity(body: dict) -> str:
+    """What to hash for a request's repository when it was never resolved."""
+    if body.get("repo_path"):
+        return os.path.abspath(str(body["repo_path"]))
+    repo_id = str(body.get("repo_id") or "")
+    handle = get_repo_registry().get(repo_id) if repo_id else None
+    return handle.path if handle is not None else f"repo_id:{repo_id}"
+
+
+def query_body(request: Request) -> dict:
+    """The request fields of a GET request, with numbers parsed."""
+    body: dict = dict(request.query_params)
+    for field in _INT_FIELDS:
+        try:
+            body[field] = int(body[field])
+        except (KeyError, ValueError):
+            pass
+    return body
+
+
+def build_entry(
+    endpoint: str,
+    body: dict,
+    extra: dict,
+    seconds: float,
+    status: int,
+    salt: str,
+    method: str = "POST",
+) -> dict:
+    """
+    Build one compact log entry from a request body.
+
+    Args:
+        endpoint: Short endpoint name ("analyze" or "report")
+        body: Parsed JSON request body (or GET query parameters)
+        extra: Fields noted by the endpoint (repo_path, rel_path, hit)
+        seconds: Handler duration
+        status: HTTP status code
+        salt: Anonymization salt
+        method: HTTP method; only GET is recorded ("m")
+
+    Returns:
+        Log entry dictionary
+    """
+    repo = extra.get("repo_path") or _repo_identity(body)
+    file_path = extra.get("rel_path") or str(body.get("file_path", ""))
+    entry = {
+        "ts": round(time.time() - seconds, 3),
+        "ep": endpoint,
+        "r": anonymize(repo, salt),
+        "f": anonymize(file_path, salt),
+        "s": body.get("line_start"),
+        "e": body.get("line_end"),
+        "q": 1 if body.get("question") else 0,
+        "mc": body.get("max_commits", 10),
+        "d": round(seconds * 1000, 3),
+        "st": status,
+    }
+    if "hit" in extra:
+        entry["h"] = 1 if extra["hit"] else 0
+    if method != "POST":
+        entry["m"] = method
+    return entry
+
+
+def write_entry(path: str, entry: dict) -> None:
+    """Append an entry to the log file."""
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    with open(path, "a") as f:
+        f.write(line)
+
+
+class EntryWriter:
+    """Appends log entries from a background thread, in submission order."""
+
+    def __init__(self, max_pending: int = MAX_PENDING_ENTRIES):
+        self._queue: queue.Queue = queue.Queue(max_pending)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, path: str, entry: dict) -> None:
+        """Queue an entry for path; dropped if the writer is too far behind."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="repolens-recorder", daemon=True
+                )
+                self._thread.start()
+        try:
+            self._queue.put_nowait((path, entry))
+        except queue.Full:
+            pass
+
+    def flush(self) -> None:
+        """Wait until every queued entry has been written."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            path, entry = self._queue.get()
+            try:
+                write_entry(path, entry)
+            except OSError:
+                # Recording must never fail a request
+                pass
+            finally:
+                self._queue.task_done()
+
+
+@lru_cache(maxsize=1)
+def get_entry_writer() -> EntryWriter:
+    """Get the process-wide entry writer."""
+    return EntryWriter()
+
+
+class RecordingRoute(APIRoute):
+    """APIRoute that records analyze/report requests when REPOLENS_RECORD_FILE is set."""
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+        endpoint = RECORDED_ENDPOINTS.get(self.path)
+        if endpoint is None:
+            return original_handler
+
+        async def recording_handler(request: Request) -> Response:
+            settings = get_settings()
+            if not settings.record_file:
+                return await original_handler(request)
+
+            if request.method == "GET":
+                body = query_body(request)
+            else:
+                try:
+                    body = json.loads(await request.body() or b"{}")
+                except ValueError:
+                    body = {}
+            extra: dict = {}
+            _current_record.set(extra)
+
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await original_handler(request)
+                status = response.status_code
+                return response
+            except Exception as e:
+                status = getattr(e, "status_code", 500)
+                raise
+            finally:
+                if isinstance(body, dict):
+                    entry = build_entry(
+                        endpoint,
+                        body,
+                        extra,
+                        time.perf_counter() - start,
+                        status,
+                        settings.record_salt,
+                        request.method,
+                    )
+                    get_entry_writer().submit(settings.record_file, entry)
+
+        return recording_handler
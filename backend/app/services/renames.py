@@ -0,0 +1,302 @@
+"""Per-repository rename map, so history follows files that were moved.
+
+``git log --follow`` re-runs rename detection on every request and only
+accepts a single path. Instead, one ``git log -M --diff-filter=R`` pass
+records every rename reachable from HEAD, and the map is extended with just
+the new commits when HEAD advances. A file's lineage (the names it had, newest
+first) then turns into a plain multi-path pathspec for log-based metrics and
+history, with no rename detection at request time.
+
+The map lives in the repository's registry handle (``RepoHandle.state``), so
+it is dropped with the handle and advanced as soon as a watcher sees HEAD
+move. It is persisted in the analysis cache directory, so a restarted server
+only scans the commits made since it was last saved. Histories at an earlier
+commit use the renames reachable from that commit.
+"""
+
+import os
+import threading
+
+from .cache import cache_get, cache_set
+from .git_runner import run_git, GitCommandError
+from .repo_registry import RepoHandle, get_repo_registry
+from .telemetry import REGISTRY, stage
+
+RENAME_MAP_UPDATES = REGISTRY.counter(
+    "repolens_rename_map_updates_total",
+    "Rename map refreshes by how they were done.",
+    ["mode"],
+)
+
+# Cache entry holding the persisted map
+CACHE_KEY = "renames"
+# Name of the map in RepoHandle.state
+STATE_KEY = "renames"
+# Starts each commit in the log output (--format=%x00%H)
+_COMMIT_MARK = "\x00"
+# Longest lineage followed (guards against pathological rename chains)
+_MAX_NAMES = 32
+# Rough memory per stored rename, for the registry's budget
+_RENAME_BYTES = 256
+
+
+def parse_renames(output: str) -> list[tuple[str, str, str]]:
+    """
+    Parse ``git log -M --diff-filter=R --name-status --format=%x00%H`` output.
+
+    Args:
+        output: Log output
+
+    Returns:
+        List of (commit, old_path, new_path), newest commit first
+    """
+    renames = []
+    for chunk in output.split(_COMMIT_MARK):
+        lines = chunk.strip().split("\n")
+        if not lines or not lines[0]:
+            continue
+        commit = lines[0].strip()
+        for line in lines[1:]:
+            parts = line.split("\t")
+            if len(parts) == 3 and parts[0].startswith("R"):
+                renames.append((commit, parts[1], parts[2]))
+    return renames
+
+
+class RenameMap:
+    """
+    Renames reachable from one commit (normally HEAD), newest first.
+
+    Thread-safe. Call ``update(head)`` before querying; queries answer for the
+    commit the map was last brought up to.
+    """
+
+    def __init__(self, repo_path: str, cache_dir: str | None = None):
+        self.repo_path = repo_path
+        self.cache_dir = cache_dir
+        self.head: str | None = None
+        self._renames: list[tuple[str, str, str]] = []
+        self._by_commit: dict[str, list[tuple[str, str]]] = {}
+        # Head whose scan failed (e.g. timed out); not retried until HEAD moves
+        self._failed_head: str | None = None
+        self._lock = threading.Lock()
+
+    def _set(self, head: str, renames: list[tuple[str, str, str]]) -> None:
+        self.head = head
+        self._renames = renames
+        self._by_commit = {}
+        for commit, old, new in renames:
+            self._by_commit.setdefault(commit, []).append((old, new))
+
+    def _scan(self, revisions: list[str]) -> list[tuple[str, str, str]]:
+        output = run_git(
+            self.repo_path,
+            [
+                "log",
+                "-M",
+                "--diff-filter=R",
+                "--name-status",
+                "--format=%x00%H",
+                *revisions,
+                "--",
+            ],
+        )
+        return parse_renames(output)
+
+    def _is_ancestor(self, old: str, new: str) -> bool:
+        try:
+            run_git(self.repo_path, ["merge-base", "--is-ancestor", old, new])
+        except GitCommandError:
+            return False
+        return True
+
+    def _load(self) -> None:
+        if self.cache_dir is None:
+            return
+        saved = cache_get(self.cache_dir, CACHE_KEY)
+        if saved and saved.get("head"):
+            self._set(saved["head"], [tuple(r) for r in saved.get("renames", [])])
+            RENAME_MAP_UPDATES.inc(mode="loaded")
+
+    def _save(self) -> None:
+        if self.cache_dir is not None:
+            cache_set(
+                self.cache_dir,
+                CACHE_KEY,
+                {"head": self.head, "renames": [list(r) for r in self._renames]},
+            )
+
+    def update(self, head: str) -> bool:
+        """
+        Bring the map up to a commit.
+
+        A descendant of the current head only scans the new commits; anything
+        else (first use, history rewritten, HEAD moved back) rescans.
+
+        Args:
+            head: Commit to follow renames from
+
+        Returns:
+            True if the map is at head, False if it could not be built
+        """
+        with self._lock:
+            if self.head is None:
+                self._load()
+            if self.head == head:
+                return True
+            if self._failed_head == head:
+                return False
+            try:
+                with stage("rename_map"):
+                    if self.head is not None and self._is_ancestor(self.head, head):
+                        renames = self._scan([f"{self.head}..{head}"]) + self._renames
+                        mode = "extended"
+                    else:
+                        renames = self._scan([head])
+                        mode = "rebuilt"
+            except GitCommandError:
+                self._failed_head = head
+                RENAME_MAP_UPDATES.inc(mode="failed")
+                return False
+            self._set(head, renames)
+            self._failed_head = None
+            self._save()
+            RENAME_MAP_UPDATES.inc(mode=mode)
+            return True
+
+    def lineage(self, path: str, at: str | None = None) -> list[str]:
+        """
+        Names a file had, newest first, starting with path itself.
+
+        Following stops where the name was itself renamed away: older
+        history under that name belongs to a different file.
+
+        Args:
+            path: Relative path (at the map's head, or at at)
+            at: Commit whose history is followed, if not the map's head;
+                only renames reachable from it count
+
+        Returns:
+            List of paths
+        """
+        with self._lock:
+            renames, head = self._renames, self.head
+        reachable = None
+        if at is not None and at != head:
+            if head is not None and self._is_ancestor(at, head):
+                # The map covers at's history; skip renames made after it
+                reachable = {}
+            else:
+                # Not in the map's history (another branch): read at's own
+                try:
+                    renames = self._scan([at])
+                except GitCommandError:
+                    return [path]
+
+        names = [path]
+        current = path
+        for commit, old, new in renames:
+            if current not in (old, new):
+                continue
+            if reachable is not None:
+                if commit not in reachable:
+                    reachable[commit] = self._is_ancestor(commit, at)
+                if not reachable[commit]:
+                    continue
+            if new == current:
+                current = old
+                if old in names or len(names) >= _MAX_NAMES:
+                    break
+                names.append(old)
+            else:
+                break
+        return names
+
+    def contains(self, commit: str) -> bool:
+        """Whether commit is in the history the map covers."""
+        with self._lock:
+            head = self.head
+        return head is not None and self._is_ancestor(commit, head)
+
+    def renames_at(self, commit: str) -> list[tuple[str, str]]:
+        """(old_path, new_path) pairs renamed by a commit."""
+        with self._lock:
+            return list(self._by_commit.get(commit, ()))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._renames)
+
+    def approx_bytes(self) -> int:
+        """Rough memory footprint, for the registry's budget."""
+        return 1024 + _RENAME_BYTES * len(self)
+
+    def on_head_change(
+        self, handle: RepoHandle, old_head: str | None, new_head: str | None
+    ) -> None:
+        """Advance a map that is in use as soon as HEAD moves (see RepoHandle.state)."""
+        with self._lock:
+            in_use = self.head is not None
+        if in_use and new_head:
+            self.update(new_head)
+
+
+def rename_map_for(handle: RepoHandle) -> RenameMap:
+    """
+    The rename map of a registered repository, created on first use.
+
+    Args:
+        handle: Registered repository
+
+    Returns:
+        RenameMap kept in handle.state (not yet brought up to HEAD)
+    """
+    rename_map = handle.state.get(STATE_KEY)
+    if rename_map is None:
+        rename_map = handle.state.setdefault(
+            STATE_KEY, RenameMap(handle.path, handle.cache_dir)
+        )
+    return rename_map
+
+
+def current_rename_map(repo_path: str) -> RenameMap | None:
+    """
+    A repository's rename map, brought up to its current HEAD.
+
+    Args:
+        repo_path: Root of the git repository
+
+    Returns:
+        RenameMap, or None if the repository is invalid or the map could
+        not be built
+    """
+    try:
+        handle = get_repo_registry().register(repo_path)
+    except ValueError:
+        return None
+    head = handle.current_head()
+    rename_map = rename_map_for(handle)
+    if not head or not rename_map.update(head):
+        return None
+    return rename_map
+
+
+def follow_renames(repo_path: str, rel_path: str, at: str | None) -> list[str]:
+    """
+    Every name a file had in the history of a commit.
+
+    Args:
+        repo_path: Root of the git repository
+        rel_path: Relative path at that commit
+        at: Commit the history is read from (HEAD, or an explicit revision)
+
+    Returns:
+        Paths, newest first; just rel_path when there is no commit or the
+        rename map could not be built
+    """
+    if not at:
+        return [rel_path]
+    rename_map = current_rename_map(repo_path)
+    if rename_map is None:
+        return [rel_path]
+    return rename_map.lineage(rel_path, at)
@@ -0,0 +1,419 @@
+"""Long-lived registry of repositories with warm per-repo state."""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from ..core.config import get_settings
+from .git_runner import run_git, GitCommandError
+from .repo_validate import validate_repo
+from .evidence_collector import (
+    resolve_file_path,
+    resolve_file_at_revision,
+    resolve_revision,
+)
+from .repo_watch import RepoWatcher, watch_backend
+from .negative_cache import (
+    INVALID_REPO,
+    MISSING_FILE,
+    get_negative_cache,
+    nearest_existing_dir,
+    path_fingerprint,
+)
+
+# Rough per-entry costs used for the memory budget
+_BASE_HANDLE_BYTES = 4096
+_FILE_ENTRY_BYTES = 256
+
+
+def repo_id_for(path: str) -> str:
+    """Stable id for a repository path."""
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+
+
+class RepoHandle:
+    """
+    A registered repository and the state kept warm between requests.
+
+    Attributes:
+        repo_id: Stable id derived from the absolute path
+        path: Absolute repository root
+        git_dir: Resolved git directory
+        common_dir: Directory holding refs (differs from git_dir in worktrees)
+        cache_dir: Analysis cache directory
+        state: Named per-repo indexes owned by other services. Values may
+            define ``approx_bytes()``, ``close()`` and
+            ``on_head_change(handle, old_head, new_head)``.
+        watched: True while a filesystem watcher keeps HEAD current
+    """
+
+    def __init__(self, path: str, head: str):
+        settings = get_settings()
+        self.repo_id = repo_id_for(path)
+        self.path = os.path.abspath(path)
+        self.git_dir = self._git_path("--absolute-git-dir")
+        self.common_dir = os.path.abspath(
+            os.path.join(self.path, self._git_path("--git-common-dir"))
+        )
+        self.cache_dir = os.path.join(self.path, settings.repolens_cache_dir)
+        self.registered_at = time.time()
+        self.last_used = time.monotonic()
+        self.state: dict[str, object] = {}
+        self.watched = False
+        self._head = head
+        self._head_signature = self._ref_signature()
+        self._files: dict[str, tuple[str, str]] = {}
+        # Immutable: full commit ids known to exist, files known to exist in them
+        self._commits: set[str] = set()
+        self._files_at: dict[tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _git_path(self, flag: str) -> str:
+        try:
+            return run_git(self.path, ["rev-parse", flag]).strip()
+        except GitCommandError:
+            return os.path.join(self.path, ".git")
+
+    def _ref_signature(self) -> tuple:
+        """
+        Cheap fingerprint of everything that can move HEAD.
+
+        Covers HEAD itself, the loose ref it points at and packed-refs, so a
+        commit, checkout, reset or gc changes the signature.
+        """
+        signature = []
+        head_file = os.path.join(self.git_dir, "HEAD")
+        ref_file = None
+        try:
+            stat = os.stat(head_file)
+            signature.append(stat.st_mtime_ns)
+            with open(head_file) as f:
+                content = f.read().strip()
+            if content.startswith("ref: "):
+                ref_file = os.path.join(self.common_dir, content[5:])
+            signature.append(content)
+        except OSError:
+            signature.append(None)
+        if ref_file is not None:
+            try:
+                with open(ref_file) as f:
+                    signature.append(f.read().strip())
+            except OSError:
+                signature.append(None)
+        try:
+            stat = os.stat(os.path.join(self.common_dir, "packed-refs"))
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+        return tuple(signature)
+
+    def touch(self) -> None:
+        """Mark the handle as recently used."""
+        self.last_used = time.monotonic()
+
+    @property
+    def head(self) -> str | None:
+        """Last known HEAD commit."""
+        return self._head
+
+    def _update_head(self, head: str | None, signature: tuple) -> None:
+        """Store a newly observed HEAD and notify per-repo state if it moved."""
+        with self._lock:
+            old = self._head
+            self._head = head
+            self._head_signature = signature
+            if head != old:
+                # Resolved paths may have been added, removed or renamed
+                self._files.clear()
+        if head == old:
+            return
+        for value in list(self.state.values()):
+            hook = getattr(value, "on_head_change", None)
+            if callable(hook):
+                try:
+                    hook(self, old, head)
+                except Exception:
+                    # A failing index must not stop the watcher or the request;
+                    # its owner falls back to recomputing on next use
+                    pass
+
+    def set_head(self, head: str | None) -> None:
+        """Record a HEAD observed elsewhere (e.g. by a watcher)."""
+        self._update_head(head, self._ref_signature())
+
+    def poll_head(self) -> str | None:
+        """
+        Re-check HEAD, re-reading git only when the refs changed on disk.
+
+        Returns:
+            HEAD commit hash, or None if the repository is no longer valid
+        """
+        signature = self._ref_signature()
+        with self._lock:
+            if signature == self._head_signature and self._head is not None:
+                return self._head
+        try:
+            head = run_git(self.path, ["rev-parse", "HEAD"]).strip()
+        except GitCommandError:
+            head = None
+        self._update_head(head, signature)
+        return head
+
+    def current_head(self) -> str | None:
+        """
+        Current HEAD for the request path.
+
+        While a watcher is running the cached HEAD is returned without any
+        filesystem access; otherwise the refs are checked (see poll_head).
+
+        Returns:
+            HEAD commit hash, or None if the repository is no longer valid
+        """
+        if self.watched and self._head is not None:
+            return self._head
+        return self.poll_head()
+
+    def resolve_file(self, file_path: str) -> tuple[str, str]:
+        """
+        Resolve a file path inside this repository, memoizing the result.
+
+        Args:
+            file_path: File path (relative or absolute)
+
+        Returns:
+            Tuple of (absolute_path, relative_path)
+
+        Raises:
+            ValueError: If file is not in repo or doesn't exist
+        """
+        with self._lock:
+            resolved = self._files.get(file_path)
+        if resolved is not None and os.path.exists(resolved[0]):
+            return resolved
+
+        # Recently missing files fail fast until HEAD or the parent directory changes
+        candidate = os.path.join(self.path, file_path)
+        fingerprint = (self._head, path_fingerprint(nearest_existing_dir(candidate)))
+        negative = get_negative_cache(MISSING_FILE)
+        error = negative.check((self.repo_id, file_path), fingerprint)
+        if error is not None:
+            raise ValueError(error)
+        try:
+            resolved = resolve_file_path(self.path, file_path)
+        except ValueError as e:
+            negative.add((self.repo_id, file_path), fingerprint, str(e))
+            raise
+        with self._lock:
+            self._files[file_path] = resolved
+        return resolved
+
+    def resolve_commit(self, rev: str) -> str:
+        """
+        Resolve a commit, tag or branch to a commit id.
+
+        Full commit ids are remembered once verified, so repeated requests
+        for the same commit run no git at all; names are re-resolved because
+        they can move.
+
+        Args:
+            rev: Revision to resolve
+
+        Returns:
+            Full commit hash
+
+        Raises:
+            ValueError: If rev does not name a commit
+        """
+        with self._lock:
+            if rev in self._commits:
+                return rev
+        commit = resolve_revision(self.path, rev)
+        if commit == rev:
+            with self._lock:
+                self._commits.add(commit)
+        return commit
+
+    def resolve_file_at(self, commit: str, file_path: str) -> str:
+        """
+        Resolve a file path as it exists in a commit, memoizing the result.
+
+        Args:
+            commit: Full commit hash
+            file_path: File path (relative or absolute)
+
+        Returns:
+            Relative path to the file
+
+        Raises:
+            ValueError: If the file is not in the commit
+        """
+        with self._lock:
+            rel_path = self._files_at.get((commit, file_path))
+        if rel_path is not None:
+            return rel_path
+        rel_path = resolve_file_at_revision(self.path, commit, file_path)
+        with self._lock:
+            self._files_at[(commit, file_path)] = rel_path
+        return rel_path
+
+    def approx_bytes(self) -> int:
+        """Rough memory footprint used for eviction."""
+        entries = len(self._files) + len(self._files_at) + len(self._commits)
+        total = _BASE_HANDLE_BYTES + _FILE_ENTRY_BYTES * entries
+        for value in list(self.state.values()):
+            sizer = getattr(value, "approx_bytes", None)
+            total += sizer() if callable(sizer) else _BASE_HANDLE_BYTES
+        return total
+
+    def close(self) -> None:
+        """Release per-repo resources held in state."""
+        for value in list(self.state.values()):
+            closer = getattr(value, "close", None)
+            if callable(closer):
+                closer()
+        self.state.clear()
+
+    def to_dict(self) -> dict:
+        """Summary for the API."""
+        return {
+            "repo_id": self.repo_id,
+            "repo_path": self.path,
+            "git_dir": self.git_dir,
+            "head": self._head,
+            "registered_at": self.registered_at,
+            "idle_seconds": round(time.monotonic() - self.last_used, 3),
+            "approx_bytes": self.approx_bytes(),
+        }
+
+
+class RepoRegistry:
+    """Registered repositories, evicted LRU-first under a memory budget."""
+
+    def __init__(
+        self,
+        max_repos: int,
+        memory_budget_bytes: int,
+        idle_seconds: float,
+        watch: str = "off",
+        watch_poll_seconds: float = 1.0,
+    ):
+        self.max_repos = max_repos
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_seconds = idle_seconds
+        self.watch_backend = watch_backend(watch)
+        self.watch_poll_seconds = watch_poll_seconds
+        self._handles: "OrderedDict[str, RepoHandle]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, repo_path: str) -> RepoHandle:
+        """
+        Register a repository (idempotent) and return its handle.
+
+        Args:
+            repo_path: Path to the repository root
+
+        Returns:
+            RepoHandle
+
+        Raises:
+            ValueError: If the path is not a valid git repository
+        """
+        repo_id = repo_id_for(repo_path)
+        handle = self.get(repo_id)
+        if handle is not None:
+            return handle
+
+        # Recently invalid paths fail fast until the path or its .git changes
+        abs_path = os.path.abspath(repo_path)
+        fingerprint = path_fingerprint(abs_path, os.path.join(abs_path, ".git"))
+        negative = get_negative_cache(INVALID_REPO)
+        error = negative.check(abs_path, fingerprint)
+        if error is not None:
+            raise ValueError(error)
+
+        is_valid, head = validate_repo(repo_path)
+        if not is_valid:
+            error = f"Invalid repository: {repo_path}"
+            negative.add(abs_path, fingerprint, error)
+            raise ValueError(error)
+        handle = RepoHandle(repo_path, head)
+
+        with self._lock:
+            existing = self._handles.get(repo_id)
+            if existing is not None:
+                return existing
+            self._handles[repo_id] = handle
+        if self.watch_backend is not None:
+            handle.state["watcher"] = RepoWatcher(
+                handle, self.watch_backend, self.watch_poll_seconds
+            ).start()
+        self.evict()
+        return handle
+
+    def get(self, repo_id: str) -> RepoHandle | None:
+        """Look up a handle by id and mark it used."""
+        with self._lock:
+            handle = self._handles.get(repo_id)
+            if handle is not None:
+                self._handles.move_to_end(repo_id)
+        if handle is not None:
+            handle.touch()
+        return handle
+
+    def unregister(self, repo_id: str) -> bool:
+        """Drop a repository; returns False if it was not registered."""
+        with self._lock:
+            handle = self._handles.pop(repo_id, None)
+        if handle is None:
+            return False
+        handle.close()
+        return True
+
+    def handles(self) -> list[RepoHandle]:
+        """All registered handles, least recently used first."""
+        with self._lock:
+            return list(self._handles.values())
+
+    def evict(self) -> list[str]:
+        """
+        Evict idle repositories and enforce the count and memory budget.
+
+        Returns:
+            Ids of evicted repositories
+        """
+        evicted = []
+        now = time.monotonic()
+        with self._lock:
+            handles = list(self._handles.values())
+            total = sum(h.approx_bytes() for h in handles)
+            # Most recent entry is never evicted
+            for handle in handles[:-1]:
+                over_budget = (
+                    len(self._handles) > self.max_repos
+                    or total > self.memory_budget_bytes
+                )
+                idle = now - handle.last_used > self.idle_seconds
+                if not (over_budget or idle):
+                    continue
+                self._handles.pop(handle.repo_id, None)
+                total -= handle.approx_bytes()
+                evicted.append(handle)
+        for handle in evicted:
+            handle.close()
+        return [h.repo_id for h in evicted]
+
+
+@lru_cache(maxsize=1)
+def get_repo_registry() -> RepoRegistry:
+    """Get the process-wide repository registry."""
+    settings = get_settings()
+    return RepoRegistry(
+        max_repos=settings.max_repos,
+        memory_budget_bytes=settings.repo_memory_budget_mb * 1024 * 1024,
+        idle_seconds=settings.repo_idle_seconds,
+        watch=settings.watch,
+        watch_poll_seconds=settings.watch_poll_seconds,
+    )
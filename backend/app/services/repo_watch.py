@@ -0,0 +1,136 @@
+"""Filesystem watchers that push HEAD changes into registered repositories.
+
+With REPOLENS_WATCH enabled, every registered repository gets a background
+thread watching ``HEAD``, ``refs/`` and ``packed-refs``. Changes are applied
+to the RepoHandle as they happen (invalidating per-repo memos and notifying
+per-repo indexes), so the request path can trust the cached HEAD without
+touching the filesystem or git.
+
+Backends:
+    inotify: watchfiles (inotify on Linux, FSEvents/ReadDirectoryChanges
+        elsewhere), used when installed
+    poll: re-checks the ref signature every REPOLENS_WATCH_POLL_SECONDS
+"""
+
+import os
+import threading
+
+from .telemetry import REGISTRY
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - optional dependency
+    watchfiles = None
+
+WATCH_EVENTS = REGISTRY.counter(
+    "repolens_repo_watch_events_total", "Ref change notifications by watcher backend.", ["backend"]
+)
+WATCH_ERRORS = REGISTRY.counter(
+    "repolens_repo_watch_errors_total", "Watchers that stopped on an error.", ["backend"]
+)
+
+# Paths (relative to the git dir) that can move HEAD
+_REF_NAMES = ("HEAD", "packed-refs")
+_REF_DIR = "refs"
+
+
+def watch_backend(mode: str) -> str | None:
+    """
+    Pick a watcher backend for a REPOLENS_WATCH mode.
+
+    Args:
+        mode: "off", "auto", "inotify" or "poll"
+
+    Returns:
+        "inotify", "poll" or None when watching is off
+    """
+    if mode in ("auto", "inotify"):
+        return "inotify" if watchfiles is not None else "poll"
+    if mode == "poll":
+        return "poll"
+    return None
+
+
+class RepoWatcher:
+    """
+    Background thread keeping a RepoHandle's HEAD current.
+
+    Stored in ``handle.state`` so it stops when the handle is evicted or
+    unregistered.
+    """
+
+    def __init__(self, handle, backend: str, poll_seconds: float = 1.0):
+        self.handle = handle
+        self.backend = backend
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"repolens-watch-{handle.repo_id}", daemon=True
+        )
+
+    def start(self) -> "RepoWatcher":
+        """Start watching; the handle trusts its cached HEAD from now on."""
+        # Catch up on anything that changed before the watch was in place
+        self.handle.poll_head()
+        self.handle.watched = True
+        self._thread.start()
+        return self
+
+    def _is_ref_path(self, path: str) -> bool:
+        for root in {self.handle.git_dir, self.handle.common_dir}:
+            rel = os.path.relpath(path, root)
+            if rel in _REF_NAMES or rel.split(os.sep, 1)[0] == _REF_DIR:
+                return True
+        return False
+
+    def _run(self) -> None:
+        try:
+            if self.backend == "inotify":
+                self._run_inotify()
+            else:
+                self._run_poll()
+        except Exception:
+            WATCH_ERRORS.inc(backend=self.backend)
+        finally:
+            # Without a watcher the handle goes back to checking refs per request
+            self.handle.watched = False
+
+    def _run_inotify(self) -> None:
+        roots = sorted({self.handle.git_dir, self.handle.common_dir})
+        for changes in watchfiles.watch(
+            *roots,
+            watch_filter=lambda change, path: self._is_ref_path(path),
+            debounce=50,
+            step=20,
+            stop_event=self._stop,
+            rust_timeout=1000,
+            yield_on_timeout=True,
+            raise_interrupt=False,
+        ):
+            if self._stop.is_set():
+                return
+            if changes:
+                WATCH_EVENTS.inc(backend="inotify")
+            # Timeouts re-check too, covering changes made while the watch was starting
+            self.handle.poll_head()
+
+    def _run_poll(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            before = self.handle.head
+            if self.handle.poll_head() != before:
+                WATCH_EVENTS.inc(backend="poll")
+
+    @property
+    def running(self) -> bool:
+        """True while the watcher thread is alive."""
+        return self._thread.is_alive()
+
+    def approx_bytes(self) -> int:
+        return 1024
+
+    def close(self) -> None:
+        """Stop the watcher thread."""
+        self._stop.set()
+        self.handle.watched = False
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
@@ -1,12 +1,232 @@
-"""Report generation."""
+"""Report generation.
 
-import os
+Reports are rendered section by section as an iterator of text chunks, so a
+report can be written to disk and sent to the client as it is produced.
+Each report is stored under the analysis cache directory at a
+content-addressed path (a digest of the analysis and the format), so
+identical reports are rendered once and concurrent reports never overwrite
+each other. A stored report is served again for every identical analysis,
+so it carries no render time; it names the commit that was analyzed.
+"""
+
+import hashlib
+import html
 import json
-from datetime import datetime
-from ..models import AnalyzeResponse
+import os
+import tempfile
+from typing import Iterator
+
+from ..core.config import get_settings
+from .telemetry import REGISTRY
+
+REPORTS = REGISTRY.counter(
+    "repolens_reports_total",
+    "Reports by format and whether they were rendered or reused.",
+    ["format", "result"],
+)
+
+# Format name -> (file extension, media type)
+FORMATS = {
+    "md": ("md", "text/markdown; charset=utf-8"),
+    "html": ("html", "text/html; charset=utf-8"),
+    "json": ("json", "application/json"),
+}
+# Subdirectory of the analysis cache holding rendered reports
+REPORTS_DIR = "reports"
+
+
+def _get(item, name: str, default="Unknown"):
+    """Field of a dict or model, for reports built from either."""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def _esc(value) -> str:
+    """HTML-escape any value."""
+    return html.escape(str(value))
+
+
+def _sections(report: dict) -> dict:
+    """Report fields shared by every format."""
+    answer = report.get("answer", {})
+    return {
+        "file": report.get("file_path", "unknown"),
+        "line_range": f"{report.get('line_start', 'all')}-{report.get('line_end', 'all')}",
+        "question": report.get("question", "N/A"),
+        "commit": report.get("rev") or report.get("head") or "Unknown",
+        "answer": _get(answer, "answer", "No answer"),
+        "risk": _get(answer, "risk_assessment", {}),
+        "metrics": report.get("metrics", {}),
+        "intent": report.get("intent", {}),
+        "timeline": report.get("timeline", []),
+        "evidence": report.get("evidence", []),
+    }
+
+
+def iter_markdown(report: dict) -> Iterator[str]:
+    """
+    Render a report as Markdown, one section at a time.
+
+    Args:
+        report: Analysis response dictionary with file_path, line range and question
+
+    Yields:
+        Markdown chunks
+    """
+    s = _sections(report)
+    yield (
+        "# RepoLens Report\n\n"
+        "## Inputs\n"
+        f"- File: {s['file']}\n"
+        f"- Line range: {s['line_range']}\n"
+        f"- Question: {s['question']}\n"
+        f"- Commit: {s['commit']}\n\n"
+    )
+
+    yield f"## Answer\n{s['answer']}\n\n"
+
+    risk = s["risk"]
+    yield (
+        "## Risk Assessment\n"
+        f"- **Risk Level**: {_get(risk, 'risk_level')}\n"
+        f"- **Why**: {_get(risk, 'why')}\n"
+        f"- **Next Steps**: {_get(risk, 'suggested_next_step')}\n\n"
+    )
+
+    metrics = s["metrics"]
+    yield (
+        "## Metrics\n"
+        f"- **Churn Count**: {metrics.get('churn_count', 'Unknown')}\n"
+        f"- **Last Touch**: {metrics.get('last_touch', 'Unknown')}\n"
+        f"- **Stability**: {metrics.get('stability', 'Unknown')}\n\n"
+    )
+
+    intent = s["intent"]
+    lines = [
+        "## Intent\n",
+        f"- **Label**: {intent.get('label', 'Unknown')}\n",
+        f"- **Reason**: {intent.get('reason', 'Unknown')}\n",
+    ]
+    if intent.get("supporting_commits"):
+        lines.append(f"- **Supporting Commits**: {', '.join(intent['supporting_commits'])}\n")
+    yield "".join(lines) + "\n"
+
+    yield "## Timeline\n"
+    for item in s["timeline"]:
+        yield (
+            f"- **{_get(item, 'date')}** ({_get(item, 'label', 'unknown')}): "
+            f"{_get(item, 'commit', 'unknown')} - {_get(item, 'subject', 'unknown')}\n"
+        )
+    if not s["timeline"]:
+        yield "No timeline data.\n"
+    yield "\n"
+
+    yield "## Evidence Appendix\n"
+    for evidence in s["evidence"]:
+        yield (
+            f"### Commit {_get(evidence, 'hash', 'unknown')[:8]}\n"
+            f"- **Author**: {_get(evidence, 'author')}\n"
+            f"- **Date**: {_get(evidence, 'date')}\n"
+            f"- **Subject**: {_get(evidence, 'subject')}\n"
+        )
+    if not s["evidence"]:
+        yield "No evidence data.\n"
+
 
+def iter_html(report: dict) -> Iterator[str]:
+    """
+    Render a report as a standalone HTML page, one section at a time.
+
+    Args:
+        report: Analysis response dictionary
+
+    Yields:
+        HTML chunks
+    """
+    s = _sections(report)
+    title = f"RepoLens Report: {_esc(s['file'])}"
+    yield (
+        f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title></head>\n"
+        f"<body>\n<h1>RepoLens Report</h1>\n<h2>Inputs</h2>\n<ul>\n"
+        f"<li>File: <code>{_esc(s['file'])}</code></li>\n"
+        f"<li>Line range: {_esc(s['line_range'])}</li>\n"
+        f"<li>Question: {_esc(s['question'])}</li>\n"
+        f"<li>Commit: <code>{_esc(s['commit'])}</code></li>\n</ul>\n"
+    )
+
+    risk = s["risk"]
+    metrics = s["metrics"]
+    yield (
+        f"<h2>Answer</h2>\n<p>{_esc(s['answer'])}</p>\n"
+        "<h2>Risk Assessment</h2>\n<ul>\n"
+        f"<li><strong>Risk Level</strong>: {_esc(_get(risk, 'risk_level'))}</li>\n"
+        f"<li><strong>Why</strong>: {_esc(_get(risk, 'why'))}</li>\n"
+        f"<li><strong>Next Steps</strong>: {_esc(_get(risk, 'suggested_next_step'))}</li>\n</ul>\n"
+        "<h2>Metrics</h2>\n<ul>\n"
+        f"<li><strong>Churn Count</strong>: {_esc(metrics.get('churn_count', 'Unknown'))}</li>\n"
+        f"<li><strong>Last Touch</strong>: {_esc(metrics.get('last_touch', 'Unknown'))}</li>\n"
+        f"<li><strong>Stability</strong>: {_esc(metrics.get('stability', 'Unknown'))}</li>\n</ul>\n"
+    )
+
+    intent = s["intent"]
+    supporting = ", ".join(intent.get("supporting_commits") or []) or "none"
+    yield (
+        "<h2>Intent</h2>\n<ul>\n"
+        f"<li><strong>Label</strong>: {_esc(intent.get('label', 'Unknown'))}</li>\n"
+        f"<li><strong>Reason</strong>: {_esc(intent.get('reason', 'Unknown'))}</li>\n"
+        f"<li><strong>Supporting Commits</strong>: {_esc(supporting)}</li>\n</ul>\n"
+    )
 
-def generate_markdown(analyze_response_dict: dict) -> tuple[str, str]:
+    yield "<h2>Timeline</h2>\n<ul>\n"
+    for item in s["timeline"]:
+        label = _esc(_get(item, "label", "unknown"))
+        commit = _esc(_get(item, "commit", "unknown"))
+        subject = _esc(_get(item, "subject", "unknown"))
+        yield (
+            f"<li><strong>{_esc(_get(item, 'date'))}</strong> ({label}): "
+            f"<code>{commit}</code> - {subject}</li>\n"
+        )
+    yield "</ul>\n<h2>Evidence Appendix</h2>\n"
+    for evidence in s["evidence"]:
+        yield (
+            f"<h3>Commit <code>{_esc(_get(evidence, 'hash', 'unknown')[:8])}</code></h3>\n<ul>\n"
+            f"<li><strong>Author</strong>: {_esc(_get(evidence, 'author'))}</li>\n"
+            f"<li><strong>Date</strong>: {_esc(_get(evidence, 'date'))}</li>\n"
+            f"<li><strong>Subject</strong>: {_esc(_get(evidence, 'subject'))}</li>\n</ul>\n"
+            f"<pre>{_esc(_get(evidence, 'diff_snippet', ''))}</pre>\n"
+        )
+    yield "</body></html>\n"
+
+
+def iter_json(report: dict) -> Iterator[str]:
+    """
+    Render a report as a JSON document, streaming the evidence list.
+
+    Args:
+        report: Analysis response dictionary
+
+    Yields:
+        JSON text chunks that concatenate to one object
+    """
+    head = {k: v for k, v in report.items() if k != "evidence"}
+    yield json.dumps(head, default=str)[:-1] + ', "evidence": ['
+    for i, evidence in enumerate(report.get("evidence", [])):
+        if not isinstance(evidence, dict):
+            evidence = evidence.model_dump()
+        yield ("," if i else "") + json.dumps(evidence, default=str)
+    yield "]}\n"
+
+
+RENDERERS = {"md": iter_markdown, "html": iter_html, "json": iter_json}
+
+
+def render_report(report: dict, fmt: str = "md") -> str:
+    """Render a whole report in one of FORMATS."""
+    return "".join(RENDERERS[fmt](report))
+
+
+def generate_markdown(analyze_response_dict: dict) -> str:
     """
     Generate a markdown report from analysis response.
 
@@ -14,85 +234,176 @@ def generate_markdown(analyze_response_dict: dict) -> tuple[str, str]:
         analyze_response_dict: Analysis response dictionary
 
     Returns:
-        Tuple of (markdown_content, file_path)
-    """
-    # Extract data from response
-    evidence_list = analyze_response_dict.get("evidence", [])
-    timeline = analyze_response_dict.get("timeline", [])
-    metrics = analyze_response_dict.get("metrics", {})
-    intent = analyze_response_dict.get("intent", {})
-    answer = analyze_response_dict.get("answer", {})
-
-    # Build markdown
-    md = "# RepoLens Report\n\n"
-
-    md += "## Inputs\n"
-    md += f"- File: {analyze_response_dict.get('file_path', 'unknown')}\n"
-    md += f"- Line range: {analyze_response_dict.get('line_start', 'all')}-{analyze_response_dict.get('line_end', 'all')}\n"
-    md += f"- Question: {analyze_response_dict.get('question', 'N/A')}\n"
-    md += f"- Generated: {datetime.now().isoformat()}\n\n"
-
-    md += "## Answer\n"
-    if isinstance(answer, dict):
-        md += f"{answer.get('answer', 'No answer')}\n\n"
-    else:
-        md += f"{answer.answer if hasattr(answer, 'answer') else 'No answer'}\n\n"
-
-    md += "## Risk Assessment\n"
-    if isinstance(answer, dict):
-        ra = answer.get("risk_assessment", {})
-        md += f"- **Risk Level**: {ra.get('risk_level', 'Unknown')}\n"
-        md += f"- **Why**: {ra.get('why', 'Unknown')}\n"
-        md += f"- **Next Steps**: {ra.get('suggested_next_step', 'Unknown')}\n"
-    else:
-        if hasattr(answer, "risk_assessment"):
-            ra = answer.risk_assessment
-            md += f"- **Risk Level**: {ra.risk_level}\n"
-            md += f"- **Why**: {ra.why}\n"
-            md += f"- **Next Steps**: {ra.suggested_next_step}\n"
-    md += "\n"
-
-    md += "## Metrics\n"
-    md += f"- **Churn Count**: {metrics.get('churn_count', 'Unknown')}\n"
-    md += f"- **Last Touch**: {metrics.get('last_touch', 'Unknown')}\n"
-    md += f"- **Stability**: {metrics.get('stability', 'Unknown')}\n\n"
-
-    md += "## Intent\n"
-    md += f"- **Label**: {intent.get('label', 'Unknown')}\n"
-    md += f"- **Reason**: {intent.get('reason', 'Unknown')}\n"
-    if intent.get("supporting_commits"):
-        md += f"- **Supporting Commits**: {', '.join(intent['supporting_commits'])}\n"
-    md += "\n"
-
-    md += "## Timeline\n"
-    if timeline:
-        for item in timeline:
-            if isinstance(item, dict):
-                md += f"- **{item.get('date', 'Unknown')}** ({item.get('label', 'unknown')}): "
-                md += f"{item.get('commit', 'unknown')} - {item.get('subject', 'unknown')}\n"
-            else:
-                md += f"- **{item.date}** ({item.label}): {item.commit} - {item.subject}\n"
-    else:
-        md += "No timeline data.\n"
-    md += "\n"
-
-    md += "## Evidence Appendix\n"
-    if evidence_list:
-        for evidence in evidence_list:
-            if isinstance(evidence, dict):
-                md += f"### Commit {evidence.get('hash', 'unknown')[:8]}\n"
-                md += f"- **Author**: {evidence.get('author', 'Unknown')}\n"
-                md += f"- **Date**: {evidence.get('date', 'Unknown')}\n"
-                md += f"- **Subject**: {evidence.get('subject', 'Unknown')}\n"
-            else:
-                md += f"### Commit {evidence.hash[:8]}\n"
-                md += f"- **Author**: {evidence.author}\n"
-                md += f"- **Date**: {evidence.date}\n"
-                md += f"- **Subject**: {evidence.subject}\n"
-    else:
-        md += "No evidence data.\n"
-
-    return md
+        Markdown content
+    """
+    return render_report(analyze_response_dict, "md")
+
+
+def iter_index(title: str, entries: list[dict], fmt: str = "md") -> Iterator[str]:
+    """
+    Render an index of per-file reports, linking each one.
+
+    Args:
+        title: Index heading (e.g. the path prefix or glob)
+        entries: Dictionaries with file_path and either report_id,
+            risk_level and stability, or error
+        fmt: Index format (md, html or json)
+
+    Yields:
+        Text chunks
+    """
+    if fmt == "json":
+        yield json.dumps({"title": title, "files": entries}, default=str) + "\n"
+        return
+    if fmt == "html":
+        yield (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>RepoLens Index: {_esc(title)}</title></head>\n<body>\n"
+            f"<h1>RepoLens Index: {_esc(title)}</h1>\n<table>\n"
+            "<tr><th>File</th><th>Risk</th><th>Stability</th></tr>\n"
+        )
+        for entry in entries:
+            path = _esc(entry["file_path"])
+            if entry.get("error"):
+                error = _esc(entry["error"])
+                yield f"<tr><td>{path}</td><td colspan=\"2\">failed: {error}</td></tr>\n"
+                continue
+            yield (
+                f"<tr><td><a href=\"{_esc(entry['report_id'])}\">{path}</a></td>"
+                f"<td>{_esc(entry.get('risk_level'))}</td>"
+                f"<td>{_esc(entry.get('stability'))}</td></tr>\n"
+            )
+        yield "</table>\n</body></html>\n"
+        return
+    yield f"# RepoLens Index: {title}\n\n| File | Risk | Stability |\n| --- | --- | --- |\n"
+    for entry in entries:
+        if entry.get("error"):
+            yield f"| {entry['file_path']} | failed: {entry['error']} | |\n"
+        else:
+            yield (
+                f"| [{entry['file_path']}]({entry['report_id']}) | "
+                f"{entry.get('risk_level')} | {entry.get('stability')} |\n"
+            )
+
+
+def save_index(cache_dir: str, title: str, entries: list[dict], fmt: str = "md") -> str:
+    """
+    Store an index next to the reports it links (see iter_index).
+
+    Returns:
+        Path of the stored index
+    """
+    name = "index-" + report_name({"title": title, "files": entries}, fmt)
+    path = report_path(cache_dir, name)
+    cached, chunks = _stored(path, lambda: iter_index(title, entries, fmt))
+    if not cached:
+        for _ in chunks:
+            pass
+    return path
+
+
+def report_name(report: dict, fmt: str) -> str:
+    """
+    Content-addressed file name of a report.
+
+    Args:
+        report: Analysis response dictionary
+        fmt: Report format
+
+    Returns:
+        "<digest>.<extension>", the same for identical analyses
+    """
+    canonical = json.dumps(report, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{fmt}:{canonical}".encode()).hexdigest()[:32]
+    return f"{digest}.{FORMATS[fmt][0]}"
+
+
+def report_path(cache_dir: str, name: str) -> str:
+    """
+    Path of a stored report.
+
+    Raises:
+        ValueError: If name is not a report file name
+    """
+    if os.path.basename(name) != name or name.startswith("."):
+        raise ValueError(f"Invalid report name: {name}")
+    return os.path.join(cache_dir, REPORTS_DIR, name)
+
+
+def _read_chunks(path: str, chunk_size: int = 65536) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def _write_through(path: str, chunks: Iterator[str]) -> Iterator[str]:
+    """Yield chunks while writing them to a temp file, renamed into place at the end."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, path)
+        tmp_path = None
+    finally:
+        # Abandoned (e.g. client disconnected) or failed: leave nothing behind
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def _stored(path: str, render) -> tuple[bool, Iterator[str]]:
+    """(True, stored chunks) if path exists, else (False, chunks written through to it)."""
+    if os.path.exists(path):
+        return True, _read_chunks(path)
+    return False, _write_through(path, render())
+
+
+def stream_report(cache_dir: str, report: dict, fmt: str = "md") -> tuple[str, Iterator[str]]:
+    """
+    Stream a report, rendering and storing it unless it is already stored.
+
+    Args:
+        cache_dir: Analysis cache directory
+        report: Analysis response dictionary
+        fmt: Report format (md, html or json)
+
+    Returns:
+        Tuple of (stored file path, iterator of text chunks). The file is
+        complete once the iterator is exhausted.
+    """
+    path = report_path(cache_dir, report_name(report, fmt))
+    cached, chunks = _stored(path, lambda: RENDERERS[fmt](report))
+    REPORTS.inc(format=fmt, result="cached" if cached else "rendered")
+    return path, chunks
+
+
+def save_report(cache_dir: str, report: dict, fmt: str = "md") -> tuple[str, str]:
+    """
+    Render (or reuse) a stored report and return its content.
+
+    Args:
+        cache_dir: Analysis cache directory
+        report: Analysis response dictionary
+        fmt: Report format (md, html or json)
+
+    Returns:
+        Tuple of (content, saved_file_path)
+
+    Raises:
+        ValueError: If the report could not be written
+    """
+    try:
+        path, chunks = stream_report(cache_dir, report, fmt)
+        return "".join(chunks), path
+    except OSError as e:
+        raise ValueError(f"Could not write report: {e}")
 
 
 def generate_markdown_and_save(
@@ -108,18 +419,5 @@ def generate_markdown_and_save(
     Returns:
         Tuple of (markdown_content, saved_file_path)
     """
-    md_content = generate_markdown(analyze_response_dict)
-
-    # Determine cache directory
-    cache_dir = os.path.join(repo_path, ".repolens_cache")
-    os.makedirs(cache_dir, exist_ok=True)
-
-    report_path = os.path.join(cache_dir, "report.md")
-
-    try:
-        with open(report_path, "w") as f:
-            f.write(md_content)
-    except Exception as e:
-        raise ValueError(f"Could not write report: {e}")
-
-    return md_content, report_path
+    cache_dir = os.path.join(repo_path, get_settings().repolens_cache_dir)
+    return save_report(cache_dir, analyze_response_dict, "md")
@@ -0,0 +1,126 @@
+"""Resolution of analysis requests to a file, line range and cache key.
+
+The API, jobs and the offline CLI all resolve requests here, so a request
+gets the same cache key (and shares the cached analysis) whichever way it
+arrives.
+"""
+
+from .cache import cache_key
+from .repo_registry import RepoHandle, get_repo_registry
+from .telemetry import stage
+
+# Line range analyzed when a request does not give both bounds
+DEFAULT_LINE_RANGE = (1, 200)
+
+
+def resolve_target(params: dict) -> tuple[RepoHandle, str, str | None]:
+    """
+    Resolve a request's repository, commit and file.
+
+    Args:
+        params: Request parameters (repo_path or repo_id, optional file_path
+            and rev)
+
+    Returns:
+        Tuple of (handle, commit, rel_path) where commit is the current HEAD
+        or the resolved rev, and rel_path is None without a file_path
+
+    Raises:
+        KeyError: For an unknown repo_id
+        ValueError: If the repository, revision or file is invalid
+    """
+    registry = get_repo_registry()
+    rev = params.get("rev")
+    with stage("validate"):
+        if params.get("repo_id"):
+            handle = registry.get(params["repo_id"])
+            if handle is None:
+                raise KeyError("Unknown repo_id")
+        else:
+            try:
+                handle = registry.register(params.get("repo_path") or "")
+            except ValueError:
+                raise ValueError("Invalid repository")
+        commit = handle.resolve_commit(rev) if rev else handle.current_head()
+    if commit is None:
+        raise ValueError("Invalid repository")
+
+    rel_path = None
+    file_path = params.get("file_path")
+    if file_path:
+        with stage("resolve"):
+            if rev:
+                rel_path = handle.resolve_file_at(commit, file_path)
+            else:
+                _, rel_path = handle.resolve_file(file_path)
+    return handle, commit, rel_path
+
+
+def line_range(line_start: int | None, line_end: int | None) -> tuple[int, int]:
+    """Apply the default line range when either bound is missing."""
+    if line_start is None or line_end is None:
+        return DEFAULT_LINE_RANGE
+    return line_start, line_end
+
+
+def analysis_key(
+    commit: str,
+    rel_path: str,
+    line_start: int,
+    line_end: int,
+    rev: str | None,
+    params: dict,
+) -> str:
+    """
+    Cache key of an analysis.
+
+    Args:
+        commit: Current HEAD, or the commit rev resolved to
+        rel_path: Relative path to file
+        line_start: Start line
+        line_end: End line
+        rev: Resolved commit when analyzing at a revision
+        params: Request fields (question, max_commits, use_llm, history_mode)
+
+    Returns:
+        Cache key
+    """
+    return cache_key(
+        f"rev:{rev}" if rev else commit,
+        rel_path,
+        line_start,
+        line_end,
+        params.get("question"),
+        params.get("max_commits", 10),
+        params.get("use_llm", False),
+        params.get("history_mode", "blame"),
+    )
+
+
+def analysis_target(params: dict) -> tuple[RepoHandle, str, str, int, int, str | None, str]:
+    """
+    Resolve an analysis request and compute its cache key.
+
+    Args:
+        params: Analyze or report request fields (repo_path or repo_id,
+            file_path, line_start, line_end, rev, question, max_commits,
+            use_llm, history_mode)
+
+    Returns:
+        Tuple of (handle, commit, rel_path, line_start, line_end, rev, key)
+        where commit is the current HEAD or the resolved rev, and rev is the
+        resolved commit when the request named a revision
+
+    Raises:
+        KeyError: For an unknown repo_id
+        ValueError: If the request has no file_path, or the repository,
+            revision or file is invalid
+    """
+    if not params.get("file_path"):
+        raise ValueError("file_path is required")
+    handle, commit, rel_path = resolve_target(params)
+    line_start, line_end = line_range(params.get("line_start"), params.get("line_end"))
+    # A resolved revision is immutable: its entries never need a HEAD check
+    rev = commit if params.get("rev") else None
+    key = analysis_key(commit, rel_path, line_start, line_end, rev, params)
+    return handle, commit, rel_path, line_start, line_end, rev, key
@@ -0,0 +1,273 @@
+"""Runtime instrumentation: counters, histograms and per-request stage timings."""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .tracing import record_trace_stage
+from .progress import report_progress
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set like {a="1",b="2"}."""
+    parts = [
+        f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing .0."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str, labelnames: list[str] | None = None):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames or [])
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for a label set."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current value for a label set (0 if never incremented)."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> list[str]:
+        """Render the counter in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for a label set."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """Decrement the gauge for a label set."""
+        self.inc(-amount, **labels)
+
+    def render(self) -> list[str]:
+        """Render the gauge in Prometheus text format."""
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: list[str] | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames or [])
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        """Number of observations for a label set."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            return int(state[-1]) if state else 0
+
+    def render(self) -> list[str]:
+        """Render the histogram in Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(state[i])}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {_format_value(state[-1])}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{plain} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together at /metrics."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: list[str] | None = None) -> Counter:
+        """Create (or fetch) a counter."""
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: list[str] | None = None) -> Gauge:
+        """Create (or fetch) a gauge."""
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: list[str] | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create (or fetch) a histogram."""
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "repolens_stage_seconds", "Time spent in each analysis pipeline stage.", ["stage"]
+)
+GIT_COMMANDS = REGISTRY.counter(
+    "repolens_git_commands_total", "Git invocations by subcommand and outcome.",
+    ["subcommand", "status"],
+)
+GIT_SECONDS = REGISTRY.histogram(
+    "repolens_git_command_seconds", "Git invocation duration by subcommand.", ["subcommand"]
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "repolens_cache_lookups_total", "Analysis cache lookups by result.", ["result"]
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "repolens_http_request_seconds", "HTTP request duration.", ["method", "path", "status"]
+)
+
+# Per-request list of (stage, seconds), set by the HTTP middleware.
+_request_timings: ContextVar[list[tuple[str, float]] | None] = ContextVar(
+    "repolens_request_timings", default=None
+)
+
+
+def begin_request_timings() -> list[tuple[str, float]]:
+    """Start collecting stage timings for the current request."""
+    timings: list[tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a finished stage in the histogram and the request's timings."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    record_trace_stage(name, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block of work as a named pipeline stage.
+
+    Args:
+        name: Stage name (e.g. "blame", "metrics")
+    """
+    report_progress(stage=name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def format_server_timing(timings: list[tuple[str, float]]) -> str:
+    """
+    Format stage timings as a Server-Timing header value.
+
+    Repeated stages (e.g. one commit_details per commit) are summed and
+    annotated with their call count.
+
+    Args:
+        timings: List of (stage, seconds)
+
+    Returns:
+        Header value such as "blame;dur=12.1, metrics;dur=3.4"
+    """
+    totals: dict[str, float] = {}
+    counts: dict[str, int] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+        counts[name] = counts.get(name, 0) + 1
+
+    parts = []
+    for name, seconds in totals.items():
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if counts[name] > 1:
+            entry += f';desc="x{counts[name]}"'
+        parts.append(entry)
+    return ", ".join(parts)
@@ -0,0 +1,189 @@
+"""Opt-in per-request traces of git calls, pipeline stages and profiles."""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ..core.config import get_settings
+
+PROFILE_TOP_N = 40
+
+
+class RequestTrace:
+    """Everything recorded for one traced request."""
+
+    def __init__(self, request_id: str, method: str, path: str, profile: bool = False):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.profile_requested = profile
+        self.started_at = time.time()
+        self.duration_ms: float | None = None
+        self.status_code: int | None = None
+        self.git_calls: list[dict] = []
+        self.stages: list[dict] = []
+        self.profile: str | None = None
+        self._lock = threading.Lock()
+
+    def add_git_call(self, entry: dict) -> None:
+        """Append a git call record."""
+        with self._lock:
+            self.git_calls.append(entry)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Append a pipeline stage record."""
+        with self._lock:
+            self.stages.append({"stage": name, "duration_ms": round(seconds * 1000, 3)})
+
+    def to_dict(self) -> dict:
+        """Serialize the trace for the debug endpoint."""
+        with self._lock:
+            git_calls = list(self.git_calls)
+            stages = list(self.stages)
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status_code": self.status_code,
+            "git_calls": git_calls,
+            "git_total_ms": round(sum(c["duration_ms"] for c in git_calls), 3),
+            "stages": stages,
+            "profile": self.profile,
+        }
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar(
+    "repolens_current_trace", default=None
+)
+_traces: "OrderedDict[str, RequestTrace]" = OrderedDict()
+_traces_lock = threading.Lock()
+
+
+def trace_mode(header_value: str | None) -> str | None:
+    """
+    Decide whether a request is traced.
+
+    Args:
+        header_value: Value of the X-RepoLens-Trace header, if any
+
+    Returns:
+        None (not traced), "trace", or "profile"
+    """
+    if header_value:
+        value = header_value.strip().lower()
+        if value == "profile":
+            return "profile"
+        if value in ("1", "true", "yes", "on", "trace"):
+            return "trace"
+    if get_settings().trace_all:
+        return "trace"
+    return None
+
+
+def start_trace(request_id: str, method: str, path: str, profile: bool = False) -> RequestTrace:
+    """Begin tracing the current request context."""
+    trace = RequestTrace(request_id, method, path, profile=profile)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> RequestTrace | None:
+    """Trace for the current request, if tracing is enabled."""
+    return _current_trace.get()
+
+
+def finish_trace(trace: RequestTrace, status_code: int, seconds: float) -> None:
+    """Close a trace and store it in the ring buffer."""
+    trace.status_code = status_code
+    trace.duration_ms = round(seconds * 1000, 3)
+    limit = max(1, get_settings().trace_buffer_size)
+    with _traces_lock:
+        _traces[trace.request_id] = trace
+        _traces.move_to_end(trace.request_id)
+        while len(_traces) > limit:
+            _traces.popitem(last=False)
+
+
+def get_trace(request_id: str) -> RequestTrace | None:
+    """Look up a stored trace by request id."""
+    with _traces_lock:
+        return _traces.get(request_id)
+
+
+def list_traces() -> list[dict]:
+    """Summaries of stored traces, newest first."""
+    with _traces_lock:
+        traces = list(_traces.values())
+    return [
+        {
+            "request_id": t.request_id,
+            "method": t.method,
+            "path": t.path,
+            "started_at": t.started_at,
+            "duration_ms": t.duration_ms,
+            "status_code": t.status_code,
+            "git_calls": len(t.git_calls),
+        }
+        for t in reversed(traces)
+    ]
+
+
+def record_git_call(
+    args: list[str],
+    seconds: float,
+    output_chars: int,
+    exit_code: int | None,
+    status: str,
+) -> None:
+    """Record a git invocation in the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.add_git_call(
+        {
+            "args": list(args),
+            "duration_ms": round(seconds * 1000, 3),
+            "output_chars": output_chars,
+            "exit_code": exit_code,
+            "status": status,
+        }
+    )
+
+
+def record_trace_stage(name: str, seconds: float) -> None:
+    """Record a pipeline stage in the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+@contextmanager
+def trace_profile():
+    """
+    Profile the enclosed block with cProfile when the trace asked for it.
+
+    The profile is collected in the calling thread, so wrap the code that
+    actually does the analysis work.
+    """
+    trace = _current_trace.get()
+    if trace is None or not trace.profile_requested:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        trace.profile = out.getvalue()
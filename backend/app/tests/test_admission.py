@@ -0,0 +1,232 @@
+"""Tests for admission control."""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import app
+from app.services.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    get_admission_controller,
+    yield_to_interactive,
+)
+from app.services.repo_registry import repo_id_for
+
+
+def _run_concurrently(controller, repos, hold=0.05):
+    """Run one worker per repo entry and return peak concurrency per repo."""
+    lock = threading.Lock()
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+    peak_total = [0]
+
+    def work(repo):
+        with controller.slot(repo):
+            with lock:
+                active[repo] = active.get(repo, 0) + 1
+                peak[repo] = max(peak.get(repo, 0), active[repo])
+                peak_total[0] = max(peak_total[0], sum(active.values()))
+            time.sleep(hold)
+            with lock:
+                active[repo] -= 1
+
+    threads = [threading.Thread(target=work, args=(r,)) for r in repos]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return peak, peak_total[0]
+
+
+def test_per_repo_and_global_limits():
+    """Test that concurrency never exceeds the configured limits."""
+    controller = AdmissionController(
+        global_limit=3, repo_limit=2, max_queue=100, max_queue_per_repo=100
+    )
+    peak, peak_total = _run_concurrently(controller, ["a"] * 6 + ["b"] * 6)
+    assert peak["a"] <= 2 and peak["b"] <= 2
+    assert peak_total <= 3
+    assert controller.stats()["active"] == 0
+    assert controller.stats()["queued"] == 0
+
+
+def test_queue_depth_rejection():
+    """Test that a full per-repo queue rejects with a Retry-After hint."""
+    controller = AdmissionController(
+        global_limit=4, repo_limit=1, max_queue=100, max_queue_per_repo=0
+    )
+    with controller.slot("a"):
+        with pytest.raises(AdmissionRejected) as exc:
+            with controller.slot("a"):
+                pass
+        assert exc.value.scope == "repo"
+        assert exc.value.retry_after >= 1
+        # Other repositories are unaffected
+        with controller.slot("b"):
+            pass
+
+
+def test_slot_timeout_withdraws_ticket():
+    """Test that a timed-out waiter leaves the queue."""
+    controller = AdmissionController(
+        global_limit=1, repo_limit=1, max_queue=10, max_queue_per_repo=10
+    )
+    with controller.slot("a"):
+        with pytest.raises(AdmissionRejected):
+            with controller.slot("a", timeout=0.05):
+                pass
+        assert controller.stats()["queued"] == 0
+
+
+def _queue_in_order(controller, items, order):
+    """Start one waiter per (repo, priority) item, each queued before the next."""
+    threads = []
+    for repo, priority in items:
+        def work(repo=repo, priority=priority):
+            with controller.slot(repo, priority=priority):
+                order.append((repo, priority))
+
+        queued = controller.stats()["queued"]
+        thread = threading.Thread(target=work)
+        thread.start()
+        while controller.stats()["queued"] == queued:
+            time.sleep(0.005)
+        threads.append(thread)
+    return threads
+
+
+def test_interactive_dispatched_before_background():
+    """Test that a freed slot goes to the highest waiting priority class."""
+    controller = AdmissionController(
+        global_limit=1, repo_limit=1, max_queue=10, max_queue_per_repo=10
+    )
+    order = []
+    with controller.slot("a"):
+        threads = _queue_in_order(
+            controller,
+            [("a", "prefetch"), ("a", "batch"), ("a", "interactive")],
+            order,
+        )
+    for t in threads:
+        t.join()
+    assert [p for _, p in order] == ["interactive", "batch", "prefetch"]
+    classes = controller.stats()["classes"]
+    assert classes["batch"]["admitted"] == 1
+    assert classes["interactive"]["admitted"] == 2
+
+
+def test_weighted_fair_sharing_across_repos():
+    """Test that a burst for one repo does not hold back another, by weight."""
+    controller = AdmissionController(
+        global_limit=1,
+        repo_limit=1,
+        max_queue=20,
+        max_queue_per_repo=20,
+        repo_weights={"a": 2.0},
+    )
+    order = []
+    with controller.slot("x"):
+        threads = _queue_in_order(
+            controller, [("a", "batch")] * 6 + [("b", "batch")] * 3, order
+        )
+    for t in threads:
+        t.join()
+    assert [repo for repo, _ in order] == ["a", "b", "a", "a", "b", "a", "a", "b", "a"]
+
+
+def test_background_limit_reserves_interactive_capacity():
+    """Test that background work never takes the last free slot."""
+    controller = AdmissionController(
+        global_limit=2, repo_limit=2, max_queue=100, max_queue_per_repo=100
+    )
+    peak = [0]
+
+    def work():
+        with controller.slot("a", priority="batch"):
+            peak[0] = max(peak[0], controller.stats()["classes"]["batch"]["active"])
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    # An interactive request still gets the reserved slot immediately
+    with controller.slot("a", timeout=0.01):
+        pass
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+
+
+def test_background_yields_slot_to_waiting_interactive():
+    """Test that background work hands its slot over and then resumes."""
+    controller = AdmissionController(
+        global_limit=1, repo_limit=1, max_queue=10, max_queue_per_repo=10
+    )
+    order = []
+    with controller.slot("a", priority="batch"):
+        assert not yield_to_interactive()
+        threads = _queue_in_order(controller, [("b", "interactive")], order)
+        assert yield_to_interactive()
+        order.append(("a", "batch"))
+    for t in threads:
+        t.join()
+    assert order == [("b", "interactive"), ("a", "batch")]
+    stats = controller.stats()
+    assert stats["classes"]["batch"]["yields"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_debug_endpoint_reports_class_latency(temp_git_repo):
+    """Test that per-class admission figures are served by /debug/admission."""
+    client = TestClient(app)
+    response = client.post(
+        "/analyze", json={"repo_path": temp_git_repo["path"], "file_path": "test.py"}
+    )
+    assert response.status_code == 200
+    stats = client.get("/debug/admission").json()
+    assert set(stats["classes"]) == {"interactive", "batch", "prefetch"}
+    assert stats["classes"]["interactive"]["admitted"] >= 1
+    assert stats["classes"]["interactive"]["avg_latency_seconds"] > 0
+    assert stats["active"] == 0
+
+
+def test_background_held_back_over_latency_target():
+    """Test that slow interactive requests pause background dispatch."""
+    controller = AdmissionController(
+        global_limit=4,
+        repo_limit=4,
+        max_queue=10,
+        max_queue_per_repo=10,
+        interactive_target=0.01,
+    )
+    with controller.slot("a"):
+        time.sleep(0.03)
+    assert controller.stats()["interactive_over_target"]
+    with pytest.raises(AdmissionRejected):
+        with controller.slot("a", timeout=0.1, priority="batch"):
+            pass
+
+
+def test_analyze_returns_429_when_queue_full(temp_git_repo, monkeypatch):
+    """Test that the API surfaces a full queue as 429 with Retry-After."""
+    monkeypatch.setenv("REPOLENS_REPO_CONCURRENCY", "1")
+    monkeypatch.setenv("REPOLENS_MAX_REPO_QUEUE_DEPTH", "0")
+    get_settings.cache_clear()
+    get_admission_controller.cache_clear()
+    try:
+        client = TestClient(app)
+        controller = get_admission_controller()
+        with controller.slot(repo_id_for(temp_git_repo["path"])):
+            response = client.post(
+                "/analyze",
+                json={"repo_path": temp_git_repo["path"], "file_path": "test.py"},
+            )
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    finally:
+        get_settings.cache_clear()
+        get_admission_controller.cache_clear()
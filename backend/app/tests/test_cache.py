@@ -0,0 +1,130 @@
+"""Tests for the analysis cache, including multi-process stress tests."""
+
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app.services.cache import cache_get, cache_get_or_compute, cache_set, KeyLock
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="flock is POSIX-only")
+
+
+def _compute_once(cache_dir: str, key: str, counter_path: str, results) -> None:
+    """Worker: coalesce on key, counting how many workers actually compute."""
+
+    def compute():
+        with open(counter_path, "a") as f:
+            f.write("x")
+        time.sleep(0.3)
+        return {"value": 42, "pid": os.getpid()}
+
+    payload, hit = cache_get_or_compute(cache_dir, key, compute)
+    results.put((payload, hit))
+
+
+def _write_loop(cache_dir: str, key: str, rounds: int) -> None:
+    """Worker: repeatedly rewrite a large entry."""
+    for i in range(rounds):
+        cache_set(cache_dir, key, {"round": i, "blob": "y" * 200_000})
+
+
+def _read_loop(cache_dir: str, key: str, rounds: int, results) -> None:
+    """Worker: read the entry concurrently, reporting any torn reads."""
+    torn = 0
+    seen = 0
+    for _ in range(rounds):
+        path = os.path.join(cache_dir, f"{key}.json")
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            assert len(data["blob"]) == 200_000
+            seen += 1
+        except FileNotFoundError:
+            continue
+        except (ValueError, AssertionError, KeyError):
+            torn += 1
+    results.put((torn, seen))
+
+
+def test_cache_set_get_roundtrip(tmp_path):
+    """Test basic set/get and that no temp files are left behind."""
+    cache_set(str(tmp_path), "k", {"a": 1})
+    assert cache_get(str(tmp_path), "k") == {"a": 1}
+    assert cache_get(str(tmp_path), "missing") is None
+    assert sorted(os.listdir(tmp_path)) == ["k.json"]
+
+
+def test_single_flight_across_processes(tmp_path):
+    """Test that concurrent workers compute a key exactly once."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    counter = tmp_path / "computed"
+    cache_dir = str(tmp_path / "cache")
+    procs = [
+        ctx.Process(target=_compute_once, args=(cache_dir, "shared", str(counter), results))
+        for _ in range(6)
+    ]
+    for p in procs:
+        p.start()
+    outcomes = [results.get(timeout=60) for _ in procs]
+    for p in procs:
+        p.join(timeout=60)
+
+    assert counter.read_text() == "x"
+    payloads = [payload for payload, _ in outcomes]
+    assert all(p == payloads[0] for p in payloads)
+    assert sum(1 for _, hit in outcomes if not hit) == 1
+    # Lock files are cleaned up
+    assert sorted(os.listdir(cache_dir)) == ["shared.json"]
+
+
+def test_no_torn_reads_under_concurrent_writes(tmp_path):
+    """Test that readers never observe a partially written entry."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    cache_dir = str(tmp_path)
+    writers = [ctx.Process(target=_write_loop, args=(cache_dir, "hot", 40)) for _ in range(2)]
+    readers = [
+        ctx.Process(target=_read_loop, args=(cache_dir, "hot", 200, results)) for _ in range(3)
+    ]
+    for p in writers + readers:
+        p.start()
+    outcomes = [results.get(timeout=60) for _ in readers]
+    for p in writers + readers:
+        p.join(timeout=60)
+
+    assert sum(torn for torn, _ in outcomes) == 0
+    assert sum(seen for _, seen in outcomes) > 0
+
+
+def test_key_lock_is_exclusive(tmp_path):
+    """Test that a second holder times out while the first holds the lock."""
+    first = KeyLock(str(tmp_path), "k")
+    second = KeyLock(str(tmp_path), "k")
+    assert first.acquire(timeout=1)
+    assert not second.acquire(timeout=0.05)
+    first.release()
+    assert second.acquire(timeout=1)
+    second.release()
+
+
+def test_unwritable_cache_dir_does_not_fail_analysis(temp_git_repo):
+    """Test that /analyze still answers when the cache directory cannot be created."""
+    from fastapi.testclient import TestClient
+
+    from app.core.config import get_settings
+    from app.main import app
+
+    repo = temp_git_repo["path"]
+    # A plain file where the cache directory should be: makedirs and open fail
+    with open(os.path.join(repo, get_settings().repolens_cache_dir), "w") as f:
+        f.write("not a directory")
+    assert not KeyLock(os.path.join(repo, get_settings().repolens_cache_dir), "k").acquire(1)
+
+    response = TestClient(app).post("/analyze", json={"repo_path": repo, "file_path": "test.py"})
+    assert response.status_code == 200
+    assert response.json()["cache"]["hit"] is False
+    assert response.json()["evidence"]
@@ -0,0 +1,83 @@
+"""Tests for request-scoped cancellation."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import _watch_cancellation
+from app.main import app
+from app.services.cancellation import CancelToken, OperationCancelled, cancel_scope
+from app.services.git_runner import run_git
+
+SLOW_GIT = ["-c", "alias.slow=!sleep 5", "slow"]
+
+
+def test_cancel_kills_running_git(temp_git_repo):
+    """Test that cancelling a token kills its in-flight git process."""
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel, args=("disconnected",)).start()
+
+    start = time.monotonic()
+    with cancel_scope(token):
+        with pytest.raises(OperationCancelled) as exc:
+            run_git(temp_git_repo["path"], SLOW_GIT)
+    assert exc.value.reason == "disconnected"
+    assert time.monotonic() - start < 3
+
+
+def test_deadline_caps_git_timeout(temp_git_repo):
+    """Test that a deadline stops git before its own timeout."""
+    token = CancelToken(deadline_seconds=0.2)
+    start = time.monotonic()
+    with cancel_scope(token):
+        with pytest.raises(OperationCancelled) as exc:
+            run_git(temp_git_repo["path"], SLOW_GIT)
+    assert exc.value.reason == "deadline"
+    assert time.monotonic() - start < 3
+
+
+def test_cancelled_token_skips_git(temp_git_repo):
+    """Test that no git process starts once cancelled."""
+    token = CancelToken()
+    token.cancel("disconnected")
+    with cancel_scope(token):
+        with pytest.raises(OperationCancelled):
+            run_git(temp_git_repo["path"], ["rev-parse", "HEAD"])
+    # Without a token, git runs normally
+    assert len(run_git(temp_git_repo["path"], ["rev-parse", "HEAD"]).strip()) == 40
+
+
+def test_analyze_deadline_returns_504(temp_git_repo):
+    """Test that an expired deadline fails the request with 504."""
+    client = TestClient(app)
+    body = {"repo_path": temp_git_repo["path"], "file_path": "test.py"}
+    response = client.post("/analyze", json={**body, "deadline_ms": 0})
+    assert response.status_code == 504
+    response = client.post("/analyze", json=body, headers={"X-RepoLens-Deadline-Ms": "0"})
+    assert response.status_code == 504
+    # Nothing was cached for the cancelled request
+    response = client.post("/analyze", json=body)
+    assert response.status_code == 200
+    assert response.json()["cache"]["hit"] is False
+
+
+def test_watcher_cancels_on_disconnect():
+    """Test that a disconnected client cancels queued work."""
+
+    class DisconnectedRequest:
+        async def is_disconnected(self):
+            return True
+
+    async def go():
+        token = CancelToken()
+        work = asyncio.create_task(asyncio.sleep(10))
+        await _watch_cancellation(DisconnectedRequest(), token, work, lambda: False)
+        with pytest.raises(asyncio.CancelledError):
+            await work
+        return token
+
+    token = asyncio.run(go())
+    assert token.reason == "disconnected"
@@ -0,0 +1,82 @@
+"""Tests for the offline repolens CLI."""
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.tools.cli import analyze_request, parse_diff, read_requests, run
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_jsonl_requests_stream_results_and_errors(temp_git_repo):
+    """Test in-process runs: results, per-line errors and shared cache."""
+    repo = temp_git_repo["path"]
+    hunk = {"repo_path": repo, "file_path": "test.py", "line_start": 1, "line_end": 2}
+    lines = [
+        json.dumps({"id": "a", **hunk}),
+        "not json",
+        json.dumps({"id": "b", "repo_path": repo, "file_path": "missing.py"}),
+        json.dumps({"id": "c", **hunk}),
+    ]
+    out = io.StringIO()
+    failed = run(read_requests(lines), jobs=1, out=out)
+    records = {r["index"]: r for r in map(json.loads, out.getvalue().splitlines())}
+
+    assert failed == 2
+    assert records[0]["id"] == "a"
+    assert records[0]["line_start"] == 1 and records[0]["line_end"] == 2
+    assert records[0]["metrics"]["churn_count"] == 3
+    assert "Invalid JSON" in records[1]["error"]
+    assert records[2]["id"] == "b" and records[2]["error"]
+    # Same request again is served from the on-disk cache
+    assert records[0]["cache"]["hit"] is False
+    assert records[3]["cache"] == {"hit": True, "key": records[0]["cache"]["key"]}
+
+
+def test_diff_input_runs_each_hunk_on_worker_processes(temp_git_repo):
+    """Test that every hunk of a diff is analyzed, using several processes."""
+    repo = temp_git_repo["path"]
+    with open(os.path.join(repo, "other.py"), "w") as f:
+        f.write("a = 1\nb = 2\n")
+    subprocess.run(["git", "add", "other.py"], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "Add other"], cwd=repo, check=True)
+    diff = subprocess.run(
+        ["git", "diff", "HEAD~2", "HEAD"], cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+    hunks = parse_diff(diff.splitlines(keepends=True))
+    assert {h["file_path"] for h in hunks} == {"test.py", "other.py"}
+
+    result = subprocess.run(
+        [sys.executable, "-m", "app.tools.cli", "--diff", "-", "--repo", repo, "--jobs", "2"],
+        input=diff,
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted(r["index"] for r in records) == list(range(len(hunks)))
+    assert all("error" not in r and r["evidence"] for r in records)
+
+
+def test_cli_and_analyze_endpoint_share_cache_keys(temp_git_repo):
+    """Test that a request gets the same cache key from the CLI and from /analyze."""
+    repo = temp_git_repo["path"]
+    client = TestClient(app)
+    requests = [
+        {"repo_path": repo, "file_path": "test.py"},
+        {"repo_path": repo, "file_path": "test.py", "line_start": 2},
+        {"repo_path": repo, "file_path": "./test.py", "line_start": 1, "line_end": 3,
+         "rev": "HEAD~1", "question": "Why?", "max_commits": 5, "history_mode": "range"},
+        {"repo_path": repo, "file_path": "test.py", "fields": "metrics,intent"},
+    ]
+    for request in requests:
+        cli_key = analyze_request(dict(request))["cache"]["key"]
+        assert client.post("/analyze", json=request).json()["cache"]["key"] == cli_key
@@ -0,0 +1,73 @@
+"""Tests for the shared commit detail cache."""
+
+from app.models import CommitEvidence
+from app.services import evidence_collector
+from app.services.commit_cache import CommitCache, get_commit_cache
+from app.services.evidence_collector import collect_evidence
+
+
+def _details(commit_hash: str) -> CommitEvidence:
+    return CommitEvidence(
+        hash=commit_hash,
+        author="Test User",
+        date="2024-01-01T00:00:00+00:00",
+        subject="Subject",
+        diff_snippet="diff --git a/x b/x",
+    )
+
+
+def test_lru_eviction():
+    """Test that the least recently used commit is evicted first."""
+    cache = CommitCache(max_entries=2)
+    a, b, c = "a" * 40, "b" * 40, "c" * 40
+    cache.put(a, _details(a))
+    cache.put(b, _details(b))
+    assert cache.get(a) is not None  # a is now most recent
+    cache.put(c, _details(c))
+    assert cache.get(b) is None
+    assert cache.get(a) is not None
+    assert len(cache) == 2
+
+
+def test_abbreviated_hashes_are_not_cached():
+    """Test that only full hashes are used as keys."""
+    cache = CommitCache()
+    cache.put("abc123", _details("abc123"))
+    assert cache.get("abc123") is None
+
+
+def test_persisted_across_instances(tmp_path):
+    """Test that the disk store serves a fresh process."""
+    path = str(tmp_path / "commits.db")
+    first = CommitCache(path=path)
+    first.put("d" * 40, _details("d" * 40))
+    first.close()
+
+    second = CommitCache(path=path)
+    try:
+        assert second.get("d" * 40) == _details("d" * 40)
+    finally:
+        second.close()
+
+
+def test_collect_evidence_reuses_commits(temp_git_repo, monkeypatch):
+    """Test that a second file/request does not refetch known commits."""
+    get_commit_cache.cache_clear()
+    calls = []
+    original = evidence_collector.get_commit_details
+
+    def counting(repo_path, commit_hash, *args, **kwargs):
+        calls.append(commit_hash)
+        return original(repo_path, commit_hash, *args, **kwargs)
+
+    monkeypatch.setattr(evidence_collector, "get_commit_details", counting)
+    try:
+        first = collect_evidence(temp_git_repo["path"], "test.py", 1, 5)
+        fetched = len(calls)
+        second = collect_evidence(temp_git_repo["path"], "test.py", 1, 5)
+    finally:
+        get_commit_cache.cache_clear()
+
+    assert fetched == len(first) > 0
+    assert len(calls) == fetched
+    assert second == first
@@ -1,8 +1,12 @@
 """End-to-end tests."""
 
+import json
+import subprocess
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services.repo_registry import repo_id_for
 
 
 @pytest.fixture
@@ -129,6 +133,27 @@ def test_report_generation(client, temp_git_repo):
     assert "RepoLens Report" in data["markdown"]
     assert ".repolens_cache" in data["saved_to"]
 
+    # A stored report is reused for identical analyses, so it names the
+    # analyzed commit rather than a render time
+    head = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=temp_git_repo["path"],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert f"- Commit: {head}" in data["markdown"]
+    assert "Generated" not in data["markdown"]
+
+    # The report's analysis went through the cache shared with /analyze
+    analysis = client.post(
+        "/analyze",
+        json={
+            "repo_path": temp_git_repo["path"],
+            "file_path": temp_git_repo["file_path"],
+            "line_start": 1,
+            "line_end": 5,
+        },
+    )
+    assert analysis.json()["cache"]["hit"] is True
+
 
 def test_analyze_timeline_contains_commits(client, temp_git_repo):
     """Test that timeline contains commit information."""
@@ -194,3 +219,302 @@ def test_invalid_file_path(client, temp_git_repo):
         },
     )
     assert response.status_code == 400
+
+
+def test_server_timing_header(client, temp_git_repo):
+    """Test that analyze responses carry per-stage Server-Timing."""
+    response = client.post(
+        "/analyze",
+        json={
+            "repo_path": temp_git_repo["path"],
+            "file_path": temp_git_repo["file_path"],
+            "line_start": 1,
+            "line_end": 5,
+        },
+    )
+    assert response.status_code == 200
+    server_timing = response.headers["Server-Timing"]
+    assert "blame;dur=" in server_timing
+    assert "metrics;dur=" in server_timing
+    assert "total;dur=" in server_timing
+
+
+def test_metrics_endpoint(client, temp_git_repo):
+    """Test Prometheus metrics after an analysis."""
+    client.post(
+        "/analyze",
+        json={
+            "repo_path": temp_git_repo["path"],
+            "file_path": temp_git_repo["file_path"],
+        },
+    )
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'repolens_stage_seconds_bucket{stage="blame",le="+Inf"}' in body
+    assert 'repolens_git_commands_total{subcommand="blame",status="ok"}' in body
+    assert 'repolens_cache_lookups_total{result="miss"}' in body
+    assert 'path="/analyze"' in body
+
+
+def test_trace_records_git_calls(client, temp_git_repo):
+    """Test that a traced request can be fetched by request id."""
+    response = client.post(
+        "/analyze",
+        json={
+            "repo_path": temp_git_repo["path"],
+            "file_path": temp_git_repo["file_path"],
+            "line_start": 1,
+            "line_end": 5,
+        },
+        headers={"X-RepoLens-Trace": "profile", "X-Request-Id": "trace-test-1"},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Request-Id"] == "trace-test-1"
+
+    trace = client.get(response.headers["X-RepoLens-Trace-Url"]).json()
+    assert trace["request_id"] == "trace-test-1"
+    assert trace["status_code"] == 200
+    subcommands = [call["args"][0] for call in trace["git_calls"]]
+    assert "blame" in subcommands
+    assert all(call["exit_code"] == 0 for call in trace["git_calls"])
+    assert any(s["stage"] == "metrics" for s in trace["stages"])
+    assert trace["profile"]
+
+    listing = client.get("/debug/traces").json()
+    assert listing["traces"][0]["request_id"] == "trace-test-1"
+
+
+def test_untraced_request_has_no_trace(client):
+    """Test that tracing is off unless requested."""
+    response = client.get("/health")
+    assert "X-RepoLens-Trace-Url" not in response.headers
+    assert client.get("/debug/traces/missing").status_code == 404
+
+
+def test_register_repo_and_analyze_by_id(client, temp_git_repo):
+    """Test registering a repo and analyzing through its repo_id."""
+    response = client.post("/repos", json={"repo_path": temp_git_repo["path"]})
+    assert response.status_code == 200
+    info = response.json()
+    assert len(info["head"]) == 40
+
+    listed = client.get("/repos").json()["repos"]
+    assert info["repo_id"] in [r["repo_id"] for r in listed]
+
+    response = client.post(
+        "/analyze",
+        json={"repo_id": info["repo_id"], "file_path": temp_git_repo["file_path"]},
+    )
+    assert response.status_code == 200
+    assert len(response.json()["evidence"]) >= 1
+
+    assert client.delete(f"/repos/{info['repo_id']}").status_code == 200
+    response = client.post(
+        "/analyze",
+        json={"repo_id": info["repo_id"], "file_path": temp_git_repo["file_path"]},
+    )
+    assert response.status_code == 404
+
+
+def test_analyze_requires_repo(client):
+    """Test that either repo_path or repo_id must be given."""
+    response = client.post("/analyze", json={"file_path": "test.py"})
+    assert response.status_code == 422
+
+
+def test_analyze_at_revision(client, temp_git_repo):
+    """Test analysis as of an older commit, cached immutably."""
+    repo = temp_git_repo["path"]
+    subprocess.run(["git", "tag", "v1", "HEAD~2"], cwd=repo, check=True)
+    first_commit = subprocess.run(
+        ["git", "rev-parse", "v1"], cwd=repo, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    body = {"repo_path": repo, "file_path": "test.py", "line_start": 1, "line_end": 5}
+    response = client.post("/analyze", json={**body, "rev": "v1"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["rev"] == first_commit
+    assert [e["hash"] for e in data["evidence"]] == [first_commit]
+    assert data["metrics"]["churn_count"] == 1
+
+    # The full commit id hits the same entry, and once verified runs no git
+    response = client.post("/analyze", json={**body, "rev": first_commit})
+    assert response.json()["cache"] == {"hit": True, "key": data["cache"]["key"]}
+    client.post(
+        "/analyze",
+        json={**body, "rev": first_commit},
+        headers={"X-RepoLens-Trace": "trace", "X-Request-Id": "rev-hit-2"},
+    )
+    assert client.get("/debug/traces/rev-hit-2").json()["git_calls"] == []
+
+
+def test_analyze_unknown_revision(client, temp_git_repo):
+    """Test that unknown revisions and files missing at a revision are rejected."""
+    body = {"repo_path": temp_git_repo["path"], "file_path": "test.py"}
+    assert client.post("/analyze", json={**body, "rev": "no-such-branch"}).status_code == 400
+    assert client.post("/analyze", json={**body, "rev": "--output=x"}).status_code == 400
+    response = client.post(
+        "/analyze", json={**body, "file_path": "missing.py", "rev": "HEAD"}
+    )
+    assert response.status_code == 400
+
+
+def test_analyze_range_history(client, temp_git_repo):
+    """Test that range history finds commits whose lines were rewritten since."""
+    body = {
+        "repo_path": temp_git_repo["path"],
+        "file_path": "test.py",
+        "line_start": 3,
+        "line_end": 3,
+    }
+    blame = client.post("/analyze", json=body).json()
+    history = client.post("/analyze", json={**body, "history_mode": "range"}).json()
+    assert len(blame["evidence"]) == 1
+    subjects = [e["subject"] for e in history["evidence"]]
+    assert subjects == ["workaround: temporary fix", "fix: resolve issue", "Initial commit"]
+    # Diffs are scoped to the range, not the whole commit
+    assert "wave" not in history["evidence"][0]["diff_snippet"]
+    assert history["cache"]["key"] != blame["cache"]["key"]
+
+    limited = client.post(
+        "/analyze", json={**body, "history_mode": "range", "max_commits": 1}
+    ).json()
+    assert [e["subject"] for e in limited["evidence"]] == subjects[:1]
+
+
+def test_history_modes_read_the_committed_file(temp_git_repo):
+    """Test that both modes ignore uncommitted edits and range mode resolves an open end."""
+    from app.services.evidence_collector import collect_evidence, get_range_history
+
+    repo = temp_git_repo["path"]
+    with open(f"{repo}/test.py") as f:
+        lines = f.readlines()
+    with open(f"{repo}/test.py", "w") as f:
+        f.writelines(["# Edited, not committed\n", *lines[1:]])
+
+    blame = collect_evidence(repo, "test.py", 1, 1, history_mode="blame")
+    assert [e.subject for e in blame] == ["Initial commit"]
+    whole = get_range_history(repo, "test.py", None, None)
+    assert whole == get_range_history(repo, "test.py", 1, len(lines))
+    assert [e.subject for e in whole][-1] == "Initial commit"
+
+
+def test_report_formats_stream_and_serve(client, temp_git_repo):
+    """Test content-addressed reports in each format, streamed and served."""
+    body = {
+        "repo_path": temp_git_repo["path"],
+        "file_path": "test.py",
+        "line_start": 1,
+        "line_end": 5,
+    }
+    md = client.post("/report", json=body).json()
+    again = client.post("/report", json=body).json()
+    other = client.post("/report", json={**body, "line_end": 3}).json()
+    assert md["report_id"] == again["report_id"] != other["report_id"]
+    assert md["report_id"].endswith(".md")
+
+    html_report = client.post("/report", json={**body, "format": "html"}).json()
+    assert html_report["markdown"].startswith("<!DOCTYPE html>")
+    json_report = client.post("/report", json={**body, "format": "json"}).json()
+    assert json.loads(json_report["markdown"])["file_path"] == "test.py"
+
+    streamed = client.post("/report", json={**body, "format": "html", "stream": True})
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"].startswith("text/html")
+    location = streamed.headers["content-location"]
+    assert location.endswith(html_report["report_id"])
+
+    repo_id = repo_id_for(temp_git_repo["path"])
+    served = client.get(f"/repos/{repo_id}/reports/{md['report_id']}")
+    assert served.status_code == 200
+    assert served.text == md["markdown"]
+    assert client.get(f"/repos/{repo_id}/reports/missing.md").status_code == 404
+    assert client.get(f"/repos/{repo_id}/reports/..%2Fx.md").status_code in (400, 404)
+
+
+def test_get_analyze_and_report_conditional(client, temp_git_repo):
+    """Test ETags, 304 on If-None-Match, gzip, and new ETags when HEAD moves."""
+    repo = temp_git_repo["path"]
+    params = {"repo_path": repo, "file_path": "test.py"}
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/analyze", params=params, headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag == f'W/"{first.json()["cache"]["key"]}"'
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.json()["metrics"]["churn_count"] == 3
+
+    again = client.get("/analyze", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+    report = client.get("/report", params={**params, "format": "json"})
+    assert report.status_code == 200
+    assert report.json()["file_path"] == "test.py"
+    assert report.headers["Content-Location"].endswith(".json")
+    assert report.headers["ETag"] != etag
+    report_again = client.get(
+        "/report",
+        params={**params, "format": "json"},
+        headers={"If-None-Match": report.headers["ETag"]},
+    )
+    assert report_again.status_code == 304
+
+    subprocess.run(["git", "commit", "--allow-empty", "-qm", "Move HEAD"], cwd=repo, check=True)
+    moved = client.get("/analyze", params=params, headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["ETag"] != etag
+
+    bad = client.get("/analyze", params={"file_path": "test.py"})
+    assert bad.status_code == 422
+
+
+def test_analyze_fields_runs_only_needed_stages(client, temp_git_repo, monkeypatch):
+    """Test field selection, diff-less evidence, and combining partial results."""
+    from app.services import evidence_collector
+    from app.services.commit_cache import get_commit_cache
+
+    get_commit_cache.cache_clear()
+    diff_limits = []
+    original = evidence_collector.get_commit_details
+
+    def recording(repo_path, commit_hash, max_diff_chars=2000):
+        diff_limits.append(max_diff_chars)
+        return original(repo_path, commit_hash, max_diff_chars)
+
+    monkeypatch.setattr(evidence_collector, "get_commit_details", recording)
+    body = {"repo_path": temp_git_repo["path"], "file_path": "test.py"}
+
+    metrics = client.post("/analyze", json={**body, "fields": ["metrics"]}).json()
+    assert set(metrics) == {"metrics", "cache", "rev"}
+    assert metrics["metrics"]["churn_count"] == 3
+    assert diff_limits == []
+
+    evidence = client.post("/analyze", json={**body, "fields": ["evidence"]}).json()
+    assert evidence["evidence"] and "diff_snippet" not in evidence["evidence"][0]
+    assert diff_limits and set(diff_limits) == {0}
+
+    # Metrics and evidence come from the partial entry; diffs are fetched now
+    diff_limits.clear()
+    rest = client.get(
+        "/analyze", params={**body, "fields": "answer,diff_snippet"}
+    )
+    assert rest.status_code == 200
+    assert set(rest.json()) == {"evidence", "answer", "cache", "rev"}
+    assert rest.json()["evidence"][0]["diff_snippet"]
+    assert set(diff_limits) == {2000}
+
+    # Every stage is now stored, so the full result is a cache hit
+    full = client.post("/analyze", json=body).json()
+    assert full["cache"]["hit"] is True
+    assert full["intent"]["label"] and full["timeline"]
+    get_commit_cache.cache_clear()
+
+    bad = client.post("/analyze", json={**body, "fields": ["nope"]})
+    assert bad.status_code == 422
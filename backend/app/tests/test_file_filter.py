@@ -0,0 +1,72 @@
+"""Tests for short-circuiting binary, generated and oversized files."""
+
+import os
+import subprocess
+
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import app
+from app.services import pipeline
+from app.services.file_filter import BINARY, GENERATED, TOO_MANY_LINES, skip_reason
+
+
+def _commit(repo_path: str, name: str, data: bytes) -> str:
+    with open(os.path.join(repo_path, name), "wb") as f:
+        f.write(data)
+    subprocess.run(["git", "add", name], cwd=repo_path, check=True)
+    subprocess.run(["git", "commit", "-qm", f"Add {name}"], cwd=repo_path, check=True)
+    return subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def test_skip_reasons(temp_git_repo, monkeypatch):
+    """Test attribute, content and threshold detection, in the tree and at a revision."""
+    repo = temp_git_repo["path"]
+    _commit(repo, ".gitattributes", b"*.lock linguist-generated\n*.dat -diff\n")
+    _commit(repo, "deps.lock", b"pinned = 1\n")
+    _commit(repo, "table.dat", b"plain text\n")
+    head = _commit(repo, "logo.png", b"\x89PNG\r\n\x1a\n\0\0\0IHDR")
+
+    assert skip_reason(repo, "test.py") is None
+    assert skip_reason(repo, "deps.lock") == GENERATED
+    assert skip_reason(repo, "table.dat") == BINARY
+    assert skip_reason(repo, "logo.png") == BINARY
+    assert skip_reason(repo, "logo.png", head) == BINARY
+
+    # Only the committed blob counts: blame reads HEAD, not the working tree
+    with open(os.path.join(repo, "test.py"), "wb") as f:
+        f.write(b"\0" * 16)
+    assert skip_reason(repo, "test.py") is None
+    with open(os.path.join(repo, "logo.png"), "wb") as f:
+        f.write(b"text now\n")
+    assert skip_reason(repo, "logo.png") == BINARY
+
+    monkeypatch.setenv("REPOLENS_MAX_FILE_LINES", "2")
+    get_settings.cache_clear()
+    try:
+        assert skip_reason(repo, "test.py") == TOO_MANY_LINES
+        assert skip_reason(repo, "test.py", head) == TOO_MANY_LINES
+    finally:
+        get_settings.cache_clear()
+
+
+def test_binary_file_gets_metrics_only(temp_git_repo, monkeypatch):
+    """Test that a binary file is never blamed and still gets metrics."""
+    repo = temp_git_repo["path"]
+    _commit(repo, "logo.png", b"\x89PNG\r\n\x1a\n\0\0\0IHDR")
+
+    def no_blame(*args, **kwargs):
+        raise AssertionError("binary files must not be blamed")
+
+    monkeypatch.setattr(pipeline, "collect_evidence", no_blame)
+    response = TestClient(app).post(
+        "/analyze", json={"repo_path": repo, "file_path": "logo.png"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["skipped"] == BINARY
+    assert data["evidence"] == [] and data["timeline"] == []
+    assert data["metrics"]["churn_count"] == 1
+    assert "binary" in data["intent"]["reason"]
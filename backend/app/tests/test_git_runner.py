@@ -1,7 +1,8 @@
 """Tests for git command runner."""
 
 import pytest
-from app.services.git_runner import run_git, GitCommandError
+from app.services.git_runner import iter_git_lines, run_git, GitCommandError
+from app.services.telemetry import GIT_COMMANDS
 
 
 def test_run_git_success(temp_git_repo):
@@ -22,3 +23,16 @@ def test_run_git_log(temp_git_repo):
     output = run_git(temp_git_repo["path"], ["log", "--oneline"])
     lines = output.strip().split("\n")
     assert len(lines) >= 3  # We created 3 commits
+
+
+def test_iter_git_lines_streams_and_stops_early(temp_git_repo):
+    """Test that lines are streamed and closing the iterator stops git."""
+    lines = iter_git_lines(temp_git_repo["path"], ["log", "--format=%H"])
+    first = next(lines)
+    assert len(first) == 40
+    lines.close()
+    assert GIT_COMMANDS.value(subcommand="log", status="stopped") >= 1
+
+    assert len(list(iter_git_lines(temp_git_repo["path"], ["log", "--format=%H"]))) == 3
+    with pytest.raises(GitCommandError):
+        list(iter_git_lines(temp_git_repo["path"], ["invalid-command"]))
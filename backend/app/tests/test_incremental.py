@@ -0,0 +1,62 @@
+"""Tests for incremental re-analysis after HEAD moves."""
+
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.incremental import INCREMENTAL
+
+
+def _commit(repo_path: str, filename: str, content: str, message: str) -> None:
+    with open(f"{repo_path}/{filename}", "a") as f:
+        f.write(content)
+    subprocess.run(["git", "add", filename], cwd=repo_path, check=True)
+    subprocess.run(["git", "commit", "-qm", message], cwd=repo_path, check=True)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _analyze(client, repo_path: str) -> dict:
+    response = client.post(
+        "/analyze",
+        json={"repo_path": repo_path, "file_path": "test.py", "line_start": 1, "line_end": 10},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_unrelated_commit_reuses_previous_result(client, temp_git_repo):
+    """Test that a HEAD move not touching the file reuses the old result."""
+    repo = temp_git_repo["path"]
+    first = _analyze(client, repo)
+    assert first["cache"]["hit"] is False
+
+    _commit(repo, "other.py", "x = 1\n", "Add unrelated file")
+    reused_before = INCREMENTAL.value(mode="reused")
+    second = _analyze(client, repo)
+
+    assert second["cache"]["hit"] is False
+    assert second["cache"]["key"] != first["cache"]["key"]
+    assert INCREMENTAL.value(mode="reused") == reused_before + 1
+    assert second["evidence"] == first["evidence"]
+    assert second["metrics"] == first["metrics"]
+
+
+def test_touching_commit_reblames(client, temp_git_repo):
+    """Test that a commit to the file re-blames and picks up the new commit."""
+    repo = temp_git_repo["path"]
+    first = _analyze(client, repo)
+
+    _commit(repo, "test.py", "# appended\n", "Append a line")
+    reblame_before = INCREMENTAL.value(mode="reblame")
+    second = _analyze(client, repo)
+
+    assert INCREMENTAL.value(mode="reblame") == reblame_before + 1
+    subjects = [e["subject"] for e in second["evidence"]]
+    assert "Append a line" in subjects
+    assert second["metrics"]["churn_count"] == first["metrics"]["churn_count"] + 1
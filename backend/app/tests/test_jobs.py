@@ -0,0 +1,227 @@
+"""Tests for the asynchronous job API."""
+
+import json
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import jobs
+from app.services.bulk import list_tracked_files
+from app.services.jobs import JobManager
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _wait(predicate, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.02)
+    raise AssertionError("timed out")
+
+
+def _wait_done(manager: JobManager, job_id: str):
+    return _wait(lambda: manager.get(job_id).status not in jobs.PENDING and manager.get(job_id))
+
+
+def test_analyze_job_lands_in_cache(client, temp_git_repo):
+    """Test that an analyze job finishes and its result serves /analyze."""
+    body = {"repo_path": temp_git_repo["path"], "file_path": "test.py", "line_start": 1, "line_end": 5}
+    response = client.post("/jobs", json={"kind": "analyze", **body})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    info = _wait(lambda: (r := client.get(f"/jobs/{job_id}").json())["status"] == "done" and r)
+    assert info["progress"]["stage"]
+
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert len(result.json()["evidence"]) >= 1
+
+    response = client.post("/analyze", json=body)
+    assert response.json()["cache"] == {"hit": True, "key": result.json()["cache"]["key"]}
+
+
+def test_report_job_shares_the_analysis_cache(client, temp_git_repo):
+    """Test that a report job's analysis is reused by /analyze."""
+    body = {"repo_path": temp_git_repo["path"], "file_path": "test.py", "line_start": 1, "line_end": 3}
+    job_id = client.post("/jobs", json={"kind": "report", **body}).json()["job_id"]
+    report = _wait(
+        lambda: (r := client.get(f"/jobs/{job_id}/result")).status_code == 200 and r.json()
+    )
+    assert report["markdown"]
+    assert client.post("/analyze", json=body).json()["cache"]["hit"] is True
+
+
+def test_hotspots_job(client, temp_git_repo):
+    """Test that a hotspot job ranks the repository's files."""
+    response = client.post("/jobs", json={"kind": "hotspots", "repo_path": temp_git_repo["path"]})
+    job_id = response.json()["job_id"]
+    result = _wait(
+        lambda: (r := client.get(f"/jobs/{job_id}/result")).status_code == 200 and r.json()
+    )
+    assert result["hotspots"][0]["path"] == "test.py"
+    assert result["hotspots"][0]["commits"] == 3
+
+
+def test_job_validation(client, temp_git_repo):
+    """Test that bad jobs are rejected before they are queued."""
+    repo = temp_git_repo["path"]
+    assert client.post("/jobs", json={"kind": "analyze", "repo_path": repo}).status_code == 422
+    response = client.post(
+        "/jobs", json={"kind": "analyze", "repo_path": repo, "file_path": "missing.py"}
+    )
+    assert response.status_code == 400
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_cancel_queued_job(monkeypatch):
+    """Test that a queued job can be cancelled before it runs."""
+    release = threading.Event()
+    monkeypatch.setitem(jobs.RUNNERS, "hotspots", lambda params: (release.wait(10), None))
+    manager = JobManager(workers=1, max_pending=10, git_timeout_sec=10)
+    try:
+        blocker = manager.submit("hotspots", {})
+        queued = manager.submit("hotspots", {})
+        manager.cancel(queued.id)
+        # Reported straight away, not once a worker picks it up
+        assert manager.get(queued.id).status == "cancelled"
+        release.set()
+        assert _wait_done(manager, queued.id).status == "cancelled"
+        assert _wait_done(manager, blocker.id).status == "done"
+    finally:
+        manager.shutdown()
+
+
+def test_job_cancelled_outside_git_is_not_done(monkeypatch):
+    """Test that a job cancelled after its last git command is recorded as cancelled."""
+    started, release = threading.Event(), threading.Event()
+
+    def runner(params):
+        # Work with no cancellation point, such as rendering a report
+        started.set()
+        release.wait(10)
+        return {"rendered": True}, None
+
+    monkeypatch.setitem(jobs.RUNNERS, "hotspots", runner)
+    manager = JobManager(workers=1, max_pending=10, git_timeout_sec=10)
+    try:
+        job = manager.submit("hotspots", {})
+        assert started.wait(10)
+        manager.cancel(job.id)
+        release.set()
+        job = _wait_done(manager, job.id)
+        assert job.status == "cancelled" and job.result is None
+    finally:
+        manager.shutdown()
+
+
+def test_queue_is_bounded(monkeypatch):
+    """Test that submissions beyond max_pending are rejected."""
+    release = threading.Event()
+    monkeypatch.setitem(jobs.RUNNERS, "hotspots", lambda params: (release.wait(10), None))
+    manager = JobManager(workers=1, max_pending=2, git_timeout_sec=10)
+    try:
+        manager.submit("hotspots", {})
+        manager.submit("hotspots", {})
+        with pytest.raises(jobs.JobQueueFull):
+            manager.submit("hotspots", {})
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_journal_resumes_unfinished_jobs(tmp_path, temp_git_repo):
+    """Test that jobs pending at shutdown run after a restart, and results persist."""
+    journal = tmp_path / "jobs.jsonl"
+    params = {"repo_path": temp_git_repo["path"], "file_path": "test.py"}
+    with open(journal, "w") as f:
+        # Submitted and started, but the server died before it finished
+        f.write(json.dumps({"op": "submit", "id": "j1", "kind": "analyze", "params": params, "created_at": 1.0}) + "\n")
+        f.write(json.dumps({"op": "status", "id": "j1", "status": "running"}) + "\n")
+        f.write('{"op": "status", "id": "j1", "sta')  # torn write
+
+    manager = JobManager(workers=1, max_pending=10, git_timeout_sec=10, journal_path=str(journal))
+    try:
+        job = _wait_done(manager, "j1")
+        assert job.status == "done"
+    finally:
+        manager.shutdown()
+
+    restarted = JobManager(workers=1, max_pending=10, git_timeout_sec=10, journal_path=str(journal))
+    try:
+        job = restarted.get("j1")
+        assert job.status == "done"
+        assert job.result is None  # analyze results live in the analysis cache
+        assert len(job.load_result()["evidence"]) >= 1
+    finally:
+        restarted.shutdown()
+
+
+def test_bulk_report_job_writes_index_and_resumes(client, temp_git_repo):
+    """Test a bulk report over a directory, then a resumed second run."""
+    repo = temp_git_repo["path"]
+    os.makedirs(os.path.join(repo, "src"))
+    for name in ("src/a.py", "src/b.py", "notes.md"):
+        with open(os.path.join(repo, name), "w") as f:
+            f.write(f"# {name}\n")
+    subprocess.run(["git", "add", "."], cwd=repo, check=True)
+    subprocess.run(["git", "commit", "-qm", "Add files"], cwd=repo, check=True)
+    assert list_tracked_files(repo, "**/*.py") == ["src/a.py", "src/b.py", "test.py"]
+
+    def run_bulk():
+        body = {"kind": "bulk_report", "repo_path": repo, "pattern": "src/", "workers": 2}
+        response = client.post("/jobs", json=body)
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        return _wait(
+            lambda: (r := client.get(f"/jobs/{job_id}/result")).status_code == 200 and r.json()
+        )
+
+    first = run_bulk()
+    assert (first["files"], first["reported"], first["resumed"]) == (2, 2, 0)
+    with open(first["saved_to"]) as f:
+        index = f.read()
+    assert "[src/a.py](" in index and "[src/b.py](" in index
+    report_dir = os.path.dirname(first["saved_to"])
+    for line in index.splitlines():
+        if line.startswith("| [src/"):
+            report_id = line.split("](", 1)[1].split(")", 1)[0]
+            assert os.path.isfile(os.path.join(report_dir, report_id))
+
+    second = run_bulk()
+    assert second["resumed"] == 2
+    assert second["index"] == first["index"]
+
+
+def test_journal_is_compacted_while_running(tmp_path, monkeypatch):
+    """Test that the journal keeps only the live jobs after enough appends."""
+    monkeypatch.setattr(jobs, "KEEP_FINISHED", 2)
+    monkeypatch.setitem(jobs.RUNNERS, "hotspots", lambda params: ({"n": params["n"]}, None))
+    journal = tmp_path / "jobs.jsonl"
+    manager = JobManager(workers=1, max_pending=10, git_timeout_sec=10, journal_path=str(journal))
+    manager.journal.compact_every = 6
+    try:
+        for n in range(10):
+            _wait_done(manager, manager.submit("hotspots", {"n": n}).id)
+    finally:
+        manager.shutdown()
+
+    with open(journal) as f:
+        lines = f.readlines()
+    # Three records per job; compacted down to the kept jobs every 6 appends
+    assert len(lines) < 6 + 2 * 3
+    states = manager.journal.replay()
+    assert [s["params"]["n"] for s in states][-2:] == [8, 9]
+    assert all(s["status"] == "done" for s in states)
+    assert len(states) <= 4
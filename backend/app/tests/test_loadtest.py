@@ -0,0 +1,50 @@
+"""Tests for the load-test harness."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.tools.loadtest import RequestFactory, parse_mix, percentile, run_load
+from app.tools.synthetic_repo import SyntheticRepoConfig, generate_repo
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles."""
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+def test_parse_mix():
+    """Test request mix parsing and validation."""
+    assert parse_mix("analyze_warm=0.7,report=0.3") == {"analyze_warm": 0.7, "report": 0.3}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+    with pytest.raises(ValueError):
+        parse_mix("report=0")
+
+
+def test_run_load_in_process(tmp_path):
+    """Test a short in-process run against a synthetic repo."""
+    repo = generate_repo(
+        str(tmp_path / "repo"), SyntheticRepoConfig(commits=20, files=3, file_lines=60)
+    )
+    factory = RequestFactory([repo], seed=1, warm_set_size=2)
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await run_load(
+                client, factory, parse_mix("analyze_warm=0.5,analyze_cold=0.5"),
+                clients=3, total_requests=9,
+            )
+
+    summary = asyncio.run(go())
+    assert summary["overall"]["requests"] == 9
+    assert summary["overall"]["errors"] == 0
+    assert summary["git_commands"] > 0
+    assert summary["overall"]["p99_ms"] >= summary["overall"]["p50_ms"]
@@ -0,0 +1,171 @@
+"""Tests for negative caching of failures."""
+
+import subprocess
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import evidence_collector, metrics, repo_registry
+from app.services.cache import cache_get
+from app.services.commit_cache import get_commit_cache
+from app.services.git_runner import GitTimeoutError
+from app.services.incremental import analyze_cached, analyze_partial, stages_key
+from app.services.negative_cache import NegativeCache, get_negative_cache, FAILED_COMMIT
+from app.services.repo_registry import RepoRegistry
+
+
+@pytest.fixture
+def registry():
+    get_negative_cache.cache_clear()
+    yield RepoRegistry(max_repos=8, memory_budget_bytes=1 << 30, idle_seconds=3600)
+    get_negative_cache.cache_clear()
+
+
+def test_ttl_and_fingerprint():
+    """Test that entries expire and are dropped when the fingerprint changes."""
+    cache = NegativeCache("test", ttl_seconds=60)
+    cache.add("k", 1, "boom")
+    assert cache.check("k", 1) == "boom"
+    assert cache.check("k", 2) is None
+    assert cache.check("k", 1) is None  # invalidated entry was removed
+
+    expired = NegativeCache("test", ttl_seconds=0.01)
+    expired.add("k", None, "boom")
+    time.sleep(0.02)
+    assert expired.check("k") is None
+
+
+def test_invalid_repo_is_not_revalidated(tmp_path, registry, monkeypatch):
+    """Test that a non-repo fails fast until it becomes a repo."""
+    calls = []
+    original = repo_registry.validate_repo
+
+    def counting(path):
+        calls.append(path)
+        return original(path)
+
+    monkeypatch.setattr(repo_registry, "validate_repo", counting)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            registry.register(str(tmp_path))
+    assert len(calls) == 1
+
+    # git init creates .git, which changes the fingerprint
+    subprocess.run(["git", "init"], cwd=tmp_path, capture_output=True, check=True)
+    subprocess.run(
+        ["git", "-c", "user.name=T", "-c", "user.email=t@e", "commit", "--allow-empty", "-m", "x"],
+        cwd=tmp_path,
+        capture_output=True,
+        check=True,
+    )
+    handle = registry.register(str(tmp_path))
+    assert handle.head
+    assert len(calls) == 2
+
+
+def test_missing_file_cleared_when_created(temp_git_repo, registry):
+    """Test that a missing file is remembered until it appears."""
+    handle = registry.register(temp_git_repo["path"])
+    for _ in range(2):
+        with pytest.raises(ValueError, match="File not found"):
+            handle.resolve_file("later.py")
+    assert len(get_negative_cache("missing_file")) == 1
+
+    with open(f"{temp_git_repo['path']}/later.py", "w") as f:
+        f.write("x = 1\n")
+    _, rel_path = handle.resolve_file("later.py")
+    assert rel_path == "later.py"
+
+
+def test_failing_commit_skipped_until_head_changes(temp_git_repo, registry, monkeypatch):
+    """Test that a commit whose details failed is not refetched for the same HEAD."""
+    get_commit_cache.cache_clear()
+    calls = []
+
+    def failing(repo_path, commit_hash, *args, **kwargs):
+        calls.append(commit_hash)
+        raise ValueError("broken object")
+
+    monkeypatch.setattr(evidence_collector, "get_commit_details", failing)
+    try:
+        repo = temp_git_repo["path"]
+        assert evidence_collector.collect_evidence(repo, "test.py", 1, 3, 10, "head-1") == []
+        fetched = len(calls)
+        assert fetched > 0
+        evidence_collector.collect_evidence(repo, "test.py", 1, 3, 10, "head-1")
+        assert len(calls) == fetched
+        evidence_collector.collect_evidence(repo, "test.py", 1, 3, 10, "head-2")
+        assert len(calls) == 2 * fetched
+        assert len(get_negative_cache(FAILED_COMMIT)) == fetched
+    finally:
+        get_commit_cache.cache_clear()
+
+
+def test_timed_out_commit_is_retried_and_not_cached(
+    temp_git_repo, registry, monkeypatch, tmp_path
+):
+    """Test that a git timeout is neither negative-cached nor stored in the analysis cache."""
+    get_commit_cache.cache_clear()
+    calls = []
+
+    def timing_out(repo_path, commit_hash, *args, **kwargs):
+        calls.append(commit_hash)
+        raise GitTimeoutError("Git command timed out: show")
+
+    monkeypatch.setattr(evidence_collector, "get_commit_details", timing_out)
+    try:
+        repo = temp_git_repo["path"]
+        transient = []
+        evidence = evidence_collector.collect_evidence(
+            repo, "test.py", 1, 3, 10, "head-1", transient=transient
+        )
+        assert evidence == [] and transient == calls
+        evidence_collector.collect_evidence(repo, "test.py", 1, 3, 10, "head-1")
+        assert len(calls) == 2 * len(transient)
+        assert len(get_negative_cache(FAILED_COMMIT)) == 0
+
+        cache_dir = str(tmp_path / "cache")
+        args = (repo, "test.py", 1, 3, None, 10, False, "head-1")
+        data, hit = analyze_cached(cache_dir, "k", *args)
+        assert data["incomplete"] is True and not hit
+        assert cache_get(cache_dir, "k") is None
+        data, hit = analyze_partial(cache_dir, "k", *args, fields=["evidence"])
+        assert data["incomplete"] is True and not hit
+        assert cache_get(cache_dir, stages_key("k")) is None
+
+        client = TestClient(app)
+        body = {"repo_path": repo, "file_path": "test.py", "line_start": 1, "line_end": 3}
+        for response in (client.post("/analyze", json=body), client.get("/analyze", params=body)):
+            assert response.status_code == 200
+            assert response.json()["incomplete"] is True
+            assert response.json()["cache"]["hit"] is False
+        assert response.headers["Cache-Control"] == "no-store"
+    finally:
+        get_commit_cache.cache_clear()
+
+
+def test_timed_out_metrics_are_not_cached(temp_git_repo, monkeypatch, tmp_path):
+    """Test that metrics falling back after a git timeout mark the result incomplete."""
+
+    def timing_out(repo_path, args, *rest, **kwargs):
+        raise GitTimeoutError("Git command timed out: log")
+
+    monkeypatch.setattr(metrics, "run_git", timing_out)
+    transient = []
+    assert metrics.file_metrics(temp_git_repo["path"], "test.py", transient=transient) == {
+        "churn_count": 0,
+        "last_touch": None,
+        "stability": "stable",
+    }
+    assert transient == ["churn_count", "last_touch"]
+
+    cache_dir = str(tmp_path / "cache")
+    args = (temp_git_repo["path"], "test.py", 1, 3, None, 10, False, "head-1")
+    data, hit = analyze_cached(cache_dir, "k", *args)
+    assert data["incomplete"] is True and not hit
+    assert cache_get(cache_dir, "k") is None
+    data, hit = analyze_partial(cache_dir, "k", *args, fields=["metrics"])
+    assert data["incomplete"] is True and not hit
+    assert cache_get(cache_dir, stages_key("k")) is None
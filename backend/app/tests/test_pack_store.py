@@ -0,0 +1,128 @@
+"""Tests for the pack cache backend and its maintenance tool."""
+
+import json
+import os
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.cache import cache_get, cache_set
+from app.services.pack_store import PackStore, PACK_FILENAME, close_pack_stores
+from app.tools.cache_pack import main as cache_pack_main
+
+
+def _payload(*commits: str) -> dict:
+    evidence = [
+        {
+            "hash": c,
+            "author": "Test User",
+            "date": "2024-01-01",
+            "subject": f"Change {c}",
+            "diff_snippet": f"diff --git a/x b/x\n+{c}\n" * 50,
+        }
+        for c in commits
+    ]
+    return {
+        "evidence": evidence,
+        "timeline": [],
+        "metrics": {"churn_count": len(commits), "last_touch": None, "stability": "stable"},
+        "intent": {"label": "unclear", "reason": "", "supporting_commits": []},
+        "answer": {},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    pack = PackStore(str(tmp_path / PACK_FILENAME))
+    yield pack
+    pack.close()
+
+
+@pytest.fixture
+def pack_backend(monkeypatch):
+    monkeypatch.setenv("REPOLENS_CACHE_BACKEND", "pack")
+    get_settings.cache_clear()
+    yield
+    close_pack_stores()
+    get_settings.cache_clear()
+
+
+def test_roundtrip(store):
+    """Test that a stored payload comes back unchanged."""
+    payload = _payload("aaa", "bbb")
+    store.put("k1", payload)
+    assert store.get("k1") == payload
+    assert store.get("missing") is None
+
+
+def test_shared_commits_are_stored_once(store):
+    """Test that results sharing commits share their blobs."""
+    store.put("k1", _payload("aaa", "bbb"))
+    store.put("k2", _payload("aaa", "bbb", "ccc"))
+    # One commit record and one diff blob per distinct commit
+    assert store.stats()["blobs"] == 6
+    assert store.stats()["results"] == 2
+
+
+def test_compact_drops_unreferenced_blobs(store):
+    """Test that compaction reclaims blobs only the deleted result used."""
+    store.put("k1", _payload("aaa"))
+    store.put("k2", _payload("aaa", "bbb"))
+    assert store.delete("k2")
+    result = store.compact()
+    assert result["blobs_removed"] == 2
+    assert store.get("k1") == _payload("aaa")
+
+
+def test_compact_max_age(store):
+    """Test that compaction can expire old results."""
+    store.put("old", _payload("aaa"), created_at=0)
+    store.put("new", _payload("bbb"))
+    result = store.compact(max_age_seconds=3600)
+    assert result["results_removed"] == 1
+    assert store.get("old") is None
+    assert store.get("new") is not None
+
+
+def test_cache_uses_pack_backend(tmp_path, pack_backend):
+    """Test that the cache API writes to the pack file when configured."""
+    cache_set(str(tmp_path), "k1", _payload("aaa"))
+    assert cache_get(str(tmp_path), "k1") == _payload("aaa")
+    assert PACK_FILENAME in os.listdir(tmp_path)
+    assert not any(name.endswith(".json") for name in os.listdir(tmp_path))
+
+
+def test_migrate_json_cache(tmp_path, capsys):
+    """Test migrating per-key JSON files into a pack."""
+    keys = ["a" * 64, "b" * 64]
+    for key in keys:
+        with open(tmp_path / f"{key}.json", "w") as f:
+            json.dump(_payload("aaa"), f, indent=2)
+    others = {
+        f"{'a' * 64}-stages": {"evidence": [], "diffs": False},
+        "renames": {"head": "h", "renames": {}},
+        f"bulk-{'c' * 32}": {"files": {}},
+        f"hotspots-{'d' * 32}": {"hotspots": []},
+    }
+    for key, payload in others.items():
+        (tmp_path / f"{key}.json").write_text(json.dumps(payload))
+    (tmp_path / "report.md").write_text("# report")
+    (tmp_path / "notes.json").write_text("{}")
+
+    assert cache_pack_main(["migrate", str(tmp_path), "--delete"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["migrated"] == 6
+    assert summary["left_behind"] == ["notes.json"]
+    assert summary["blobs"] == 2
+    assert not (tmp_path / f"{keys[0]}.json").exists()
+    assert not (tmp_path / "renames.json").exists()
+    assert (tmp_path / "report.md").exists()
+    assert (tmp_path / "notes.json").exists()
+
+    pack = PackStore(str(tmp_path / PACK_FILENAME))
+    try:
+        assert pack.get(keys[1]) == _payload("aaa")
+        for key, payload in others.items():
+            assert pack.get(key) == payload
+    finally:
+        pack.close()
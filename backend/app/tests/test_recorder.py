@@ -0,0 +1,93 @@
+"""Tests for request recording and replay."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.main import app
+from app.services.recorder import anonymize, get_entry_writer
+from app.tools.replay import PathMapper, load_log, replay
+
+
+@pytest.fixture
+def record_file(tmp_path, monkeypatch):
+    """Enable the recorder for the duration of a test."""
+    path = tmp_path / "requests.log"
+    monkeypatch.setenv("REPOLENS_RECORD_FILE", str(path))
+    monkeypatch.setenv("REPOLENS_RECORD_SALT", "pepper")
+    get_settings.cache_clear()
+    yield path
+    get_settings.cache_clear()
+
+
+def test_recorder_writes_anonymized_entries(record_file, temp_git_repo):
+    """Test that analyze requests are logged without raw paths."""
+    client = TestClient(app)
+    body = {
+        "repo_path": temp_git_repo["path"],
+        "file_path": temp_git_repo["file_path"],
+        "line_start": 1,
+        "line_end": 5,
+    }
+    client.post("/analyze", json=body)
+    client.post("/analyze", json=body)
+    client.get("/health")
+    get_entry_writer().flush()
+
+    raw = record_file.read_text()
+    assert temp_git_repo["path"] not in raw
+    assert "test.py" not in raw
+
+    entries = load_log(str(record_file))
+    assert len(entries) == 2
+    assert [e["h"] for e in entries] == [0, 1]
+    assert entries[0]["f"] == anonymize("test.py", "pepper")
+    assert entries[0]["s"] == 1 and entries[0]["e"] == 5
+    assert entries[0]["st"] == 200
+
+
+def test_replay_maps_files_and_reports_deltas(record_file, temp_git_repo):
+    """Test replaying a recorded log in-process."""
+    client = TestClient(app)
+    body = {"repo_path": temp_git_repo["path"], "file_path": temp_git_repo["file_path"]}
+    client.post("/analyze", json=body)
+    client.get("/analyze", params=body)
+    get_entry_writer().flush()
+    entries = load_log(str(record_file))
+
+    mapper = PathMapper(temp_git_repo["path"], salt="pepper")
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await replay(c, entries, mapper, speed=0)
+
+    report = asyncio.run(go())
+    assert report["requests"] == 2
+    assert report["errors"] == 0
+    assert report["exact_file_matches"] == 2
+    analyze = report["endpoints"]["analyze"]
+    assert entries[1]["m"] == "GET"
+    assert analyze["replayed"]["cache_hit_rate"] == 1.0
+    assert analyze["delta"]["cache_hit_rate"] == 0.5
+
+
+def test_recorder_hashes_repo_id_not_cwd(record_file, temp_git_repo):
+    """Test that a request by repo_id is recorded under the repository, GET included."""
+    client = TestClient(app)
+    repo_id = client.post("/repos", json={"repo_path": temp_git_repo["path"]}).json()["repo_id"]
+    client.get("/report", params={"repo_id": repo_id, "file_path": "missing.py"})
+    client.post("/analyze", json={"repo_id": "unknown", "file_path": "test.py"})
+    get_entry_writer().flush()
+
+    entries = load_log(str(record_file))
+    assert [(e["ep"], e.get("m"), e["st"]) for e in entries] == [
+        ("report", "GET", 400),
+        ("analyze", None, 404),
+    ]
+    assert entries[0]["r"] == anonymize(temp_git_repo["path"], "pepper")
+    assert entries[1]["r"] == anonymize("repo_id:unknown", "pepper")
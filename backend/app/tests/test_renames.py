@@ -0,0 +1,95 @@
+"""Tests for the per-repository rename map."""
+
+import os
+import subprocess
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.hotspots import find_hotspots
+from app.services.renames import RENAME_MAP_UPDATES, RenameMap
+
+
+def _git(repo_path: str, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=repo_path, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def _move(repo_path: str, old: str, new: str) -> str:
+    _git(repo_path, "mv", old, new)
+    _git(repo_path, "commit", "-qm", f"Move {old} to {new}")
+    return _git(repo_path, "rev-parse", "HEAD")
+
+
+def test_lineage_follows_moves_and_extends_incrementally(temp_git_repo, tmp_path):
+    """Test lineage across two moves, extended with only the new commits."""
+    repo = temp_git_repo["path"]
+    rename_map = RenameMap(repo, str(tmp_path))
+    head = _move(repo, "test.py", "core.py")
+    assert rename_map.update(head)
+    assert rename_map.lineage("core.py") == ["core.py", "test.py"]
+
+    extended = RENAME_MAP_UPDATES.value(mode="extended")
+    head = _move(repo, "core.py", "lib.py")
+    assert rename_map.update(head)
+    assert RENAME_MAP_UPDATES.value(mode="extended") == extended + 1
+    assert rename_map.lineage("lib.py") == ["lib.py", "core.py", "test.py"]
+
+    # A new file reusing an old name does not inherit the moved file's history
+    with open(os.path.join(repo, "test.py"), "w") as f:
+        f.write("new = True\n")
+    _git(repo, "add", "test.py")
+    _git(repo, "commit", "-qm", "Recreate test.py")
+    head = _git(repo, "rev-parse", "HEAD")
+    assert rename_map.update(head)
+    assert rename_map.lineage("test.py") == ["test.py"]
+
+    # Persisted: a fresh map loads instead of rescanning
+    loaded = RENAME_MAP_UPDATES.value(mode="loaded")
+    fresh = RenameMap(repo, str(tmp_path))
+    assert fresh.update(head)
+    assert RENAME_MAP_UPDATES.value(mode="loaded") == loaded + 1
+    assert len(fresh) == 2
+
+
+def test_metrics_and_hotspots_follow_renames(temp_git_repo):
+    """Test that a moved file keeps its churn and hotspot count."""
+    repo = temp_git_repo["path"]
+    _move(repo, "test.py", "moved.py")
+
+    response = TestClient(app).post(
+        "/analyze", json={"repo_path": repo, "file_path": "moved.py"}
+    )
+    assert response.status_code == 200
+    assert response.json()["metrics"]["churn_count"] == 4
+
+    hotspots = find_hotspots(repo, follow_renames=True)
+    assert hotspots[0]["path"] == "moved.py"
+    assert hotspots[0]["commits"] == 4
+    assert find_hotspots(repo)[0]["commits"] == 1
+
+
+def test_analysis_at_rev_follows_renames_reachable_from_it(temp_git_repo):
+    """Test that an analysis at an earlier commit follows the moves before it only."""
+    repo = temp_git_repo["path"]
+    _move(repo, "test.py", "moved.py")
+    with open(os.path.join(repo, "other.py"), "w") as f:
+        f.write("other = True\n")
+    _git(repo, "add", "other.py")
+    _git(repo, "commit", "-qm", "Add other.py")
+    client = TestClient(app)
+
+    response = client.post(
+        "/analyze", json={"repo_path": repo, "file_path": "moved.py", "rev": "HEAD~1"}
+    )
+    assert response.status_code == 200
+    assert response.json()["metrics"]["churn_count"] == 4
+
+    # Before the move, the later rename is not part of the file's history
+    _move(repo, "moved.py", "final.py")
+    response = client.post(
+        "/analyze", json={"repo_path": repo, "file_path": "test.py", "rev": "HEAD~3"}
+    )
+    assert response.status_code == 200
+    assert response.json()["metrics"]["churn_count"] == 3
@@ -0,0 +1,54 @@
+"""Tests for the repository registry."""
+
+import subprocess
+
+import pytest
+
+from app.services.repo_registry import RepoRegistry
+
+
+def _commit(repo_path: str, message: str) -> str:
+    with open(f"{repo_path}/test.py", "a") as f:
+        f.write(f"# {message}\n")
+    subprocess.run(["git", "commit", "-qam", message], cwd=repo_path, check=True)
+    return subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def test_register_is_idempotent(temp_git_repo):
+    """Test that registering the same path twice returns one handle."""
+    registry = RepoRegistry(max_repos=4, memory_budget_bytes=10**9, idle_seconds=3600)
+    first = registry.register(temp_git_repo["path"])
+    second = registry.register(temp_git_repo["path"] + "/")
+    assert first is second
+    assert registry.get(first.repo_id) is first
+
+
+def test_register_rejects_invalid_path(tmp_path):
+    """Test that non-repositories are rejected."""
+    registry = RepoRegistry(max_repos=4, memory_budget_bytes=10**9, idle_seconds=3600)
+    with pytest.raises(ValueError):
+        registry.register(str(tmp_path))
+
+
+def test_current_head_follows_new_commits(temp_git_repo):
+    """Test that the cached HEAD is refreshed when refs change."""
+    registry = RepoRegistry(max_repos=4, memory_budget_bytes=10**9, idle_seconds=3600)
+    handle = registry.register(temp_git_repo["path"])
+    old_head = handle.current_head()
+    new_head = _commit(temp_git_repo["path"], "another change")
+    assert new_head != old_head
+    assert handle.current_head() == new_head
+
+
+def test_eviction_over_repo_limit(temp_git_repo, tmp_path):
+    """Test that the least recently used repo is evicted first."""
+    other = tmp_path / "other"
+    subprocess.run(["git", "clone", "-q", temp_git_repo["path"], str(other)], check=True)
+
+    registry = RepoRegistry(max_repos=1, memory_budget_bytes=10**9, idle_seconds=3600)
+    first = registry.register(temp_git_repo["path"])
+    second = registry.register(str(other))
+    assert registry.get(first.repo_id) is None
+    assert registry.get(second.repo_id) is second
@@ -0,0 +1,124 @@
+"""Tests for filesystem-watch driven HEAD updates."""
+
+import subprocess
+import time
+
+import pytest
+
+from app.services import repo_registry
+from app.services.repo_registry import RepoRegistry
+from app.services.repo_watch import watchfiles
+
+
+def _commit(repo_path: str, message: str) -> str:
+    with open(f"{repo_path}/test.py", "a") as f:
+        f.write(f"# {message}\n")
+    subprocess.run(["git", "commit", "-qam", message], cwd=repo_path, check=True)
+    return subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def _wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class _Index:
+    """Per-repo state that records HEAD change notifications."""
+
+    def __init__(self):
+        self.changes = []
+
+    def on_head_change(self, handle, old_head, new_head):
+        self.changes.append((old_head, new_head))
+
+
+@pytest.mark.parametrize(
+    "mode",
+    [
+        "poll",
+        pytest.param(
+            "inotify",
+            marks=pytest.mark.skipif(watchfiles is None, reason="watchfiles not installed"),
+        ),
+    ],
+)
+def test_watcher_pushes_new_head(temp_git_repo, monkeypatch, mode):
+    """Test that commits reach the handle without the request path running git."""
+    registry = RepoRegistry(
+        max_repos=4, memory_budget_bytes=10**9, idle_seconds=3600, watch=mode,
+        watch_poll_seconds=0.05,
+    )
+    handle = registry.register(temp_git_repo["path"])
+    index = _Index()
+    handle.state["index"] = index
+    try:
+        assert handle.watched
+        old_head = handle.current_head()
+        new_head = _commit(temp_git_repo["path"], "watched change")
+
+        assert _wait_for(lambda: handle.head == new_head)
+        assert index.changes == [(old_head, new_head)]
+
+        # The request path trusts the pushed HEAD: no stat of refs, no git
+        monkeypatch.setattr(
+            handle, "_ref_signature", lambda: pytest.fail("refs checked on request path")
+        )
+        monkeypatch.setattr(repo_registry, "run_git", lambda *a, **k: pytest.fail("git ran"))
+        assert handle.current_head() == new_head
+    finally:
+        monkeypatch.undo()
+        registry.unregister(handle.repo_id)
+    assert not handle.watched
+
+
+def test_watcher_head_move_refreshes_repo_state(temp_git_repo, monkeypatch):
+    """Test that a watched commit advances the rename map and warms the next analysis."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import incremental, renames, targets
+    from app.services.cache import cache_get
+    from app.services.incremental import LATEST_STATE
+    from app.services.renames import STATE_KEY
+    from app.services.targets import analysis_key
+
+    registry = RepoRegistry(
+        max_repos=4, memory_budget_bytes=10**9, idle_seconds=3600, watch="poll",
+        watch_poll_seconds=0.05,
+    )
+    for module in (incremental, renames, targets):
+        monkeypatch.setattr(module, "get_repo_registry", lambda: registry)
+    repo = temp_git_repo["path"]
+    handle = registry.register(repo)
+    try:
+        client = TestClient(app)
+        request = {"repo_path": repo, "file_path": "test.py"}
+        first = client.post("/analyze", json=request)
+        assert first.status_code == 200
+        assert handle.state[STATE_KEY].head == handle.head
+        assert len(handle.state[LATEST_STATE]) == 1
+
+        # A commit to another file: the watcher moves HEAD, the hooks follow
+        with open(f"{repo}/other.py", "w") as f:
+            f.write("other = True\n")
+        subprocess.run(["git", "add", "other.py"], cwd=repo, check=True)
+        subprocess.run(["git", "commit", "-qm", "Add other.py"], cwd=repo, check=True)
+        new_head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=repo, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        assert _wait_for(lambda: handle.state[STATE_KEY].head == new_head)
+        key = analysis_key(new_head, "test.py", 1, 200, None, request)
+        assert _wait_for(lambda: cache_get(handle.cache_dir, key) is not None)
+        assert cache_get(handle.cache_dir, key)["head"] == new_head
+        second = client.post("/analyze", json=request)
+        assert second.json()["cache"] == {"hit": True, "key": key}
+        assert second.json()["metrics"] == first.json()["metrics"]
+    finally:
+        registry.unregister(handle.repo_id)
@@ -0,0 +1,47 @@
+"""Tests for the synthetic repository generator and benchmark comparison."""
+
+import subprocess
+
+from app.tools.synthetic_repo import SyntheticRepoConfig, generate_repo
+from app.tools.bench import compare_results
+
+
+def test_generate_repo_is_deterministic(tmp_path):
+    """Test that the same config produces the same history."""
+    config = SyntheticRepoConfig(commits=40, files=5, file_lines=30, merge_rate=0.2)
+    first = generate_repo(str(tmp_path / "a"), config)
+    second = generate_repo(str(tmp_path / "b"), config)
+    assert first["head"] == second["head"]
+    assert first["files"] == second["files"]
+
+
+def test_generate_repo_shape(tmp_path):
+    """Test commit count, merges and renames."""
+    config = SyntheticRepoConfig(
+        commits=60, files=5, file_lines=20, rename_rate=0.3, merge_rate=0.2
+    )
+    info = generate_repo(str(tmp_path / "repo"), config)
+    assert info["merges"] > 0
+    assert info["renames"] > 0
+
+    log = subprocess.run(
+        ["git", "rev-list", "--count", "--first-parent", "HEAD"],
+        cwd=info["path"], capture_output=True, text=True, check=True,
+    )
+    assert int(log.stdout.strip()) == 60
+
+    status = subprocess.run(
+        ["git", "status", "--porcelain"],
+        cwd=info["path"], capture_output=True, text=True, check=True,
+    )
+    assert status.stdout == ""
+    assert info["hot_file"] in info["files"]
+
+
+def test_compare_results_flags_regressions():
+    """Test that only slowdowns beyond the threshold are reported."""
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}}}
+    current = {"results": {"a": {"median_ms": 11.0}, "b": {"median_ms": 15.0}, "c": {"median_ms": 1.0}}}
+    regressions = compare_results(baseline, current, threshold=0.2)
+    assert [r["name"] for r in regressions] == ["b"]
+    assert regressions[0]["change"] == 0.5
@@ -0,0 +1 @@
+"""Developer tooling: synthetic repositories, benchmarks and load tests."""
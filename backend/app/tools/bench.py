@@ -0,0 +1,256 @@
+"""Benchmark suite for the analysis pipeline.
+
+Runs each pipeline stage and the HTTP endpoints against a synthetic
+repository, writes the timings as JSON, and optionally flags regressions
+against a previous run.
+
+Usage:
+    python -m app.tools.bench --commits 2000 --files 100 --out bench.json
+    python -m app.tools.bench --out new.json --compare bench.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from ..core.config import get_settings
+from ..services.commit_cache import get_commit_cache
+from ..services.evidence_collector import collect_evidence, get_blame_commits
+from ..services.metrics import file_metrics
+from ..services.negative_cache import get_negative_cache
+from ..services.repo_registry import get_repo_registry
+from ..services.timeline import build_timeline
+from .synthetic_repo import SyntheticRepoConfig, generate_repo
+
+
+def time_call(fn: Callable[[], object], repeat: int, setup: Callable[[], None] | None = None) -> dict:
+    """
+    Time a callable several times.
+
+    Args:
+        fn: Work to time
+        repeat: Number of timed runs
+        setup: Optional untimed callable run before each iteration
+
+    Returns:
+        Dictionary with min_ms, median_ms, mean_ms, max_ms and runs
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "runs": repeat,
+    }
+
+
+def reset_process_caches() -> None:
+    """
+    Drop the in-process state a freshly started server would not have.
+
+    Clears the commit detail cache, the repository registry (and with it the
+    rename maps) and the negative caches. A commit cache file (REPOLENS_COMMIT_CACHE_FILE)
+    is kept; leave it unset for cold numbers.
+    """
+    get_commit_cache().close()
+    get_commit_cache.cache_clear()
+    registry = get_repo_registry()
+    for handle in registry.handles():
+        registry.unregister(handle.repo_id)
+    get_repo_registry.cache_clear()
+    get_negative_cache.cache_clear()
+
+
+def run_benchmarks(repo: dict, repeat: int = 5, line_range: tuple[int, int] = (1, 200)) -> dict:
+    """
+    Benchmark pipeline stages and endpoints against a generated repository.
+
+    collect_evidence and analyze_cold start from empty in-process caches
+    (see reset_process_caches); the _warm variants reuse them.
+
+    Args:
+        repo: Result of generate_repo()
+        repeat: Timed runs per benchmark
+        line_range: Line range to analyze
+
+    Returns:
+        Mapping of benchmark name to timing summary
+    """
+    # Imported lazily: the HTTP benchmarks need the dev dependencies
+    from fastapi.testclient import TestClient
+    from ..main import app
+
+    repo_path = repo["path"]
+    target = repo["hot_file"]
+    start, end = line_range
+    cache_dir = os.path.join(repo_path, get_settings().repolens_cache_dir)
+    body = {
+        "repo_path": repo_path,
+        "file_path": target,
+        "line_start": start,
+        "line_end": end,
+    }
+
+    def clear_cache() -> None:
+        # Cold: neither the disk cache nor any in-process cache is warm
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        reset_process_caches()
+
+    evidence = collect_evidence(repo_path, target, start, end, 10)
+    client = TestClient(app)
+
+    results = {
+        "get_blame_commits": time_call(
+            lambda: get_blame_commits(repo_path, target, start, end), repeat
+        ),
+        "collect_evidence": time_call(
+            lambda: collect_evidence(repo_path, target, start, end, 10),
+            repeat,
+            setup=reset_process_caches,
+        ),
+        "collect_evidence_warm": time_call(
+            lambda: collect_evidence(repo_path, target, start, end, 10), repeat
+        ),
+        "file_metrics": time_call(lambda: file_metrics(repo_path, target), repeat),
+        "build_timeline": time_call(lambda: build_timeline(evidence), repeat),
+        "analyze_cold": time_call(
+            lambda: client.post("/analyze", json=body).raise_for_status(),
+            repeat,
+            setup=clear_cache,
+        ),
+    }
+
+    client.post("/analyze", json=body).raise_for_status()
+    results["analyze_warm"] = time_call(
+        lambda: client.post("/analyze", json=body).raise_for_status(), repeat
+    )
+    results["report"] = time_call(
+        lambda: client.post("/report", json=body).raise_for_status(), repeat
+    )
+    return results
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.2) -> list[dict]:
+    """
+    Find benchmarks whose median regressed beyond a relative threshold.
+
+    Args:
+        baseline: Earlier results file contents
+        current: New results file contents
+        threshold: Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        List of regressions with name, baseline_ms, current_ms and change
+    """
+    regressions = []
+    old_results = baseline.get("results", {})
+    for name, timing in current.get("results", {}).items():
+        old = old_results.get(name)
+        if not old or not old.get("median_ms"):
+            continue
+        change = (timing["median_ms"] - old["median_ms"]) / old["median_ms"]
+        if change > threshold:
+            regressions.append(
+                {
+                    "name": name,
+                    "baseline_ms": old["median_ms"],
+                    "current_ms": timing["median_ms"],
+                    "change": round(change, 4),
+                }
+            )
+    return regressions
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "--version"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the RepoLens pipeline")
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--file-lines", type=int, default=300)
+    parser.add_argument("--rename-rate", type=float, default=0.02)
+    parser.add_argument("--merge-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--repo", help="Create the synthetic repo at this path and keep it")
+    parser.add_argument("--out", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    config = SyntheticRepoConfig(
+        commits=args.commits,
+        files=args.files,
+        file_lines=args.file_lines,
+        rename_rate=args.rename_rate,
+        merge_rate=args.merge_rate,
+        seed=args.seed,
+    )
+
+    workdir = args.repo or tempfile.mkdtemp(prefix="repolens-bench-")
+    try:
+        repo = generate_repo(workdir, config)
+        results = run_benchmarks(repo, repeat=args.repeat)
+    finally:
+        if not args.repo:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git": _git_version(),
+            "head": repo["head"],
+            "target_file": repo["hot_file"],
+            "config": repo["config"],
+        },
+        "results": results,
+    }
+
+    text = json.dumps(output, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, output, args.threshold)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['name']}: {r['baseline_ms']}ms -> {r['current_ms']}ms "
+                f"(+{r['change'] * 100:.1f}%)",
+                file=sys.stderr,
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+"""Maintain the single-file pack cache (REPOLENS_CACHE_BACKEND=pack).
+
+Usage:
+    python -m app.tools.cache_pack migrate /path/to/repo/.repolens_cache
+    python -m app.tools.cache_pack migrate /path/to/repo/.repolens_cache --delete
+    python -m app.tools.cache_pack compact /path/to/repo/.repolens_cache --max-age-days 30
+    python -m app.tools.cache_pack stats /path/to/repo/.repolens_cache
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from ..services.pack_store import PackStore, PACK_FILENAME
+
+# Every kind of entry the cache stores as <key>.json; reports, locks and
+# temporary files are not entries
+ENTRY_KEYS = (
+    r"[0-9a-f]{64}",  # analysis results and "latest" pointers (cache_key)
+    r"[0-9a-f]{64}-stages",  # partial (per-stage) results
+    r"renames",  # the repository's rename map
+    r"bulk-[0-9a-f]{32}",  # bulk report manifests
+    r"hotspots-[0-9a-f]{32}",  # hotspot job results
+)
+KEY_FILE = re.compile(r"^(" + "|".join(ENTRY_KEYS) + r")\.json$")
+
+
+def migrate(cache_dir: str, store: PackStore, delete: bool = False) -> dict:
+    """
+    Copy JSON cache entries of every kind into a pack store.
+
+    JSON files that are not a known kind of entry are left in place (never
+    deleted) and listed in left_behind.
+
+    Args:
+        cache_dir: Directory holding ``<key>.json`` files
+        store: Destination pack store
+        delete: Remove each JSON file once it is in the pack
+
+    Returns:
+        Dictionary with migrated, skipped and json_bytes counts, and the
+        left_behind file names
+    """
+    migrated = 0
+    skipped = 0
+    json_bytes = 0
+    left_behind = []
+    for name in sorted(os.listdir(cache_dir)):
+        match = KEY_FILE.match(name)
+        if not match:
+            if name.endswith(".json"):
+                left_behind.append(name)
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+            size = os.path.getsize(path)
+            mtime = os.path.getmtime(path)
+        except (OSError, ValueError):
+            skipped += 1
+            continue
+        store.put(match.group(1), payload, created_at=mtime)
+        migrated += 1
+        json_bytes += size
+        if delete:
+            os.unlink(path)
+    return {
+        "migrated": migrated,
+        "skipped": skipped,
+        "json_bytes": json_bytes,
+        "left_behind": left_behind,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Maintain the RepoLens pack cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = sub.add_parser("migrate", help="Import JSON cache files into the pack")
+    migrate_parser.add_argument("cache_dir")
+    migrate_parser.add_argument("--delete", action="store_true", help="Remove migrated JSON files")
+
+    compact_parser = sub.add_parser("compact", help="Drop old results and unused blobs")
+    compact_parser.add_argument("cache_dir")
+    compact_parser.add_argument("--max-age-days", type=float)
+
+    stats_parser = sub.add_parser("stats", help="Show pack size and counts")
+    stats_parser.add_argument("cache_dir")
+
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.cache_dir):
+        parser.error(f"Not a directory: {args.cache_dir}")
+
+    store = PackStore(os.path.join(args.cache_dir, PACK_FILENAME))
+    try:
+        if args.command == "migrate":
+            result = migrate(args.cache_dir, store, delete=args.delete)
+            result.update(store.stats())
+            if result["left_behind"]:
+                print(
+                    f"Left in place (not cache entries): {', '.join(result['left_behind'])}",
+                    file=sys.stderr,
+                )
+        elif args.command == "compact":
+            max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+            result = store.compact(max_age_seconds=max_age)
+        else:
+            result = store.stats()
+    finally:
+        store.close()
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,327 @@
+"""Offline batch analysis without the HTTP server.
+
+Reads analysis requests as JSONL (the /analyze request fields, one object per
+line) or derives them from a unified diff (one request per hunk), runs them on
+a pool of worker processes and streams one JSON result per line to stdout as
+they complete. Workers go straight to the cached analysis service: the on-disk
+analysis cache in each repository is shared with the server and with other
+workers, and a result computed by one process is reused by all of them.
+
+Requests for the same file are batched onto the same worker so they also
+share its in-process commit cache and rename map. Each output line carries
+the request's ``index`` (its position in the input) and ``id`` (if given).
+
+Usage:
+    repolens < requests.jsonl
+    git diff origin/main... | repolens --diff - --repo . --jobs 8
+    python -m app.tools.cli requests.jsonl --repo /path/to/repo --question "Why?"
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, TextIO
+
+from ..models import AnalyzeRequest
+from ..services.incremental import analyze_cached, analyze_partial
+from ..services.pipeline import FIELDS
+from ..services.targets import analysis_target
+
+# Requests per worker task, at most (larger files are split across workers)
+DEFAULT_BATCH = 32
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def parse_diff(lines: Iterable[str]) -> list[dict]:
+    """
+    Turn a unified diff into one request per hunk.
+
+    Each hunk's range on the new side becomes the line range; a pure deletion
+    becomes the line it was deleted before. Deleted files are skipped.
+
+    Args:
+        lines: Lines of ``git diff`` (or ``diff -u``) output
+
+    Returns:
+        List of request dictionaries with file_path, line_start and line_end
+    """
+    requests = []
+    path = None
+    for line in lines:
+        if line.startswith("+++ "):
+            name = line[4:].rstrip("\n").split("\t")[0]
+            if name == "/dev/null":
+                path = None
+            else:
+                path = name[2:] if name.startswith("b/") else name
+            continue
+        match = _HUNK_RE.match(line)
+        if match and path:
+            start = max(int(match.group(1)), 1)
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            requests.append(
+                {"file_path": path, "line_start": start, "line_end": start + max(count, 1) - 1}
+            )
+    return requests
+
+
+def read_requests(lines: Iterable[str]) -> list[dict | str]:
+    """
+    Parse JSONL requests.
+
+    Args:
+        lines: Input lines; blank lines are skipped
+
+    Returns:
+        One entry per non-blank line: the request, or an error message for a
+        line that is not a JSON object
+    """
+    requests: list[dict | str] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            requests.append(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(request, dict):
+            requests.append("Request must be a JSON object")
+            continue
+        requests.append(request)
+    return requests
+
+
+def analyze_request(request: dict) -> dict:
+    """
+    Analyze one request through the cached analysis service.
+
+    The request is validated as an /analyze request and resolved with the
+    same helper, so it gets the same cache key as over HTTP.
+
+    Args:
+        request: /analyze request fields (repo_path or repo_id, file_path, ...)
+
+    Returns:
+        Analysis result with file_path, line range, rev and cache info (and
+        only the selected parts when the request has fields)
+
+    Raises:
+        KeyError: For an unknown repo_id
+        ValueError: If the request, repository, revision or file is invalid
+    """
+    params = AnalyzeRequest.model_validate(request).model_dump()
+    handle, commit, rel_path, line_start, line_end, rev, key = analysis_target(params)
+    fields = params["fields"]
+    args = (
+        handle.cache_dir,
+        key,
+        handle.path,
+        rel_path,
+        line_start,
+        line_end,
+        params["question"],
+        params["max_commits"],
+        params["use_llm"],
+        commit,
+        rev,
+        params["history_mode"],
+    )
+    if fields is None:
+        data, hit = analyze_cached(*args)
+    else:
+        data, hit = analyze_partial(*args, fields)
+    return {
+        "file_path": rel_path,
+        "line_start": line_start,
+        "line_end": line_end,
+        "rev": rev,
+        **data,
+        "cache": {"hit": hit, "key": key},
+    }
+
+
+def run_batch(batch: list[tuple[int, dict]]) -> list[dict]:
+    """
+    Analyze a batch of requests; a failed request becomes an error result.
+
+    Args:
+        batch: (index, request) pairs
+
+    Returns:
+        One output record per request, in batch order
+    """
+    results = []
+    for index, request in batch:
+        head = {"index": index, "id": request.get("id")}
+        try:
+            results.append({**head, **analyze_request(request)})
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            results.append({**head, "file_path": request.get("file_path"), "error": error})
+    return results
+
+
+def make_batches(requests: list[tuple[int, dict]], size: int) -> list[list[tuple[int, dict]]]:
+    """
+    Group requests for the same file together, at most size per batch.
+
+    Args:
+        requests: (index, request) pairs
+        size: Largest batch
+
+    Returns:
+        Batches, in order of each file's first request
+    """
+    groups: dict[tuple, list[tuple[int, dict]]] = {}
+    for index, request in requests:
+        target = (
+            request.get("repo_id") or request.get("repo_path"),
+            request.get("rev"),
+            request.get("file_path"),
+        )
+        groups.setdefault(target, []).append((index, request))
+    size = max(size, 1)
+    return [
+        group[i:i + size] for group in groups.values() for i in range(0, len(group), size)
+    ]
+
+
+def _emit(out: TextIO, record: dict) -> None:
+    out.write(json.dumps(record, default=str) + "\n")
+    out.flush()
+
+
+def run(
+    requests: list[dict | str],
+    jobs: int,
+    batch_size: int = DEFAULT_BATCH,
+    out: TextIO | None = None,
+) -> int:
+    """
+    Run requests and stream results as JSONL.
+
+    Args:
+        requests: Parsed requests (strings are input errors, reported as-is)
+        jobs: Worker processes; 1 runs in this process
+        batch_size: Requests per worker task, at most
+        out: Stream the results are written to (default: stdout)
+
+    Returns:
+        Number of failed requests
+    """
+    out = out or sys.stdout
+    failed = 0
+    valid = []
+    for index, request in enumerate(requests):
+        if isinstance(request, str):
+            _emit(out, {"index": index, "id": None, "error": request})
+            failed += 1
+        else:
+            valid.append((index, request))
+    batches = make_batches(valid, batch_size)
+
+    def emit_all(records: list[dict]) -> None:
+        nonlocal failed
+        for record in records:
+            failed += "error" in record
+            _emit(out, record)
+
+    if jobs <= 1 or len(batches) <= 1:
+        for batch in batches:
+            emit_all(run_batch(batch))
+        return failed
+
+    # spawn: workers start clean instead of inheriting this process's state
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(jobs, len(batches)), mp_context=context) as pool:
+        pending = {pool.submit(run_batch, batch) for batch in batches}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit_all(future.result())
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    return failed
+
+
+def _apply_defaults(requests: list[dict | str], args: argparse.Namespace) -> None:
+    """Fill fields missing from each request with the command-line values."""
+    defaults = {
+        "repo_path": args.repo,
+        "rev": args.rev,
+        "question": args.question,
+        "max_commits": args.max_commits,
+        "use_llm": args.use_llm or None,
+        "history_mode": args.history_mode,
+        "fields": args.fields,
+    }
+    defaults = {k: v for k, v in defaults.items() if v is not None}
+    for request in requests:
+        if isinstance(request, dict):
+            for field, value in defaults.items():
+                if request.get(field) is None:
+                    request[field] = value
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="repolens", description="Analyze files offline; streams JSONL results to stdout"
+    )
+    parser.add_argument(
+        "input", nargs="?", default="-", help="JSONL requests file (default: stdin)"
+    )
+    parser.add_argument(
+        "--diff", metavar="FILE",
+        help="Analyze every hunk of a unified diff instead ('-' for stdin)",
+    )
+    parser.add_argument("--repo", help="Repository for requests without repo_path/repo_id")
+    parser.add_argument("--rev", help="Revision for requests without one")
+    parser.add_argument("--question", help="Question for requests without one")
+    parser.add_argument("--max-commits", type=int, help="max_commits for requests without one")
+    parser.add_argument("--use-llm", action="store_true", help="Use the LLM for every request")
+    parser.add_argument("--history-mode", choices=["blame", "range"])
+    parser.add_argument(
+        "--fields",
+        help=f"Comma-separated result fields for requests without them ({','.join(FIELDS)})",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1,
+        help="Worker processes (default: CPU count; 1 runs in-process)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    args = parser.parse_args(argv)
+
+    source = args.diff if args.diff is not None else args.input
+    try:
+        if source == "-":
+            lines = sys.stdin.readlines()
+        else:
+            with open(source) as f:
+                lines = f.readlines()
+    except OSError as e:
+        print(f"repolens: {e}", file=sys.stderr)
+        return 2
+
+    requests = parse_diff(lines) if args.diff is not None else read_requests(lines)
+    _apply_defaults(requests, args)
+    try:
+        failed = run(requests, args.jobs, args.batch_size)
+    except KeyboardInterrupt:
+        return 130
+    if failed:
+        print(f"repolens: {failed} of {len(requests)} requests failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
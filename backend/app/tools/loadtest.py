@@ -0,0 +1,359 @@
+"""Concurrent load generator for the RepoLens API.
+
+Drives many concurrent clients against the app, either in-process through
+an ASGI transport or against a uvicorn server, using synthetic repositories
+and a configurable mix of cold/warm analyze and report requests.
+
+Usage:
+    python -m app.tools.loadtest --clients 100 --duration 30
+    python -m app.tools.loadtest --mode uvicorn --workers 4 --clients 200 \\
+        --mix analyze_warm=0.7,analyze_cold=0.2,report=0.1
+    python -m app.tools.loadtest --url http://localhost:8000 --repo-dir /tmp/synth
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .synthetic_repo import SyntheticRepoConfig, generate_repo
+
+DEFAULT_MIX = {"analyze_warm": 0.6, "analyze_cold": 0.25, "report": 0.15}
+
+_GIT_COUNTER = re.compile(r"^repolens_git_commands_total\{[^}]*\} (\S+)$", re.MULTILINE)
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """
+    Parse a request mix like "analyze_warm=0.7,report=0.3".
+
+    Args:
+        text: Comma-separated kind=weight pairs
+
+    Returns:
+        Mapping of request kind to weight
+
+    Raises:
+        ValueError: If a kind is unknown or weights are not positive
+    """
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Request mix must have a positive total weight")
+    return mix
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def count_git_processes() -> int | None:
+    """Number of running git processes (Linux /proc only, else None)."""
+    if not os.path.isdir("/proc"):
+        return None
+    count = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                if f.read().strip() == "git":
+                    count += 1
+        except OSError:
+            continue
+    return count
+
+
+class RequestFactory:
+    """Builds request bodies for each kind in the mix."""
+
+    def __init__(self, repos: list[dict], seed: int, warm_set_size: int = 20):
+        self.rng = random.Random(seed)
+        self.repos = repos
+        self.counter = 0
+        self.warm_bodies = [self._body() for _ in range(warm_set_size)]
+
+    def _body(self) -> dict:
+        repo = self.rng.choice(self.repos)
+        # Bias towards the hot file, like real editors focusing on a few files
+        if self.rng.random() < 0.5:
+            file_path = repo["hot_file"]
+        else:
+            file_path = self.rng.choice(repo["files"])
+        lines = repo["config"]["file_lines"]
+        start = self.rng.randint(1, max(1, lines - 40))
+        return {
+            "repo_path": repo["path"],
+            "file_path": file_path,
+            "line_start": start,
+            "line_end": start + self.rng.randint(5, 40),
+        }
+
+    def make(self, kind: str) -> tuple[str, dict]:
+        """Return (url path, JSON body) for a request kind."""
+        if kind == "analyze_warm":
+            return "/analyze", dict(self.rng.choice(self.warm_bodies))
+        self.counter += 1
+        body = self._body()
+        # A unique question guarantees a cache miss
+        body["question"] = f"load-{self.counter}"
+        if kind == "report":
+            return "/report", body
+        return "/analyze", body
+
+
+async def _git_command_total(client: httpx.AsyncClient) -> float:
+    try:
+        response = await client.get("/metrics")
+        return sum(float(v) for v in _GIT_COUNTER.findall(response.text))
+    except Exception:
+        return 0.0
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    factory: RequestFactory,
+    mix: dict[str, float],
+    clients: int,
+    duration: float | None = None,
+    total_requests: int | None = None,
+    seed: int = 0,
+) -> dict:
+    """
+    Run concurrent clients and collect latency statistics.
+
+    Args:
+        client: HTTP client bound to the app under test
+        factory: Request builder
+        mix: Request kind weights
+        clients: Number of concurrent clients
+        duration: Stop after this many seconds (if set)
+        total_requests: Stop after this many requests (if set)
+        seed: Seed for request kind selection
+
+    Returns:
+        Summary with throughput, percentiles, errors and git process counts
+    """
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    samples: dict[str, list[float]] = {k: [] for k in kinds}
+    errors: dict[str, int] = {k: 0 for k in kinds}
+    status_counts: dict[str, int] = {}
+    issued = 0
+    peak_git = 0
+    stop = asyncio.Event()
+
+    # Warm the cache for the warm set
+    if "analyze_warm" in mix:
+        for body in factory.warm_bodies:
+            await client.post("/analyze", json=body)
+
+    git_before = await _git_command_total(client)
+    started = time.perf_counter()
+
+    async def worker() -> None:
+        nonlocal issued
+        while not stop.is_set():
+            if total_requests is not None and issued >= total_requests:
+                break
+            if duration is not None and time.perf_counter() - started >= duration:
+                break
+            issued += 1
+            kind = rng.choices(kinds, weights)[0]
+            path, body = factory.make(kind)
+            t0 = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = str(response.status_code)
+                if response.status_code >= 400:
+                    errors[kind] += 1
+            except Exception as e:
+                status = type(e).__name__
+                errors[kind] += 1
+            samples[kind].append((time.perf_counter() - t0) * 1000)
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+    async def sampler() -> None:
+        nonlocal peak_git
+        while not stop.is_set():
+            count = await asyncio.to_thread(count_git_processes)
+            if count is not None:
+                peak_git = max(peak_git, count)
+            await asyncio.sleep(0.05)
+
+    sampler_task = asyncio.create_task(sampler())
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler_task
+    git_after = await _git_command_total(client)
+
+    def summarize(values: list[float], error_count: int) -> dict:
+        return {
+            "requests": len(values),
+            "errors": error_count,
+            "error_rate": round(error_count / len(values), 4) if values else 0.0,
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(max(values), 3) if values else 0.0,
+        }
+
+    all_samples = [v for values in samples.values() for v in values]
+    return {
+        "clients": clients,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(all_samples) / elapsed, 2) if elapsed else 0.0,
+        "overall": summarize(all_samples, sum(errors.values())),
+        "by_kind": {k: summarize(samples[k], errors[k]) for k in kinds},
+        "status_counts": status_counts,
+        "git_commands": int(git_after - git_before),
+        "peak_git_processes": peak_git if os.path.isdir("/proc") else None,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_uvicorn(workers: int) -> tuple[subprocess.Popen, str]:
+    """Start uvicorn in a subprocess and wait until /health answers."""
+    port = _free_port()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=backend_dir,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start within 30 seconds")
+
+
+async def _run(args, repos: list[dict]) -> dict:
+    factory = RequestFactory(repos, seed=args.seed)
+    mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    timeout = httpx.Timeout(args.timeout)
+    proc = None
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout)
+    elif args.mode == "uvicorn":
+        proc, url = _start_uvicorn(args.workers)
+        client = httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout)
+    else:
+        from ..main import app
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(
+            transport=transport, base_url="http://repolens", timeout=timeout
+        )
+
+    try:
+        async with client:
+            return await run_load(
+                client,
+                factory,
+                mix,
+                clients=args.clients,
+                duration=args.duration,
+                total_requests=args.requests,
+                seed=args.seed,
+            )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Load-test the RepoLens API")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--url", help="Target an already running server instead")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=None, help="Total requests")
+    parser.add_argument("--mix", help="e.g. analyze_warm=0.6,analyze_cold=0.25,report=0.15")
+    parser.add_argument("--repos", type=int, default=1, help="Synthetic repos to generate")
+    parser.add_argument("--repo-dir", help="Generate repos here and keep them")
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--file-lines", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="Write the summary JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.duration is None and args.requests is None:
+        args.duration = 30.0
+
+    workdir = args.repo_dir or tempfile.mkdtemp(prefix="repolens-load-")
+    try:
+        repos = [
+            generate_repo(
+                os.path.join(workdir, f"repo{i}"),
+                SyntheticRepoConfig(
+                    commits=args.commits,
+                    files=args.files,
+                    file_lines=args.file_lines,
+                    seed=args.seed + i,
+                ),
+            )
+            for i in range(args.repos)
+        ]
+        summary = asyncio.run(_run(args, repos))
+    finally:
+        if not args.repo_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary["mode"] = "url" if args.url else args.mode
+    summary["mix"] = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    text = json.dumps(summary, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
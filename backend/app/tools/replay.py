@@ -0,0 +1,259 @@
+"""Replay a recorded request log against a local RepoLens instance.
+
+Plays back a log written by the request recorder (REPOLENS_RECORD_FILE) at
+the original pacing, scaled, or as fast as possible, and compares replayed
+latency and cache-hit rate with what was recorded.
+
+Anonymized paths are mapped onto a local checkout: files whose salted hash
+matches a tracked file are replayed against that file, the rest are mapped
+deterministically onto tracked files so the access skew is preserved.
+
+Usage:
+    python -m app.tools.replay requests.log --repo /path/to/checkout --salt s3cret
+    python -m app.tools.replay requests.log --repo /path/to/checkout --speed 4
+    python -m app.tools.replay requests.log --repo /path --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from ..services.recorder import anonymize
+from .loadtest import percentile
+
+ENDPOINT_PATHS = {"analyze": "/analyze", "report": "/report"}
+
+
+def load_log(path: str) -> list[dict]:
+    """Read a recorded log, skipping malformed lines, ordered by timestamp."""
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    entries.sort(key=lambda e: e.get("ts", 0))
+    return entries
+
+
+class PathMapper:
+    """Maps anonymized repo/file hashes onto a local repository."""
+
+    def __init__(self, repo_path: str, salt: str = "", repo_map: dict[str, str] | None = None):
+        self.default_repo = os.path.abspath(repo_path)
+        self.salt = salt
+        self.repo_map = {k: os.path.abspath(v) for k, v in (repo_map or {}).items()}
+        self._files: dict[str, list[str]] = {}
+        self._by_hash: dict[str, dict[str, str]] = {}
+        self.exact_matches = 0
+        self.fallback_matches = 0
+
+    def _tracked(self, repo: str) -> list[str]:
+        if repo not in self._files:
+            output = subprocess.run(
+                ["git", "ls-files"], cwd=repo, capture_output=True, text=True, check=True
+            ).stdout
+            files = sorted(f for f in output.split("\n") if f)
+            self._files[repo] = files
+            self._by_hash[repo] = {anonymize(f, self.salt): f for f in files}
+        return self._files[repo]
+
+    def repo(self, repo_hash: str) -> str:
+        """Local repository for a recorded repo hash."""
+        return self.repo_map.get(repo_hash, self.default_repo)
+
+    def file(self, repo: str, file_hash: str) -> str:
+        """Local file for a recorded file hash."""
+        files = self._tracked(repo)
+        exact = self._by_hash[repo].get(file_hash)
+        if exact is not None:
+            self.exact_matches += 1
+            return exact
+        self.fallback_matches += 1
+        return files[int(file_hash, 16) % len(files)]
+
+
+def _summarize(latencies: list[float], hits: list[int]) -> dict:
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "cache_hit_rate": round(sum(hits) / len(hits), 4) if hits else None,
+    }
+
+
+def compare(recorded: dict, replayed: dict) -> dict:
+    """Replayed minus recorded for latency percentiles and hit rate."""
+    delta = {}
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        delta[key] = round(replayed[key] - recorded[key], 3)
+    if recorded["cache_hit_rate"] is not None and replayed["cache_hit_rate"] is not None:
+        delta["cache_hit_rate"] = round(
+            replayed["cache_hit_rate"] - recorded["cache_hit_rate"], 4
+        )
+    return delta
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    entries: list[dict],
+    mapper: PathMapper,
+    speed: float = 1.0,
+    max_in_flight: int = 256,
+) -> dict:
+    """
+    Replay entries and compare against the recording.
+
+    Args:
+        client: HTTP client bound to the target instance
+        entries: Recorded log entries ordered by timestamp
+        mapper: Maps anonymized paths to local ones
+        speed: Time scale (1 = original pacing, 2 = twice as fast, 0 = no pacing)
+        max_in_flight: Cap on concurrent outstanding requests
+
+    Returns:
+        Report with recorded/replayed summaries and deltas per endpoint
+    """
+    if not entries:
+        return {"requests": 0}
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+    results: list[tuple[dict, float, int | None, int]] = []
+    origin = entries[0].get("ts", 0)
+    started = time.perf_counter()
+
+    async def send(entry: dict) -> None:
+        repo = mapper.repo(entry["r"])
+        body = {
+            "repo_path": repo,
+            "file_path": mapper.file(repo, entry["f"]),
+            "line_start": entry.get("s"),
+            "line_end": entry.get("e"),
+            "max_commits": entry.get("mc", 10),
+        }
+        if entry.get("q"):
+            body["question"] = "replayed question"
+        path = ENDPOINT_PATHS.get(entry.get("ep"), "/analyze")
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                if entry.get("m") == "GET":
+                    params = {k: v for k, v in body.items() if v is not None}
+                    response = await client.get(path, params=params)
+                else:
+                    response = await client.post(path, json=body)
+                status = response.status_code
+                hit = None
+                if path == "/analyze" and status == 200:
+                    hit = 1 if response.json().get("cache", {}).get("hit") else 0
+            except Exception:
+                status, hit = 0, None
+            results.append((entry, (time.perf_counter() - t0) * 1000, hit, status))
+
+    tasks = []
+    for entry in entries:
+        if speed > 0:
+            due = (entry.get("ts", origin) - origin) / speed
+            wait = due - (time.perf_counter() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(send(entry)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    report: dict = {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "recorded_span_s": round(entries[-1].get("ts", origin) - origin, 3),
+        "errors": sum(1 for _, _, _, status in results if status == 0 or status >= 500),
+        "exact_file_matches": mapper.exact_matches,
+        "mapped_file_fallbacks": mapper.fallback_matches,
+        "endpoints": {},
+    }
+    for endpoint in sorted({e.get("ep", "analyze") for e, _, _, _ in results}):
+        rows = [r for r in results if r[0].get("ep", "analyze") == endpoint]
+        recorded = _summarize(
+            [e.get("d", 0.0) for e, _, _, _ in rows],
+            [e["h"] for e, _, _, _ in rows if "h" in e],
+        )
+        replayed = _summarize(
+            [latency for _, latency, _, _ in rows],
+            [hit for _, _, hit, _ in rows if hit is not None],
+        )
+        report["endpoints"][endpoint] = {
+            "recorded": recorded,
+            "replayed": replayed,
+            "delta": compare(recorded, replayed),
+        }
+    return report
+
+
+def _parse_repo_map(values: list[str]) -> dict[str, str]:
+    repo_map = {}
+    for value in values:
+        key, _, path = value.partition("=")
+        if not path:
+            raise ValueError(f"Expected HASH=PATH, got {value}")
+        repo_map[key] = path
+    return repo_map
+
+
+async def _run(args) -> dict:
+    entries = load_log(args.log)
+    mapper = PathMapper(args.repo, args.salt, _parse_repo_map(args.repo_map))
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+    else:
+        from ..main import app
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://repolens", timeout=timeout
+        )
+    async with client:
+        return await replay(client, entries, mapper, speed=args.speed, max_in_flight=args.max_in_flight)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Replay a RepoLens request log")
+    parser.add_argument("log", help="Log written via REPOLENS_RECORD_FILE")
+    parser.add_argument("--repo", required=True, help="Local repository to replay against")
+    parser.add_argument(
+        "--repo-map", action="append", default=[],
+        help="Map a recorded repo hash to a local path (HASH=PATH), repeatable",
+    )
+    parser.add_argument("--salt", default="", help="REPOLENS_RECORD_SALT used when recording")
+    parser.add_argument("--speed", type=float, default=1.0, help="1=original pacing, 0=no pacing")
+    parser.add_argument("--url", help="Target a running server instead of in-process")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="Write the report JSON to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        report = asyncio.run(_run(args))
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"replay failed: {e}", file=sys.stderr)
+        return 1
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
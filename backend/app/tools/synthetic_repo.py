@@ -0,0 +1,250 @@
+"""Deterministic synthetic git repository generator.
+
+Builds repositories of arbitrary size through ``git fast-import`` so that
+benchmarks and load tests run against realistic history without the cost
+of one ``git commit`` subprocess per commit.
+
+Usage:
+    python -m app.tools.synthetic_repo /tmp/synth --commits 2000 --files 200
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+from dataclasses import dataclass, asdict
+
+AUTHORS = [
+    ("Ada Lovelace", "ada@example.com"),
+    ("Grace Hopper", "grace@example.com"),
+    ("Linus Torvalds", "linus@example.com"),
+    ("Barbara Liskov", "barbara@example.com"),
+]
+
+SUBJECTS = [
+    "fix: handle empty input in {name}",
+    "refactor: simplify {name}",
+    "feat: extend {name}",
+    "workaround: temporary guard in {name}",
+    "design: restructure {name} per RFC",
+    "cleanup {name}",
+    "bug: off-by-one in {name}",
+    "update {name}",
+]
+
+BASE_TIMESTAMP = 1_600_000_000
+
+
+@dataclass
+class SyntheticRepoConfig:
+    """Shape of a generated repository."""
+
+    commits: int = 200
+    files: int = 20
+    file_lines: int = 200
+    rename_rate: float = 0.02
+    merge_rate: float = 0.05
+    files_per_commit: int = 3
+    seed: int = 1234
+
+
+def _file_body(rng: random.Random, path: str, lines: int) -> list[str]:
+    """Initial content for a file."""
+    body = [f"# {path}"]
+    for i in range(1, lines):
+        body.append(f"value_{i} = compute({i}, {rng.randint(0, 9999)})")
+    return body
+
+
+def _mutate(rng: random.Random, body: list[str], commit_index: int) -> list[str]:
+    """Replace a small contiguous block of lines."""
+    body = list(body)
+    if len(body) < 2:
+        return body + [f"value_new = compute({commit_index}, 0)"]
+    start = rng.randrange(1, len(body))
+    length = rng.randint(1, 5)
+    replacement = [
+        f"value_{start + j} = compute({commit_index}, {rng.randint(0, 9999)})"
+        for j in range(length)
+    ]
+    body[start:start + length] = replacement
+    return body
+
+
+class _StreamWriter:
+    """Accumulates a git fast-import stream."""
+
+    def __init__(self):
+        self.parts: list[bytes] = []
+
+    def line(self, text: str) -> None:
+        self.parts.append(text.encode() + b"\n")
+
+    def data(self, text: str) -> None:
+        payload = text.encode()
+        self.parts.append(f"data {len(payload)}\n".encode())
+        self.parts.append(payload + b"\n")
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+def _git(repo_path: str, args: list[str], stdin: bytes | None = None) -> str:
+    result = subprocess.run(
+        ["git"] + args, cwd=repo_path, input=stdin, capture_output=True, check=True
+    )
+    return result.stdout.decode()
+
+
+def generate_repo(repo_path: str, config: SyntheticRepoConfig | None = None) -> dict:
+    """
+    Generate a deterministic git repository.
+
+    The same config always yields the same commit hashes.
+
+    Args:
+        repo_path: Directory to create the repository in (created if missing)
+        config: Repository shape; defaults to SyntheticRepoConfig()
+
+    Returns:
+        Dictionary with head, files (tracked paths at HEAD), hot_file (most
+        modified file), renames and merges counts
+    """
+    config = config or SyntheticRepoConfig()
+    rng = random.Random(config.seed)
+    os.makedirs(repo_path, exist_ok=True)
+
+    _git(repo_path, ["init", "-q"])
+    _git(repo_path, ["symbolic-ref", "HEAD", "refs/heads/main"])
+    _git(repo_path, ["config", "user.email", "bench@example.com"])
+    _git(repo_path, ["config", "user.name", "Bench"])
+
+    files: dict[str, list[str]] = {}
+    touches: dict[str, int] = {}
+    for i in range(config.files):
+        path = f"src/pkg{i % 10}/module_{i}.py"
+        files[path] = _file_body(rng, path, config.file_lines)
+        touches[path] = 1
+
+    stream = _StreamWriter()
+    mark = 0
+    main_tip = 0
+    renames = 0
+    merges = 0
+
+    def header(ref: str, index: int) -> None:
+        nonlocal mark
+        mark += 1
+        name, email = AUTHORS[index % len(AUTHORS)]
+        stamp = BASE_TIMESTAMP + index * 3600
+        stream.line(f"commit {ref}")
+        stream.line(f"mark :{mark}")
+        stream.line(f"author {name} <{email}> {stamp} +0000")
+        stream.line(f"committer {name} <{email}> {stamp} +0000")
+
+    def subject_for(path: str) -> str:
+        module = os.path.splitext(os.path.basename(path))[0]
+        return rng.choice(SUBJECTS).format(name=module)
+
+    # Initial commit with every file
+    header("refs/heads/main", 0)
+    stream.data("initial import")
+    for path in sorted(files):
+        stream.line(f"M 100644 inline {path}")
+        stream.data("\n".join(files[path]) + "\n")
+    main_tip = mark
+
+    for index in range(1, config.commits):
+        paths = sorted(files)
+        if rng.random() < config.merge_rate:
+            # Side-branch commit followed by a merge into main
+            target = rng.choice(paths)
+            files[target] = _mutate(rng, files[target], index)
+            touches[target] += 1
+            header("refs/heads/side", index)
+            stream.data(subject_for(target))
+            stream.line(f"from :{main_tip}")
+            stream.line(f"M 100644 inline {target}")
+            stream.data("\n".join(files[target]) + "\n")
+            side_tip = mark
+
+            header("refs/heads/main", index)
+            stream.data(f"Merge branch 'side' ({os.path.basename(target)})")
+            stream.line(f"from :{main_tip}")
+            stream.line(f"merge :{side_tip}")
+            stream.line(f"M 100644 inline {target}")
+            stream.data("\n".join(files[target]) + "\n")
+            main_tip = mark
+            merges += 1
+            continue
+
+        count = min(len(paths), rng.randint(1, max(1, config.files_per_commit)))
+        changed = rng.sample(paths, count)
+        header("refs/heads/main", index)
+        stream.data(subject_for(changed[0]))
+        stream.line(f"from :{main_tip}")
+
+        if rng.random() < config.rename_rate:
+            old = changed[0]
+            new = f"src/moved/{os.path.basename(old)[:-3]}_{index}.py"
+            stream.line(f"R {old} {new}")
+            files[new] = files.pop(old)
+            touches[new] = touches.pop(old)
+            changed[0] = new
+            renames += 1
+
+        for path in changed:
+            files[path] = _mutate(rng, files[path], index)
+            touches[path] += 1
+            stream.line(f"M 100644 inline {path}")
+            stream.data("\n".join(files[path]) + "\n")
+        main_tip = mark
+
+    stream.line("done")
+    _git(repo_path, ["fast-import", "--quiet", "--done"], stdin=stream.getvalue())
+    _git(repo_path, ["reset", "--hard", "-q", "main"])
+
+    head = _git(repo_path, ["rev-parse", "HEAD"]).strip()
+    hot_file = max(sorted(touches), key=lambda p: touches[p])
+    return {
+        "path": os.path.abspath(repo_path),
+        "head": head,
+        "files": sorted(files),
+        "hot_file": hot_file,
+        "renames": renames,
+        "merges": merges,
+        "config": asdict(config),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic git repository")
+    parser.add_argument("path", help="Directory to create the repository in")
+    parser.add_argument("--commits", type=int, default=SyntheticRepoConfig.commits)
+    parser.add_argument("--files", type=int, default=SyntheticRepoConfig.files)
+    parser.add_argument("--file-lines", type=int, default=SyntheticRepoConfig.file_lines)
+    parser.add_argument("--rename-rate", type=float, default=SyntheticRepoConfig.rename_rate)
+    parser.add_argument("--merge-rate", type=float, default=SyntheticRepoConfig.merge_rate)
+    parser.add_argument("--seed", type=int, default=SyntheticRepoConfig.seed)
+    args = parser.parse_args(argv)
+
+    info = generate_repo(
+        args.path,
+        SyntheticRepoConfig(
+            commits=args.commits,
+            files=args.files,
+            file_lines=args.file_lines,
+            rename_rate=args.rename_rate,
+            merge_rate=args.merge_rate,
+            seed=args.seed,
+        ),
+    )
+    info.pop("files")
+    print(json.dumps(info, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())